@@ -1,4 +1,5 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import os
@@ -6,17 +7,67 @@ from datetime import datetime, timedelta
 import logging
 import requests
 import json
-import math
-from decimal import Decimal
-from typing import Dict, List, Tuple
-from itertools import product
-from scipy.stats import norm
+import base64
+import hmac
+import re
+from collections import deque
+from operator import attrgetter, itemgetter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import multiprocessing
+import threading
+import time
+from contextlib import nullcontext
+from rate_limiter import create_rate_limiter_from_env
+from market_data_cache import create_market_data_cache_from_env
+from pricing import short_leg_pop
+from option_chain import OptionChain, as_option_chain
+from pair_matching import ShortLegIndex
+from records import Opportunity, dumps as dump_records
+from scanner import scan_symbol, strategy_option_type
+from selection import TopK
+from scan_session import SymbolCandidates, create_scan_session_store_from_env
+from scan_pool import create_scan_pool_from_env
+from scan_jobs import MAX_SYMBOL_LENGTH, ScanJobWorker, create_scan_job_store_from_env
+from db_pool import create_connection_pool_from_env
+from snapshot_store import create_snapshot_store_from_env
+from replay import create_response_recorder_from_env
+import metrics
+from profiling import PROFILE_MODES, ScanProfiler, write_profile
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class RecordJSONProvider(DefaultJSONProvider):
+    """jsonify() that also serializes scan records (records.Opportunity)"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Opportunity):
+            return o.as_dict()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = RecordJSONProvider(app)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.set_route(request.endpoint)
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        metrics.observe('http_request_seconds', time.perf_counter() - started,
+                        endpoint=request.endpoint or 'unknown', method=request.method,
+                        status=response.status_code)
+    return response
+
+@app.teardown_request
+def clear_request_route(exc):
+    metrics.set_route(None)
 
 # Database connection
 DB_URL = os.environ.get('DATABASE_URL')
@@ -30,23 +81,127 @@ if not ALPHAVANTAGE_API_KEY:
 
 ALPHAVANTAGE_BASE_URL = "https://www.alphavantage.co/query"
 
-# Throttling for API calls - Updated for 600 calls/min capacity
-last_call = 0
-MIN_INTERVAL = 60 / 590  # ~590 calls/min to stay under 600 limit
+# Postgres connection pool shared by every route and worker thread in this process
+# (see db_pool.py for configuration)
+db_pool = create_connection_pool_from_env(DB_URL)
+
+# Throttling for API calls - token bucket shared by all threads and gunicorn workers
+# (~590 calls/min to stay under the 600 limit, see rate_limiter.py for configuration)
+api_rate_limiter = create_rate_limiter_from_env(db_pool)
+
+# Quote/option-chain cache so re-scans within the TTL skip the network
+# (see market_data_cache.py for configuration)
+market_data_cache = create_market_data_cache_from_env()
+
+# Record every live chain fetch in options_data so scans can replay the last snapshot
+PERSIST_OPTIONS_SNAPSHOTS = os.environ.get('PERSIST_OPTIONS_SNAPSHOTS', 'true').lower() in ('1', 'true', 'yes')
+
+# Columnar on-disk chain snapshots (SNAPSHOT_STORE_DIR, see snapshot_store.py), None = disabled
+chain_snapshot_store = create_snapshot_store_from_env()
+
+# Raw Alpha Vantage responses for offline replay (RECORD_API_RESPONSES_DIR, see replay.py), None = disabled
+response_recorder = create_response_recorder_from_env()
+
+def record_api_response(function: str, symbol: str, payload):
+    """Save a raw API payload for replay.py; recording failures never fail the fetch"""
+    if response_recorder is None:
+        return
+    try:
+        response_recorder.record(function, symbol, payload)
+    except Exception as e:
+        logger.error(f"❌ Error recording {function} response for {symbol}: {str(e)}")
+
+# Concurrent fetch pipeline - symbols with requests in flight at once during a scan
+SCAN_FETCH_WORKERS = max(1, int(os.environ.get('SCAN_FETCH_WORKERS', 8)))
+
+# Chains and candidate indexes kept per scan session for fast re-screening (see scan_session.py)
+scan_sessions = create_scan_session_store_from_env()
+SESSION_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
 
-def throttled_request(url, timeout=30):
-    """Make throttled API request for Alpha Vantage"""
-    global last_call
-    import time
-    elapsed = time.time() - last_call
-    if elapsed < MIN_INTERVAL:
-        time.sleep(MIN_INTERVAL - elapsed)
-    last_call = time.time()
-    return requests.get(url, timeout=timeout)
+# Worker processes chains are screened on (SCAN_PROCESS_WORKERS, see scan_pool.py), None = request thread
+scan_pool = create_scan_pool_from_env()
+
+# Filters one /api/scan/batch request may screen against each fetched chain
+SCAN_BATCH_MAX_FILTERS = max(1, int(os.environ.get('SCAN_BATCH_MAX_FILTERS', 10)))
+
+# Background scan jobs - queue shared with the worker process (see scan_jobs.py for configuration)
+scan_job_store = create_scan_job_store_from_env(db_pool)
+
+# Job worker threads started inside each web process (0 = jobs run only in scan_worker.py)
+SCAN_JOB_INPROCESS_WORKERS = max(0, int(os.environ.get('SCAN_JOB_INPROCESS_WORKERS', 0)))
+
+# Per-request profiling of /api/scan (X-Profile header or "profile" body field, see profiling.py)
+# Off by default: a profile exposes stacks and function names of the serving worker
+SCAN_PROFILING_ENABLED = os.environ.get('SCAN_PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# When set, profile requests must also carry it in an X-Profile-Token header
+SCAN_PROFILE_TOKEN = os.environ.get('SCAN_PROFILE_TOKEN', '')
+# Write profiles here instead of returning the collapsed stacks in the response
+SCAN_PROFILE_DIR = os.environ.get('SCAN_PROFILE_DIR', '')
+SCAN_PROFILE_TOP = max(1, int(os.environ.get('SCAN_PROFILE_TOP', 25)))
+
+def throttled_request(url, timeout=30, function: str = 'other'):
+    """Make rate-limited API request for Alpha Vantage (safe to call from fetch threads)"""
+    with metrics.timer('api_throttle_wait_seconds', function=function):
+        api_rate_limiter.acquire()
+    try:
+        with metrics.timer('api_http_seconds', function=function):
+            response = requests.get(url, timeout=timeout)
+    except requests.RequestException:
+        metrics.inc('api_requests_total', function=function, status='error')
+        raise
+    metrics.inc('api_requests_total', function=function, status=response.status_code)
+    return response
+
+def check_rate_limit_payload(payload: Dict):
+    """Feed the API's rate-limit answer back into the limiter's adaptive backoff"""
+    # Alpha Vantage answers throttled calls with "Note" (per minute) or "Information" (daily quota)
+    for field in ("Note", "Information"):
+        if field in payload:
+            api_rate_limiter.report_rate_limited()
+            raise RuntimeError(f"API rate limit reached: {payload[field]}")
+    api_rate_limiter.report_success()
 
 # ============ Alpha Vantage API Functions ============
 
 def fetch_last_price(symbol: str) -> float:
+    """Fetch current stock price (served from cache within CACHE_TTL_QUOTE)"""
+    return market_data_cache.get_or_load('quote', symbol, lambda: fetch_last_price_live(symbol))
+
+def fetch_options_data(symbol: str, price: Optional[float] = None) -> List[Dict]:
+    """
+    Fetch options chain (served from cache within CACHE_TTL_OPTIONS, treat as read-only)
+    
+    price is the quote the caller already has; a fresh chain's snapshot is
+    stored with it instead of fetching the quote again.
+    """
+    return market_data_cache.get_or_load('options', symbol, lambda: fetch_and_store_options_data(symbol, price))
+
+def fetch_and_store_options_data(symbol: str, price: Optional[float] = None) -> List[Dict]:
+    """Fetch a live options chain and record it (with price, else the current quote) as a snapshot"""
+    options = fetch_options_data_live(symbol)
+    if price is None and (PERSIST_OPTIONS_SNAPSHOTS or chain_snapshot_store is not None):
+        try:
+            price = fetch_last_price(symbol)
+        except Exception as e:
+            logger.error(f"❌ Error fetching price to store the options snapshot for {symbol}: {str(e)}")
+            return options
+
+    if PERSIST_OPTIONS_SNAPSHOTS:
+        # A failed write must never fail the scan - the live data is still good
+        try:
+            persist_options_snapshot(symbol, price, options)
+        except Exception as e:
+            logger.error(f"❌ Error storing options snapshot for {symbol}: {str(e)}")
+
+    if chain_snapshot_store is not None:
+        try:
+            chain_snapshot_store.write(symbol, price, options)
+        except Exception as e:
+            logger.error(f"❌ Error writing chain snapshot file for {symbol}: {str(e)}")
+
+    return options
+
+def fetch_last_price_live(symbol: str) -> float:
     """Fetch current stock price from Alpha Vantage"""
     params = {
         "function": "GLOBAL_QUOTE",
@@ -55,16 +210,18 @@ def fetch_last_price(symbol: str) -> float:
         "entitlement": "realtime"
     }
     url = f"{ALPHAVANTAGE_BASE_URL}?" + "&".join([f"{k}={v}" for k, v in params.items()])
-    response = throttled_request(url, timeout=10)
+    response = throttled_request(url, timeout=10, function="GLOBAL_QUOTE")
     response.raise_for_status()
-    payload = response.json()
-    
-    if "Note" in payload:
-        raise RuntimeError(f"API rate limit reached: {payload['Note']}")
+    with metrics.timer('api_json_decode_seconds', function="GLOBAL_QUOTE"):
+        payload = response.json()
+    check_rate_limit_payload(payload)
     
     if "Global Quote" not in payload or not payload["Global Quote"]:
         raise RuntimeError(f"No price data for {symbol}")
     
+    # Only valid quotes are recorded; replay would serve rate-limit notes back as errors
+    record_api_response("GLOBAL_QUOTE", symbol, payload)
+    
     # Debug logging to trace price extraction
     global_quote = payload["Global Quote"]
     current_price = global_quote.get("05. price")
@@ -73,7 +230,7 @@ def fetch_last_price(symbol: str) -> float:
     
     return float(payload["Global Quote"]["05. price"])
 
-def fetch_options_data(symbol: str) -> List[Dict]:
+def fetch_options_data_live(symbol: str) -> List[Dict]:
     """Fetch options chain data from Alpha Vantage"""
     params = {
         "function": "REALTIME_OPTIONS",
@@ -83,189 +240,306 @@ def fetch_options_data(symbol: str) -> List[Dict]:
         "entitlement": "realtime"
     }
     url = f"{ALPHAVANTAGE_BASE_URL}?" + "&".join([f"{k}={v}" for k, v in params.items()])
-    response = throttled_request(url, timeout=30)
+    response = throttled_request(url, timeout=30, function="REALTIME_OPTIONS")
     response.raise_for_status()
-    payload = response.json()
-    
-    if "Note" in payload:
-        raise RuntimeError(f"API rate limit reached: {payload['Note']}")
+    with metrics.timer('api_json_decode_seconds', function="REALTIME_OPTIONS"):
+        payload = response.json()
+    check_rate_limit_payload(payload)
     
     if "data" not in payload:
         raise RuntimeError(f"Unexpected response format: {payload}")
     
+    record_api_response("REALTIME_OPTIONS", symbol, payload)
+    
     return payload["data"]
 
-def parse_expiration_date(date_str: str) -> datetime:
-    """Parse expiration date string to datetime object"""
-    return datetime.strptime(date_str, "%Y-%m-%d")
-
-def find_leaps(
-    data: List[Dict],
-    current_price: float,
-    min_days: int,
-    max_days: int,
-    itm_min_pct: float,
-    itm_max_pct: float,
-    min_oi: int,
-    min_volume: int,
-    option_type: str,
-    target_delta: float
-) -> List[Tuple]:
-    """Filter and find qualifying LEAPS options"""
-    today = datetime.now()
-    leaps = []
+# ============ Options Snapshot Storage ============
+
+# Columns written by COPY, in the order rows are streamed
+OPTIONS_DATA_COPY_COLUMNS = (
+    'symbol', 'option_type', 'strike_price', 'expiration_date',
+    'mark_price', 'bid_price', 'ask_price', 'last_price',
+    'delta', 'gamma', 'theta', 'vega', 'rho', 'implied_volatility',
+    'volume', 'open_interest', 'underlying_price', 'data_timestamp'
+)
+
+# Alpha Vantage field for each options_data pricing/greek column
+OPTIONS_DATA_FIELD_MAP = (
+    ('mark_price', 'mark'), ('bid_price', 'bid'), ('ask_price', 'ask'), ('last_price', 'last'),
+    ('delta', 'delta'), ('gamma', 'gamma'), ('theta', 'theta'), ('vega', 'vega'), ('rho', 'rho'),
+    ('implied_volatility', 'implied_volatility')
+)
+
+class CopyStream:
+    """Minimal file-like reader that feeds generated lines to COPY FROM STDIN"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.buffer += line
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+def copy_field(value) -> str:
+    """Format one value for COPY text format (empty fields become NULL)"""
+    if value is None or value == '':
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', ' ').replace('\n', ' ')
+
+def iter_options_copy_lines(symbol: str, underlying_price: float, options: List[Dict], data_timestamp: datetime):
+    """Yield one COPY text line per call/put in an Alpha Vantage chain"""
+    snapshot_fields = (copy_field(underlying_price), copy_field(data_timestamp.isoformat(sep=' ')))
+
+    for option in options:
+        option_type = str(option.get('type', '')).upper()
+        if option_type not in ('CALL', 'PUT'):
+            continue
+
+        fields = [copy_field(symbol), option_type,
+                  copy_field(option.get('strike')), copy_field(option.get('expiration'))]
+        fields.extend(copy_field(option.get(av_field)) for _, av_field in OPTIONS_DATA_FIELD_MAP)
+        fields.append(copy_field(option.get('volume') or 0))
+        fields.append(copy_field(option.get('open_interest') or 0))
+        fields.extend(snapshot_fields)
+
+        yield '\t'.join(fields) + '\n'
+
+def persist_options_snapshot(symbol: str, underlying_price: float, options: List[Dict],
+                             data_timestamp: datetime = None) -> int:
+    """
+    Bulk-load one fetched options chain into options_data
+
+    Rows are streamed through COPY FROM STDIN in a single statement; every row
+    of the batch shares one data_timestamp so the latest snapshot for a symbol
+    can be selected with MAX(data_timestamp). Returns the number of rows written.
+    """
+    data_timestamp = data_timestamp or datetime.now()
+    with db_pool.connection() as conn:
+        cur = conn.cursor()
+        cur.copy_expert(
+            f"COPY options_data ({', '.join(OPTIONS_DATA_COPY_COLUMNS)}) FROM STDIN",
+            CopyStream(iter_options_copy_lines(symbol, underlying_price, options, data_timestamp))
+        )
+        row_count = cur.rowcount
+        conn.commit()
+        cur.close()
+
+    logger.info(f"💾 Stored {row_count} options for {symbol} (snapshot {data_timestamp:%Y-%m-%d %H:%M:%S})")
+    return row_count
+
+def fetch_symbol_data_from_snapshot(symbol: str) -> Tuple[float, List[Dict]]:
+    """Load the latest stored options_data snapshot for a symbol in Alpha Vantage format"""
+    with db_pool.connection() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute("""
+            SELECT * FROM options_data
+            WHERE symbol = %s
+            AND data_timestamp = (SELECT MAX(data_timestamp) FROM options_data WHERE symbol = %s)
+        """, (symbol, symbol))
+        rows = cur.fetchall()
+        cur.close()
+
+    if not rows:
+        raise RuntimeError(f"No stored options snapshot for {symbol}")
+
+    options = []
+    for row in rows:
+        option = {
+            'symbol': symbol,
+            'type': row['option_type'].lower(),
+            'strike': row['strike_price'],
+            'expiration': row['expiration_date'].strftime('%Y-%m-%d'),
+            'volume': row['volume'] or 0,
+            'open_interest': row['open_interest'] or 0,
+        }
+        for column, av_field in OPTIONS_DATA_FIELD_MAP:
+            option[av_field] = row[column] if row[column] is not None else 0
+        options.append(option)
+
+    price = float(rows[0]['underlying_price'])
+    logger.info(f"💾 Loaded {len(options)} stored options for {symbol} "
+                f"(snapshot {rows[0]['data_timestamp']:%Y-%m-%d %H:%M:%S}, price ${price:.2f})")
+    return price, options
+
+def fetch_symbol_data_from_store(symbol: str) -> Tuple[float, OptionChain]:
+    """Memory-map the latest columnar chain snapshot for a symbol (no parsing)"""
+    price, chain, timestamp = chain_snapshot_store.load(symbol)
+    logger.info(f"💾 Mapped {len(chain)} stored options for {symbol} "
+                f"(snapshot {timestamp:%Y-%m-%d %H:%M:%S}, price ${price:.2f})")
+    return price, chain
+
+def fetch_symbol_data(symbol: str) -> Tuple[float, List[Dict]]:
+    """Fetch current price and options chain for one symbol"""
+    logger.info(f"🔍 Fetching data for {symbol}...")
+
+    price = fetch_last_price(symbol)
+    logger.info(f"💰 {symbol} price: ${price:.2f}")
+
+    options = fetch_options_data(symbol, price)
+    logger.info(f"📊 Fetched {len(options)} options for {symbol}")
+
+    return price, options
+
+def iter_fetched_symbols(symbols: List[str], max_workers: int = SCAN_FETCH_WORKERS,
+                         fetcher=fetch_symbol_data):
+    """
+    Fetch symbols concurrently and yield (symbol, future) in input order
+
+    Keeps up to max_workers symbols in flight (plus a small read-ahead window)
+    so the caller can screen symbol N while symbol N+1 is still downloading.
+    Calling future.result() re-raises any fetch error for that symbol.
+    fetcher(symbol) -> (price, options) defaults to the live/cached API fetch.
+    All requests still go through throttled_request, so the shared rate
+    budget is honored no matter how many threads are fetching.
+    """
+    if not symbols:
+        return
+
+    window = max_workers * 2
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols)),
+                            thread_name_prefix='av-fetch') as pool:
+        pending = deque()
+        remaining = iter(symbols)
+
+        for symbol in remaining:
+            pending.append((symbol, pool.submit(fetcher, symbol)))
+            if len(pending) >= window:
+                break
+
+        try:
+            while pending:
+                yield pending.popleft()
+                for symbol in remaining:
+                    pending.append((symbol, pool.submit(fetcher, symbol)))
+                    break
+        finally:
+            # Consumer stopped early - don't start fetches nobody will read
+            for _, future in pending:
+                future.cancel()
+
+def iter_scan_filters(symbols: List[str], filters: Dict[str, Dict], data_source: str = 'live',
+                      session_id: Optional[str] = None):
+    """
+    Screen symbols against several filters, fetching each symbol's quote and chain once
     
-    # Debug: Log what we're looking for
-    logger.info(f"🔍 find_leaps: Looking for option_type='{option_type}'")
+    filters maps a key to scan_symbol keyword arguments (as built by
+    scan_params_from_filter). Each chain is parsed once and every filter runs
+    over the same OptionChain, with days to expiration counted from the same
+    moment, so API calls and parsing don't grow with the number of filters.
     
-    # Debug: Count option types in data
-    call_count = sum(1 for opt in data if opt.get("type") == "call")
-    put_count = sum(1 for opt in data if opt.get("type") == "put")
-    logger.info(f"📊 Available options: {call_count} calls, {put_count} puts")
+    data_source='snapshot' screens the latest chains stored in options_data
+    and data_source='store' the latest columnar snapshot files instead of
+    calling the API.
     
-    for option in data:
-        if option.get("type") != option_type:
-            continue
-        
-        exp_date = parse_expiration_date(option["expiration"])
-        days_to_exp = (exp_date - today).days
-        
-        if not (min_days <= days_to_exp <= max_days):
-            continue
-        
-        strike = float(option["strike"])
-        
-        # Calculate ITM percentage
-        if option_type == "call":
-            itm_pct = ((current_price - strike) / current_price)
-        else:
-            itm_pct = ((strike - current_price) / current_price)
-        
-        if not (itm_min_pct <= itm_pct <= itm_max_pct):
-            continue
-        
-        volume = int(option.get("volume", 0))
-        if volume < min_volume:
-            continue
-        
-        oi = int(option.get("open_interest", 0))
-        if oi < min_oi:
-            continue
-        
-        delta = float(option.get("delta", 0))
-        ask = float(option.get("ask", 0))
-        
-        leaps.append((
-            option["expiration"],
-            strike,
-            ask,
-            delta,
-            oi,
-            volume
-        ))
-    
-    # Sort by delta closest to target
-    return sorted(leaps, key=lambda x: abs(x[3] - target_delta))
-
-def find_shorts(
-    data: List[Dict],
-    current_price: float,
-    min_days: int,
-    max_days: int,
-    otm_min_pct: float,
-    otm_max_pct: float,
-    min_oi: int,
-    min_volume: int,
-    option_type: str,
-    target_delta: float
-) -> List[Tuple]:
-    """Filter and find qualifying short options"""
-    today = datetime.now()
-    shorts = []
-    
-    # Debug: Log what we're looking for
-    logger.info(f"🔍 find_shorts: Looking for option_type='{option_type}'")
-    
-    for option in data:
-        if option.get("type") != option_type:
-            continue
-        
-        exp_date = parse_expiration_date(option["expiration"])
-        days_to_exp = (exp_date - today).days
-        
-        if not (min_days <= days_to_exp <= max_days):
-            continue
-        
-        strike = float(option["strike"])
-        
-        # Calculate OTM percentage
-        if option_type == "call":
-            otm_pct = ((strike - current_price) / current_price)
-        else:
-            otm_pct = ((current_price - strike) / current_price)
-        
-        if not (otm_min_pct <= otm_pct <= otm_max_pct):
-            continue
-        
-        volume = int(option.get("volume", 0))
-        if volume < min_volume:
-            continue
-        
-        oi = int(option.get("open_interest", 0))
-        if oi < min_oi:
-            continue
-        
-        delta = float(option.get("delta", 0))
-        iv = float(option.get("implied_volatility", 0))
-        bid = float(option.get("bid", 0))
-        
-        shorts.append((
-            option["expiration"],
-            strike,
-            bid,
-            delta,
-            iv,
-            days_to_exp,
-            oi,
-            volume
-        ))
-    
-    # Sort by delta closest to target
-    return sorted(shorts, key=lambda x: abs(x[3] - target_delta))
-
-def calculate_pop(S: float, K: float, T: float, r: float, sigma: float, option_type: str, breakeven: float = None) -> float:
+    With a session_id (and SCAN_SESSION_TTL on) each symbol's chain and its
+    candidate index are kept for the session, and rescans reuse them instead
+    of fetching, parsing and filtering again (see scan_session.py).
+    
+    With SCAN_PROCESS_WORKERS set, chains outside a session are screened on
+    the process pool (see scan_pool.py), several symbols at once.
+    
+    Yields (symbol, price, {key: opportunities}, {key: error}) as soon as each
+    symbol is screened, in input order. A filter that failed has an error and
+    no opportunities; a failed fetch is an error for every filter.
     """
-    Calculate Probability of Profit using Black-Scholes
+    for key, params in filters.items():
+        logger.info(f"🎯 Strategy [{key}]: {params['type_of_trade']} → "
+                    f"option_type='{strategy_option_type(params['type_of_trade'])}'")
     
-    Args:
-        S: Current stock price
-        K: Strike price (or short strike for puts)
-        T: Time to expiration (years)
-        r: Risk-free rate
-        sigma: Implied volatility
-        option_type: 'call' or 'put'
-        breakeven: Breakeven price for PMCP (puts only) - if provided, calculates probability of reaching breakeven instead of short strike
+    # Fetches run ahead on a thread pool; screening happens here in symbol order
+    fetcher = {
+        'snapshot': fetch_symbol_data_from_snapshot,
+        'store': fetch_symbol_data_from_store,
+    }.get(data_source, fetch_symbol_data)
+    route = metrics.current_route()
     
-    Returns:
-        Probability as decimal (0-1)
+    sessions = scan_sessions if session_id else None
     
-    For PMCC (calls): Probability stock stays below short strike (max profit zone)
-    For PMCP (puts): Probability stock stays below breakeven (actual profit zone) if breakeven provided, otherwise below short strike
-    """
-    if sigma == 0 or T == 0:
-        return 1.0 if (S < K if option_type == "call" else S > K) else 0.0
+    def timed_fetch(symbol):
+        # Fetch threads do DB work on behalf of the route that started the scan
+        metrics.set_route(route)
+        if sessions is not None:
+            candidates = sessions.get(session_id, data_source, symbol)
+            metrics.inc('scan_session_symbols_total', outcome='miss' if candidates is None else 'hit')
+            if candidates is not None:
+                return candidates
+        with metrics.timer('fetch_seconds', source=data_source):
+            return fetcher(symbol)
     
-    # For puts with breakeven (PMCP strategy), use breakeven for accurate profit probability
-    strike_to_use = breakeven if (option_type == "put" and breakeven is not None) else K
+    def screen(symbol, fetched):
+        """(price, (found, errors)) - or (price, future of them) when the process pool screens it"""
+        try:
+            candidates = fetched.result()
+            if not isinstance(candidates, SymbolCandidates):
+                price, options = candidates
+                with metrics.timer('scan_stage_seconds', stage='parse_chain'):
+                    chain = as_option_chain(options)
+                candidates = SymbolCandidates(symbol, price, chain) if sessions is not None else None
+                if candidates is not None:
+                    sessions.put(session_id, data_source, symbol, candidates)
+        except Exception as e:
+            logger.error(f"❌ Error processing {symbol}: {str(e)}")
+            return None, ({}, {key: str(e) for key in filters})
+        
+        if candidates is not None:
+            price, chain, as_of = candidates.price, candidates.chain, candidates.as_of
+        else:
+            as_of = datetime.now()
+            if scan_pool is not None:
+                return price, scan_pool.submit(symbol, price, chain, filters, as_of, data_source)
+        
+        found, errors = {}, {}
+        for key, params in filters.items():
+            try:
+                with metrics.timer('scan_symbol_seconds', source=data_source):
+                    found[key] = scan_symbol(symbol, price, chain, as_of=as_of,
+                                             candidates=candidates, **params)
+            except Exception as e:
+                logger.error(f"❌ Error processing {symbol} [{key}]: {str(e)}")
+                errors[key] = str(e)
+        return price, (found, errors)
     
-    d2 = (math.log(S / strike_to_use) + (r - 0.5 * sigma**2) * T) / (sigma * math.sqrt(T))
+    def result(symbol, price, outcome):
+        if isinstance(outcome, Future):
+            try:
+                outcome = outcome.result()
+            except Exception as e:
+                logger.error(f"❌ Error processing {symbol}: {str(e)}")
+                price, outcome = None, ({}, {key: str(e) for key in filters})
+        found, errors = outcome
+        if price is None:
+            metrics.inc('scan_symbols_total', source=data_source, outcome='error')
+            return symbol, None, found, errors
+        metrics.inc('scan_symbols_total', source=data_source, outcome='error' if errors else 'ok')
+        metrics.inc('scan_opportunities_total', sum(map(len, found.values())), source=data_source)
+        return symbol, price, found, errors
     
-    if option_type == "call":
-        return norm.cdf(-d2)  # Probability stock stays below strike
-    else:
-        return norm.cdf(d2)   # Probability stock stays below breakeven (or strike if no breakeven)
+    # Symbols on the process pool screen concurrently; results are still yielded in input order
+    in_flight = scan_pool.workers * 2 if scan_pool is not None else 0
+    pending = deque()
+    try:
+        for symbol, fetched in iter_fetched_symbols(symbols, fetcher=timed_fetch):
+            pending.append((symbol, *screen(symbol, fetched)))
+            while pending and (len(pending) > in_flight or not isinstance(pending[0][2], Future)
+                               or pending[0][2].done()):
+                yield result(*pending.popleft())
+        while pending:
+            yield result(*pending.popleft())
+    finally:
+        # Consumer stopped early - drop screening nobody will read
+        for _, _, outcome in pending:
+            if isinstance(outcome, Future):
+                outcome.cancel()
 
-def scan_opportunities_alphavantage(
+def iter_scan_alphavantage(
     symbols: List[str],
     type_of_trade: str = 'Poor Mans Covered Call',
     leaps_min_days: int = 365,
@@ -282,136 +556,58 @@ def scan_opportunities_alphavantage(
     short_min_volume: int = 10,
     max_net_debit: float = 5000.0,
     max_trades: int = 500,
-    risk_free_rate: float = 0.05
-) -> List[Dict]:
+    risk_free_rate: float = 0.05,
+    data_source: str = 'live',
+    session_id: Optional[str] = None
+):
     """
-    Scan for PMCC/PMCP opportunities using Alpha Vantage API
+    Scan for PMCC/PMCP opportunities using Alpha Vantage API, one symbol at a time
     
-    Returns list of opportunities with all metrics calculated
+    A single-filter iter_scan_filters; data_source and session_id are passed through.
+    
+    Yields (symbol, price, opportunities, error) as soon as each symbol is
+    screened, in input order. opportunities holds that symbol's best
+    max_trades pairs sorted by ROC; error is the failure message or None.
     """
-    option_type = "call" if type_of_trade == 'Poor Mans Covered Call' else "put"
-    leaps_target_delta = 0.8 if option_type == "call" else -0.8
-    short_target_delta = 0.3 if option_type == "call" else -0.3
+    params = {
+        'type_of_trade': type_of_trade,
+        'leaps_min_days': leaps_min_days, 'leaps_max_days': leaps_max_days,
+        'leaps_itm_min_pct': leaps_itm_min_pct, 'leaps_itm_max_pct': leaps_itm_max_pct,
+        'leaps_min_oi': leaps_min_oi, 'leaps_min_volume': leaps_min_volume,
+        'short_min_days': short_min_days, 'short_max_days': short_max_days,
+        'short_otm_min_pct': short_otm_min_pct, 'short_otm_max_pct': short_otm_max_pct,
+        'short_min_oi': short_min_oi, 'short_min_volume': short_min_volume,
+        'max_net_debit': max_net_debit, 'max_trades': max_trades,
+        'risk_free_rate': risk_free_rate
+    }
     
-    # Debug: Log the strategy type
-    logger.info(f"🎯 Strategy: {type_of_trade} → option_type='{option_type}'")
-    logger.info(f"🎯 Target deltas: LEAPS={leaps_target_delta}, SHORT={short_target_delta}")
+    for symbol, price, found, errors in iter_scan_filters(symbols, {'scan': params}, data_source, session_id):
+        error = errors.get('scan')
+        if error is not None:
+            yield symbol, None, [], error
+        else:
+            yield symbol, price, found['scan'], None
+
+def scan_opportunities_alphavantage(symbols: List[str], max_trades: int = 500, **scan_params) -> List[Dict]:
+    """
+    Scan for PMCC/PMCP opportunities using Alpha Vantage API
     
-    opportunities = []
-    errors = []
+    Takes the same arguments as iter_scan_alphavantage.
     
-    for symbol in symbols:
-        try:
-            logger.info(f"🔍 Fetching data for {symbol}...")
-            
-            # Fetch current price
-            price = fetch_last_price(symbol)
-            logger.info(f"💰 {symbol} price: ${price:.2f}")
-            
-            # Fetch options chain
-            options = fetch_options_data(symbol)
-            logger.info(f"📊 Fetched {len(options)} options for {symbol}")
-            
-            # Find qualifying LEAPS
-            leaps = find_leaps(
-                options, price, leaps_min_days, leaps_max_days,
-                leaps_itm_min_pct, leaps_itm_max_pct,
-                leaps_min_oi, leaps_min_volume,
-                option_type, leaps_target_delta
-            )
-            logger.info(f"✅ Found {len(leaps)} qualifying LEAPS")
-            
-            # Find qualifying shorts
-            shorts = find_shorts(
-                options, price, short_min_days, short_max_days,
-                short_otm_min_pct, short_otm_max_pct,
-                short_min_oi, short_min_volume,
-                option_type, short_target_delta
-            )
-            logger.info(f"✅ Found {len(shorts)} qualifying shorts")
-            
-            # Match LEAPS with shorts
-            for leap, short in product(leaps[:50], shorts[:50]):
-                leaps_exp, leaps_strike, leaps_ask, leaps_delta, leaps_oi, leaps_volume = leap
-                short_exp, short_strike, short_bid, short_delta, short_iv, days_to_exp, short_oi, short_volume = short
-                
-                # Calculate costs
-                leaps_cost = leaps_ask * 100
-                short_premium = short_bid * 100
-                net_debit = leaps_cost - short_premium
-                net_debit_pct = net_debit / (price * 100)
-                
-                # Check net debit threshold (dollar amount)
-                if net_debit > 0 and net_debit <= max_net_debit:
-                    # Calculate max profit
-                    if option_type == "call":
-                        max_profit = (short_strike - leaps_strike) * 100 - net_debit
-                    else:
-                        max_profit = (leaps_strike - short_strike) * 100 - net_debit
-                    
-                    # Calculate ROC based on max profit
-                    roc_pct = (max_profit / net_debit) * 100 if net_debit > 0 else 0
-                    
-                    # Calculate breakeven
-                    if option_type == "call":
-                        breakeven = leaps_strike + (net_debit / 100)
-                    else:
-                        breakeven = leaps_strike - (net_debit / 100)
-                    
-                    # Calculate POP
-                    T = days_to_exp / 365.0
-                    # For PMCP (puts): Pass breakeven to calculate actual profit probability
-                    if option_type == "put":
-                        pop = calculate_pop(price, short_strike, T, risk_free_rate, short_iv, option_type, breakeven)
-                    else:
-                        pop = calculate_pop(price, short_strike, T, risk_free_rate, short_iv, option_type)
-                    pop_pct = pop * 100
-                    
-                    # Calculate position delta
-                    if option_type == "call":
-                        position_delta = leaps_delta - short_delta
-                    else:
-                        position_delta = leaps_delta + short_delta
-                    
-                    opportunities.append({
-                        "symbol": symbol,
-                        "price": price,
-                        "underlying_price": price,  # Add for frontend compatibility
-                        "leaps_exp": leaps_exp,
-                        "leaps_strike": leaps_strike,
-                        "leaps_cost": leaps_cost,
-                        "leaps_price": leaps_ask,  # Add for frontend display
-                        "leaps_delta": leaps_delta,
-                        "leaps_oi": leaps_oi,
-                        "leaps_volume": leaps_volume,
-                        "short_exp": short_exp,
-                        "short_strike": short_strike,
-                        "short_premium": short_premium,
-                        "short_price": short_bid,  # Add for frontend display
-                        "short_delta": short_delta,
-                        "short_iv": short_iv,
-                        "short_oi": short_oi,
-                        "short_volume": short_volume,
-                        "net_debit": net_debit,
-                        "net_debit_pct": net_debit_pct * 100,
-                        "max_profit": max_profit,
-                        "roc_pct": roc_pct,
-                        "pop_pct": pop_pct,
-                        "position_delta": position_delta,
-                        "breakeven": breakeven,
-                        "type_of_trade": type_of_trade
-                    })
-        
-        except Exception as e:
-            error_msg = f"Error processing {symbol}: {str(e)}"
-            logger.error(f"❌ {error_msg}")
-            errors.append({"symbol": symbol, "error": str(e)})
+    Returns list of opportunities with all metrics calculated
+    """
+    # Only the best max_trades by ROC are held while symbols stream in
+    best = TopK(max_trades, key=attrgetter('roc_pct'))
+    errors = []
     
-    # Sort by ROC
-    opportunities.sort(key=lambda x: x["roc_pct"], reverse=True)
+    for symbol, price, symbol_opportunities, error in iter_scan_alphavantage(
+            symbols, max_trades=max_trades, **scan_params):
+        if error is not None:
+            errors.append({"symbol": symbol, "error": error})
+        else:
+            best.extend(symbol_opportunities)
     
-    # Limit results
-    opportunities = opportunities[:max_trades]
+    opportunities = best.items()
     
     logger.info(f"🎯 Total opportunities found: {len(opportunities)}")
     
@@ -419,60 +615,58 @@ def scan_opportunities_alphavantage(
 
 def initialize_default_filter():
     """Create default filter if none exists"""
-    conn = psycopg2.connect(DB_URL)
-    cur = conn.cursor()
-    
-    # Check if any non-deprecated filters exist
-    cur.execute("SELECT COUNT(*) FROM strategy_filter_criteria WHERE is_deprecated = FALSE")
-    count = cur.fetchone()[0]
-    
-    if count == 0:
-        logger.info("📝 Creating default strategy filter...")
-        cur.execute("""
-            INSERT INTO strategy_filter_criteria (
-                filter_criteria_name, leaps_min_days, leaps_max_days,
-                leaps_min_delta, leaps_min_itm_percent, leaps_max_itm_percent,
-                short_min_days, short_max_days,
-                short_min_otm_percent, short_max_otm_percent,
-                leaps_open_interest_min, short_open_interest_min,
-                leaps_volume_min, short_volume_min,
-                max_net_debit_pct, max_trades, risk_free_rate,
-                type_of_trade, is_active, is_deprecated, 
-                last_accessed_timestamp, date_created, date_modified
-            ) VALUES (
-                'Default PMCC Filter', 180, 730,
-                0.70, 10.0, 50.0,
-                30, 45,
-                3.0, 20.0,
-                10, 10,
-                10, 10,
-                5000.0, 5, 0.045,
-                'Poor Mans Covered Call', TRUE, FALSE,
-                CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
-        logger.info("✅ Default filter created")
-    
-    cur.close()
-    conn.close()
+    with db_pool.connection() as conn:
+        cur = conn.cursor()
+        
+        # Check if any non-deprecated filters exist
+        cur.execute("SELECT COUNT(*) FROM strategy_filter_criteria WHERE is_deprecated = FALSE")
+        count = cur.fetchone()[0]
+        
+        if count == 0:
+            logger.info("📝 Creating default strategy filter...")
+            cur.execute("""
+                INSERT INTO strategy_filter_criteria (
+                    filter_criteria_name, leaps_min_days, leaps_max_days,
+                    leaps_min_delta, leaps_min_itm_percent, leaps_max_itm_percent,
+                    short_min_days, short_max_days,
+                    short_min_otm_percent, short_max_otm_percent,
+                    leaps_open_interest_min, short_open_interest_min,
+                    leaps_volume_min, short_volume_min,
+                    max_net_debit_pct, max_trades, risk_free_rate,
+                    type_of_trade, is_active, is_deprecated, 
+                    last_accessed_timestamp, date_created, date_modified
+                ) VALUES (
+                    'Default PMCC Filter', 180, 730,
+                    0.70, 10.0, 50.0,
+                    30, 45,
+                    3.0, 20.0,
+                    10, 10,
+                    10, 10,
+                    5000.0, 5, 0.045,
+                    'Poor Mans Covered Call', TRUE, FALSE,
+                    CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+            logger.info("✅ Default filter created")
+        
+        cur.close()
 
 def get_active_filter():
     """Get the currently active filter criteria"""
     try:
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT * FROM strategy_filter_criteria 
-            WHERE is_active = TRUE AND is_deprecated = FALSE
-            ORDER BY last_accessed_timestamp DESC
-            LIMIT 1
-        """)
-        
-        filter_criteria = cur.fetchone()
-        cur.close()
-        conn.close()
+        with db_pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            
+            cur.execute("""
+                SELECT * FROM strategy_filter_criteria 
+                WHERE is_active = TRUE AND is_deprecated = FALSE
+                ORDER BY last_accessed_timestamp DESC
+                LIMIT 1
+            """)
+            
+            filter_criteria = cur.fetchone()
+            cur.close()
         
         if not filter_criteria:
             logger.warning("⚠️  No active filter found, initializing default...")
@@ -499,42 +693,51 @@ def screener(symbol, underlying_price, filter_criteria, options_data=None):
     """
     logger.info(f"🔍 Starting screening for {symbol}")
     
-    opportunities = []
+    # Best opportunities by ROC over every LEAP (all of them without max_trades)
+    best = TopK(filter_criteria.get('max_trades') or None, key=attrgetter('roc_pct'))
     rejection_stats = {
         'total_calls': 0,
         'leaps_rejections': {'days': 0, 'delta': 0, 'itm': 0, 'oi': 0, 'volume': 0},
         'short_rejections': {'days': 0, 'otm': 0, 'oi': 0, 'volume': 0},
-        'match_rejections': {'net_debit': 0, 'delta_comparison': 0}
+        'match_rejections': {'net_debit': 0, 'delta_comparison': 0},
+        'pair_enumeration': {'pruned': 0, 'evaluated': 0}
     }
     
+    # Days to expiration are computed once per expiration here and reused for every pair
+    today = datetime.now().date()
+    
     # Use in-memory data if provided
     if options_data is not None:
         all_calls = [opt for opt in options_data 
                      if opt.get('option_type') == 'CALL' 
-                     and opt.get('expiration_date') >= datetime.now().date()]
+                     and opt.get('expiration_date') >= today]
         logger.info(f"📊 Found {len(all_calls)} total CALL options")
     else:
         # Query from database
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            SELECT * FROM options_data 
-            WHERE symbol = %s 
-            AND option_type = 'CALL'
-            AND expiration_date >= CURRENT_DATE
-            ORDER BY expiration_date, strike_price
-        """, (symbol,))
-        all_calls = cur.fetchall()
-        cur.close()
-        conn.close()
+        with db_pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            # Only the latest stored snapshot for the symbol
+            cur.execute("""
+                SELECT * FROM options_data 
+                WHERE symbol = %s 
+                AND option_type = 'CALL'
+                AND expiration_date >= CURRENT_DATE
+                AND data_timestamp = (SELECT MAX(data_timestamp) FROM options_data WHERE symbol = %s)
+                ORDER BY expiration_date, strike_price
+            """, (symbol, symbol))
+            all_calls = cur.fetchall()
+            cur.close()
         logger.info(f"📊 Queried {len(all_calls)} CALL options from database")
     
     rejection_stats['total_calls'] = len(all_calls)
     
+    # A chain has a few dozen expirations; days to each are computed once for both leg filters
+    days_by_expiration = {exp: (exp - today).days for exp in {opt['expiration_date'] for opt in all_calls}}
+    
     # Filter LEAPS (Long calls)
     leaps = []
     for opt in all_calls:
-        days_to_exp = (opt['expiration_date'] - datetime.now().date()).days
+        days_to_exp = days_by_expiration[opt['expiration_date']]
         
         # Check DTE criteria
         if not (filter_criteria['leaps_min_days'] <= days_to_exp <= filter_criteria['leaps_max_days']):
@@ -564,14 +767,14 @@ def screener(symbol, underlying_price, filter_criteria, options_data=None):
             rejection_stats['leaps_rejections']['volume'] += 1
             continue
         
-        leaps.append(opt)
+        leaps.append((opt, days_to_exp))
     
     logger.info(f"✅ Found {len(leaps)} qualifying LEAPS out of {len(all_calls)} total")
     
     # Filter SHORT calls
     short_calls = []
     for opt in all_calls:
-        days_to_exp = (opt['expiration_date'] - datetime.now().date()).days
+        days_to_exp = days_by_expiration[opt['expiration_date']]
         
         # Check DTE criteria
         if not (filter_criteria['short_min_days'] <= days_to_exp <= filter_criteria['short_max_days']):
@@ -596,35 +799,40 @@ def screener(symbol, underlying_price, filter_criteria, options_data=None):
             rejection_stats['short_rejections']['volume'] += 1
             continue
         
-        short_calls.append(opt)
+        short_calls.append((opt, days_to_exp))
     
     logger.info(f"✅ Found {len(short_calls)} qualifying SHORT calls out of {len(all_calls)} total")
     
     # Match LEAPS with SHORT calls
-    for leap in leaps:
-        best_matches = []
-        
-        for short in short_calls:
-            # Ensure short expires before LEAP
-            if short['expiration_date'] >= leap['expiration_date']:
-                continue
-            
-            # Ensure short strike > leap strike
-            if float(short['strike_price']) <= float(leap['strike_price']):
-                continue
+    # For SHORT (we're selling): use BID price
+    short_credits = [float(short.get('bid', short.get('mark_price', 0))) for short, _ in short_calls]
+    # Shorts must expire before the LEAP at a higher strike; the index skips every pair outside those bounds
+    short_index = ShortLegIndex(
+        [short['expiration_date'] for short, _ in short_calls],
+        [float(short['strike_price']) for short, _ in short_calls],
+        short_credits
+    )
+    
+    for leap, leap_days in leaps:
+        best_matches = TopK(5, key=attrgetter('roc_pct'))
+        
+        # For LEAP (we're buying): use ASK price
+        leap_cost = float(leap.get('ask', leap.get('mark_price', 0)))
+        feasible, over_cap = short_index.feasible(
+            leap['expiration_date'], float(leap['strike_price']), leap_cost, filter_criteria['max_net_debit_pct'])
+        # Pairs over the net debit cap are not returned, only counted as net_debit rejections
+        rejection_stats['match_rejections']['net_debit'] += over_cap
+        rejection_stats['pair_enumeration']['pruned'] += len(short_calls) - len(feasible) - over_cap
+        rejection_stats['pair_enumeration']['evaluated'] += len(feasible)
+        
+        for position in feasible:
+            short, short_days = short_calls[position]
             
             # Calculate net debit
-            # For LEAP (we're buying): use ASK price
-            leap_cost = float(leap.get('ask', leap.get('mark_price', 0)))
-            # For SHORT (we're selling): use BID price
-            short_credit = float(short.get('bid', short.get('mark_price', 0)))
+            short_credit = short_credits[position]
+            # Within max net debit (dollar amount per contract = price per share): feasible checked it
             net_debit = leap_cost - short_credit
             
-            # Check max net debit (dollar amount per contract = price per share)
-            if net_debit > filter_criteria['max_net_debit_pct']:
-                rejection_stats['match_rejections']['net_debit'] += 1
-                continue
-            
             # Calculate net debit percentage for display
             if underlying_price > 0:
                 net_debit_pct = (net_debit / underlying_price)
@@ -649,64 +857,58 @@ def screener(symbol, underlying_price, filter_criteria, options_data=None):
             
             # Calculate POP using Black-Scholes for accuracy
             # Get short expiration in years
-            days_to_exp = (short['expiration_date'] - datetime.now().date()).days
-            T = days_to_exp / 365.0
+            T = short_days / 365.0
             
             # Get implied volatility from short option
             sigma = float(short.get('implied_volatility', 0.30))
             
             # Calculate POP using Black-Scholes
             # For PUT: POP = probability stock stays above short strike
-            pop = calculate_pop(
-                S=underlying_price,
-                K=float(short['strike_price']),
-                T=T,
-                r=filter_criteria['risk_free_rate'],
-                sigma=sigma,
-                option_type="put"  # PMCP uses puts
+            # Depends only on the short, so it is memoized across every LEAP it pairs with
+            pop = short_leg_pop(
+                float(underlying_price),
+                float(short['strike_price']),
+                T,
+                float(filter_criteria['risk_free_rate']),
+                sigma,
+                "put"  # PMCP uses puts
             )
             pop_pct = pop * 100
             
-            opportunity = {
-                'symbol': symbol,
-                'underlying_price': underlying_price,
-                'leaps_strike': float(leap['strike_price']),
-                'leaps_price': leap_cost,
-                'leaps_expiration': leap['expiration_date'].strftime('%Y-%m-%d'),
-                'leaps_days_to_expiration': (leap['expiration_date'] - datetime.now().date()).days,
-                'leaps_delta': leap_delta,
-                'leaps_open_interest': leap.get('open_interest', 0),
-                'leaps_volume': leap.get('volume', 0),
-                'short_strike': float(short['strike_price']),
-                'short_price': short_credit,
-                'short_expiration': short['expiration_date'].strftime('%Y-%m-%d'),
-                'short_days_to_expiration': (short['expiration_date'] - datetime.now().date()).days,
-                'short_delta': short_delta,
-                'short_iv': float(short.get('implied_volatility', 0)),
-                'short_open_interest': short.get('open_interest', 0),
-                'short_volume': short.get('volume', 0),
-                'net_debit': net_debit,
-                'net_debit_pct': net_debit_pct * 100,
-                'max_profit': max_profit,
-                'roc_pct': roc_pct,
-                'pop_pct': pop_pct,
-                'position_delta': position_delta,
-                'breakeven': breakeven,
-                'type_of_trade': filter_criteria['type_of_trade']
-            }
+            opportunity = Opportunity(
+                symbol=symbol,
+                underlying_price=underlying_price,
+                leaps_strike=float(leap['strike_price']),
+                leaps_price=leap_cost,
+                leaps_expiration=leap['expiration_date'].strftime('%Y-%m-%d'),
+                leaps_days_to_expiration=leap_days,
+                leaps_delta=leap_delta,
+                leaps_open_interest=leap.get('open_interest', 0),
+                leaps_volume=leap.get('volume', 0),
+                short_strike=float(short['strike_price']),
+                short_price=short_credit,
+                short_expiration=short['expiration_date'].strftime('%Y-%m-%d'),
+                short_days_to_expiration=short_days,
+                short_delta=short_delta,
+                short_iv=float(short.get('implied_volatility', 0)),
+                short_open_interest=short.get('open_interest', 0),
+                short_volume=short.get('volume', 0),
+                net_debit=net_debit,
+                net_debit_pct=net_debit_pct * 100,
+                max_profit=max_profit,
+                roc_pct=roc_pct,
+                pop_pct=pop_pct,
+                position_delta=position_delta,
+                breakeven=breakeven,
+                type_of_trade=filter_criteria['type_of_trade']
+            )
             
-            best_matches.append(opportunity)
+            best_matches.push(opportunity)
         
-        # Sort by ROC and take top 5 per LEAP
-        best_matches.sort(key=lambda x: x['roc_pct'], reverse=True)
-        opportunities.extend(best_matches[:5])
-    
-    # Sort all opportunities by ROC
-    opportunities.sort(key=lambda x: x['roc_pct'], reverse=True)
+        # Top 5 per LEAP by ROC
+        best.extend(best_matches.items())
     
-    # Limit to max_trades
-    if filter_criteria.get('max_trades'):
-        opportunities = opportunities[:filter_criteria['max_trades']]
+    opportunities = best.items()
     
     logger.info(f"🎯 Found {len(opportunities)} total opportunities")
     
@@ -714,7 +916,8 @@ def screener(symbol, underlying_price, filter_criteria, options_data=None):
         'total_calls': rejection_stats['total_calls'],
         'leaps_rejections': rejection_stats['leaps_rejections'],
         'short_rejections': rejection_stats['short_rejections'],
-        'match_rejections': rejection_stats['match_rejections']
+        'match_rejections': rejection_stats['match_rejections'],
+        'pair_enumeration': rejection_stats['pair_enumeration']
     }
     
     return opportunities, filtering_stats
@@ -725,16 +928,15 @@ def screener(symbol, underlying_price, filter_criteria, options_data=None):
 def get_filters():
     """Get all non-deprecated filters"""
     try:
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            SELECT * FROM strategy_filter_criteria 
-            WHERE is_deprecated = FALSE
-            ORDER BY last_accessed_timestamp DESC
-        """)
-        filters = cur.fetchall()
-        cur.close()
-        conn.close()
+        with db_pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("""
+                SELECT * FROM strategy_filter_criteria 
+                WHERE is_deprecated = FALSE
+                ORDER BY last_accessed_timestamp DESC
+            """)
+            filters = cur.fetchall()
+            cur.close()
         
         return jsonify([dict(f) for f in filters])
     except Exception as e:
@@ -745,15 +947,14 @@ def get_filters():
 def get_filter(filter_id):
     """Get specific filter by ID"""
     try:
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            SELECT * FROM strategy_filter_criteria 
-            WHERE id = %s AND is_deprecated = FALSE
-        """, (filter_id,))
-        filter_data = cur.fetchone()
-        cur.close()
-        conn.close()
+        with db_pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("""
+                SELECT * FROM strategy_filter_criteria 
+                WHERE id = %s AND is_deprecated = FALSE
+            """, (filter_id,))
+            filter_data = cur.fetchone()
+            cur.close()
         
         if filter_data:
             return jsonify(dict(filter_data))
@@ -768,74 +969,73 @@ def create_or_update_filter():
     """Create new filter or update existing one"""
     try:
         data = request.json
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        if data.get('id'):
-            # Update existing filter
-            cur.execute("""
-                UPDATE strategy_filter_criteria SET
-                    filter_criteria_name = %s,
-                    leaps_min_days = %s, leaps_max_days = %s,
-                    leaps_min_delta = %s, leaps_min_itm_percent = %s, leaps_max_itm_percent = %s,
-                    short_min_days = %s, short_max_days = %s,
-                    short_min_otm_percent = %s, short_max_otm_percent = %s,
-                    leaps_open_interest_min = %s, short_open_interest_min = %s,
-                    leaps_volume_min = %s, short_volume_min = %s,
-                    max_net_debit_pct = %s, max_trades = %s, risk_free_rate = %s,
-                    type_of_trade = %s, date_modified = CURRENT_TIMESTAMP,
-                    last_accessed_timestamp = CURRENT_TIMESTAMP
-                WHERE id = %s
-                RETURNING id
-            """, (
-                data['filter_criteria_name'],
-                data['leaps_min_days'], data['leaps_max_days'],
-                data['leaps_min_delta'], data['leaps_min_itm_percent'], 
-                data.get('leaps_max_itm_percent', 50.0),
-                data['short_min_days'], data['short_max_days'],
-                data['short_min_otm_percent'], data['short_max_otm_percent'],
-                data['leaps_open_interest_min'], data['short_open_interest_min'],
-                data['leaps_volume_min'], data['short_volume_min'],
-                data['max_net_debit_pct'], data['max_trades'], data['risk_free_rate'],
-                data['type_of_trade'], data['id']
-            ))
-            result = cur.fetchone()
-        else:
-            # Create new filter
-            cur.execute("""
-                INSERT INTO strategy_filter_criteria (
-                    filter_criteria_name, leaps_min_days, leaps_max_days,
-                    leaps_min_delta, leaps_min_itm_percent, leaps_max_itm_percent,
-                    short_min_days, short_max_days,
-                    short_min_otm_percent, short_max_otm_percent,
-                    leaps_open_interest_min, short_open_interest_min,
-                    leaps_volume_min, short_volume_min,
-                    max_net_debit_pct, max_trades, risk_free_rate,
-                    type_of_trade, is_active, is_deprecated,
-                    date_created, date_modified, last_accessed_timestamp
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, FALSE, FALSE,
-                    CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
-                )
-                RETURNING id
-            """, (
-                data['filter_criteria_name'],
-                data['leaps_min_days'], data['leaps_max_days'],
-                data['leaps_min_delta'], data['leaps_min_itm_percent'],
-                data.get('leaps_max_itm_percent', 50.0),
-                data['short_min_days'], data['short_max_days'],
-                data['short_min_otm_percent'], data['short_max_otm_percent'],
-                data['leaps_open_interest_min'], data['short_open_interest_min'],
-                data['leaps_volume_min'], data['short_volume_min'],
-                data['max_net_debit_pct'], data['max_trades'], data['risk_free_rate'],
-                data['type_of_trade']
-            ))
-            result = cur.fetchone()
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            
+            if data.get('id'):
+                # Update existing filter
+                cur.execute("""
+                    UPDATE strategy_filter_criteria SET
+                        filter_criteria_name = %s,
+                        leaps_min_days = %s, leaps_max_days = %s,
+                        leaps_min_delta = %s, leaps_min_itm_percent = %s, leaps_max_itm_percent = %s,
+                        short_min_days = %s, short_max_days = %s,
+                        short_min_otm_percent = %s, short_max_otm_percent = %s,
+                        leaps_open_interest_min = %s, short_open_interest_min = %s,
+                        leaps_volume_min = %s, short_volume_min = %s,
+                        max_net_debit_pct = %s, max_trades = %s, risk_free_rate = %s,
+                        type_of_trade = %s, date_modified = CURRENT_TIMESTAMP,
+                        last_accessed_timestamp = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                    RETURNING id
+                """, (
+                    data['filter_criteria_name'],
+                    data['leaps_min_days'], data['leaps_max_days'],
+                    data['leaps_min_delta'], data['leaps_min_itm_percent'], 
+                    data.get('leaps_max_itm_percent', 50.0),
+                    data['short_min_days'], data['short_max_days'],
+                    data['short_min_otm_percent'], data['short_max_otm_percent'],
+                    data['leaps_open_interest_min'], data['short_open_interest_min'],
+                    data['leaps_volume_min'], data['short_volume_min'],
+                    data['max_net_debit_pct'], data['max_trades'], data['risk_free_rate'],
+                    data['type_of_trade'], data['id']
+                ))
+                result = cur.fetchone()
+            else:
+                # Create new filter
+                cur.execute("""
+                    INSERT INTO strategy_filter_criteria (
+                        filter_criteria_name, leaps_min_days, leaps_max_days,
+                        leaps_min_delta, leaps_min_itm_percent, leaps_max_itm_percent,
+                        short_min_days, short_max_days,
+                        short_min_otm_percent, short_max_otm_percent,
+                        leaps_open_interest_min, short_open_interest_min,
+                        leaps_volume_min, short_volume_min,
+                        max_net_debit_pct, max_trades, risk_free_rate,
+                        type_of_trade, is_active, is_deprecated,
+                        date_created, date_modified, last_accessed_timestamp
+                    ) VALUES (
+                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                        %s, %s, %s, %s, FALSE, FALSE,
+                        CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                    )
+                    RETURNING id
+                """, (
+                    data['filter_criteria_name'],
+                    data['leaps_min_days'], data['leaps_max_days'],
+                    data['leaps_min_delta'], data['leaps_min_itm_percent'],
+                    data.get('leaps_max_itm_percent', 50.0),
+                    data['short_min_days'], data['short_max_days'],
+                    data['short_min_otm_percent'], data['short_max_otm_percent'],
+                    data['leaps_open_interest_min'], data['short_open_interest_min'],
+                    data['leaps_volume_min'], data['short_volume_min'],
+                    data['max_net_debit_pct'], data['max_trades'], data['risk_free_rate'],
+                    data['type_of_trade']
+                ))
+                result = cur.fetchone()
+            
+            conn.commit()
+            cur.close()
         
         return jsonify({'id': result['id'], 'success': True})
     except Exception as e:
@@ -846,16 +1046,15 @@ def create_or_update_filter():
 def delete_filter(filter_id):
     """Soft delete a filter by marking as deprecated"""
     try:
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE strategy_filter_criteria 
-            SET is_deprecated = TRUE, date_modified = CURRENT_TIMESTAMP
-            WHERE id = %s
-        """, (filter_id,))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE strategy_filter_criteria 
+                SET is_deprecated = TRUE, date_modified = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (filter_id,))
+            conn.commit()
+            cur.close()
         
         return jsonify({'success': True})
     except Exception as e:
@@ -866,22 +1065,21 @@ def delete_filter(filter_id):
 def activate_filter(filter_id):
     """Set a filter as active (deactivate others)"""
     try:
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor()
-        
-        # Deactivate all filters
-        cur.execute("UPDATE strategy_filter_criteria SET is_active = FALSE")
-        
-        # Activate selected filter
-        cur.execute("""
-            UPDATE strategy_filter_criteria 
-            SET is_active = TRUE, last_accessed_timestamp = CURRENT_TIMESTAMP
-            WHERE id = %s
-        """, (filter_id,))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_pool.connection() as conn:
+            cur = conn.cursor()
+            
+            # Deactivate all filters
+            cur.execute("UPDATE strategy_filter_criteria SET is_active = FALSE")
+            
+            # Activate selected filter
+            cur.execute("""
+                UPDATE strategy_filter_criteria 
+                SET is_active = TRUE, last_accessed_timestamp = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (filter_id,))
+            
+            conn.commit()
+            cur.close()
         
         return jsonify({'success': True})
     except Exception as e:
@@ -890,125 +1088,249 @@ def activate_filter(filter_id):
 
 # ============ API Route for Scanning ============
 
+class ScanRequestError(ValueError):
+    """Invalid scan request, carries the HTTP status to answer with"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def requested_profile_mode(data: Dict) -> Optional[str]:
+    """
+    Profiler mode asked for by an X-Profile header or a "profile" body field
+    
+    true/1/yes means 'sample'; 'sample' or 'cprofile' pick the mode; None = no profile.
+    """
+    value = request.headers.get('X-Profile')
+    if value is None:
+        value = (data or {}).get('profile')
+    if value is None or value is False:
+        return None
+    
+    value = str(value).strip().lower()
+    if value in ('', '0', 'false', 'no', 'off'):
+        return None
+    if not SCAN_PROFILING_ENABLED:
+        raise ScanRequestError('Profiling is disabled (SCAN_PROFILING_ENABLED=false)', 403)
+    if SCAN_PROFILE_TOKEN and not hmac.compare_digest(
+            request.headers.get('X-Profile-Token', '').encode(), SCAN_PROFILE_TOKEN.encode()):
+        raise ScanRequestError('Profiling requires a valid X-Profile-Token header', 403)
+    if value in ('1', 'true', 'yes', 'on'):
+        return 'sample'
+    if value not in PROFILE_MODES:
+        raise ScanRequestError(f"Invalid profile mode '{value}' (use true, {' or '.join(PROFILE_MODES)})")
+    return value
+
+def profile_payload(profiler: ScanProfiler) -> Dict:
+    """Profile for the response - the report inline, or the paths it was written to"""
+    if SCAN_PROFILE_DIR:
+        paths = write_profile(profiler, SCAN_PROFILE_DIR, 'scan', SCAN_PROFILE_TOP)
+        logger.info(f"🔬 Scan profile written to {paths['collapsed']}")
+        return dict(profiler.report(SCAN_PROFILE_TOP, include_collapsed=False), files=paths)
+    return profiler.report(SCAN_PROFILE_TOP)
+
+def parse_scan_source(data: Dict) -> Tuple[List[str], str]:
+    """Validate the symbols and data_source of a scan request body"""
+    data = data or {}
+    symbols = [s.strip().upper() for s in data.get('symbols', '').split(',') if s.strip()]
+    
+    if not symbols:
+        raise ScanRequestError('No symbols provided')
+    
+    data_source = data.get('data_source', 'live')
+    if data_source not in ('live', 'snapshot', 'store'):
+        raise ScanRequestError(f"Invalid data_source '{data_source}' (use 'live', 'snapshot' or 'store')")
+    
+    if data_source == 'store' and chain_snapshot_store is None:
+        raise ScanRequestError('SNAPSHOT_STORE_DIR not configured')
+    
+    if data_source == 'live' and not ALPHAVANTAGE_API_KEY:
+        raise ScanRequestError('ALPHAVANTAGE_API_KEY not configured. Please set it in your .env file.', 500)
+    
+    return symbols, data_source
+
+def requested_scan_session(data: Dict) -> Optional[str]:
+    """Scan session ID from the "session_id" body field (None = no session)"""
+    session_id = (data or {}).get('session_id')
+    if session_id is None or session_id == '':
+        return None
+    if not isinstance(session_id, str) or not SESSION_ID_PATTERN.fullmatch(session_id):
+        raise ScanRequestError('session_id must be 1-64 letters, digits, dashes or underscores')
+    return session_id
+
+def parse_scan_request(data: Dict) -> Tuple[List[str], Dict, str]:
+    """Validate a scan request body and return (symbols, filter_criteria, data_source)"""
+    data = data or {}
+    symbols, data_source = parse_scan_source(data)
+    
+    # Use filter criteria from request if provided, otherwise use active filter from database
+    filter_criteria = data.get('filter_criteria')
+    if not filter_criteria:
+        filter_criteria = get_active_filter()
+        if not filter_criteria:
+            raise ScanRequestError('No active filter found')
+    
+    return symbols, filter_criteria, data_source
+
+def scan_params_from_filter(filter_criteria: Dict) -> Dict:
+    """Map filter criteria to Alpha Vantage scan function parameters"""
+    return {
+        'type_of_trade': filter_criteria['type_of_trade'],
+        'leaps_min_days': int(filter_criteria['leaps_min_days']),
+        'leaps_max_days': int(filter_criteria.get('leaps_max_days', 730)),
+        'leaps_itm_min_pct': float(filter_criteria['leaps_min_itm_percent']) / 100,
+        'leaps_itm_max_pct': float(filter_criteria.get('leaps_max_itm_percent', 50.0)) / 100,
+        'leaps_min_oi': int(filter_criteria['leaps_open_interest_min']),
+        'leaps_min_volume': int(filter_criteria['leaps_volume_min']),
+        'short_min_days': int(filter_criteria['short_min_days']),
+        'short_max_days': int(filter_criteria['short_max_days']),
+        'short_otm_min_pct': float(filter_criteria['short_min_otm_percent']) / 100,
+        'short_otm_max_pct': float(filter_criteria['short_max_otm_percent']) / 100,
+        'short_min_oi': int(filter_criteria['short_open_interest_min']),
+        'short_min_volume': int(filter_criteria['short_volume_min']),
+        'max_net_debit': float(filter_criteria['max_net_debit_pct']),
+        'max_trades': int(filter_criteria['max_trades']),
+        'risk_free_rate': float(filter_criteria['risk_free_rate'])
+    }
+
+def get_filters_by_id(filter_ids: List[int]) -> Dict[int, Dict]:
+    """Saved (non-deprecated) filters by ID; missing IDs are left out"""
+    with db_pool.connection() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute("""
+            SELECT * FROM strategy_filter_criteria 
+            WHERE id = ANY(%s) AND is_deprecated = FALSE
+        """, (filter_ids,))
+        rows = cur.fetchall()
+        cur.close()
+    return {row['id']: dict(row) for row in rows}
+
+def parse_batch_filters(data: Dict) -> Dict[str, Dict]:
+    """
+    Resolve the "filters" of a batch scan request to {key: filter_criteria}
+    
+    Each entry is a saved filter ID (key: the ID) or an inline filter criteria
+    object (key: its filter_criteria_name, else "inline_<position>").
+    """
+    entries = (data or {}).get('filters')
+    if not entries or not isinstance(entries, list):
+        raise ScanRequestError('No filters provided')
+    if len(entries) > SCAN_BATCH_MAX_FILTERS:
+        raise ScanRequestError(f"At most {SCAN_BATCH_MAX_FILTERS} filters per batch scan")
+    
+    saved_ids = [entry for entry in entries if isinstance(entry, int) and not isinstance(entry, bool)]
+    saved = get_filters_by_id(saved_ids) if saved_ids else {}
+    
+    filters = {}
+    for position, entry in enumerate(entries, 1):
+        if isinstance(entry, dict):
+            key = str(entry.get('filter_criteria_name') or f"inline_{position}")
+            filter_criteria = entry
+        elif isinstance(entry, int) and not isinstance(entry, bool):
+            if entry not in saved:
+                raise ScanRequestError(f"Filter {entry} not found", 404)
+            key = str(entry)
+            filter_criteria = saved[entry]
+        else:
+            raise ScanRequestError('Each filter must be a saved filter ID or a filter criteria object')
+        
+        if key in filters:
+            raise ScanRequestError(f"Filter '{key}' given more than once")
+        filters[key] = filter_criteria
+    return filters
+
+def error_result(symbol: str, error: str) -> Dict:
+    """Result entry for a symbol that failed to scan"""
+    return {
+        'symbol': symbol,
+        'underlying_price': 0,
+        'opportunities_found': 0,
+        'opportunities': [],
+        'error': error
+    }
+
+def symbol_result(symbol: str, price: float, opportunities: List[Dict]) -> Dict:
+    """Result entry for one screened symbol, before the overall max_trades cut"""
+    return {
+        'symbol': symbol,
+        'underlying_price': price,
+        'opportunities_found': len(opportunities),
+        'opportunities': opportunities
+    }
+
+def build_scan_response(symbols: List[str], opportunities: List[Dict], errors: List[Dict]) -> Dict:
+    """
+    /api/scan response body: opportunities grouped per symbol in the format expected by the UI
+    
+    One pass over the opportunities; symbols keep the order of their first (best) opportunity.
+    """
+    results_by_symbol: Dict[str, Dict] = {}
+    
+    for opp in opportunities:
+        result = results_by_symbol.get(opp.symbol)
+        if result is None:
+            result = results_by_symbol[opp.symbol] = {
+                'symbol': opp.symbol,
+                'underlying_price': opp.underlying_price,
+                'opportunities_found': 0,
+                'opportunities': []
+            }
+        # Records are already in the format expected by the UI
+        result['opportunities'].append(opp)
+    
+    all_results = list(results_by_symbol.values())
+    for result in all_results:
+        result['opportunities_found'] = len(result['opportunities'])
+    
+    # Add symbols that had errors
+    for error in errors:
+        if error['symbol'] not in results_by_symbol:
+            all_results.append(error_result(error['symbol'], error['error']))
+    
+    response = {
+        'success': True,
+        'symbols_processed': len(symbols),
+        'total_opportunities': len(opportunities),
+        'results': all_results
+    }
+    
+    if errors:
+        response['errors'] = errors
+    
+    return response
+
 @app.route('/api/scan', methods=['POST'])
 def scan_opportunities():
     """Trigger scan for symbols using Alpha Vantage API"""
     try:
-        data = request.json
-        symbols = [s.strip().upper() for s in data.get('symbols', '').split(',') if s.strip()]
-        
-        if not symbols:
-            return jsonify({'error': 'No symbols provided'}), 400
-        
-        if not ALPHAVANTAGE_API_KEY:
-            return jsonify({'error': 'ALPHAVANTAGE_API_KEY not configured. Please set it in your .env file.'}), 500
-        
-        # Use filter criteria from request if provided, otherwise use active filter from database
-        filter_criteria = data.get('filter_criteria')
-        if not filter_criteria:
-            filter_criteria = get_active_filter()
-            if not filter_criteria:
-                return jsonify({'error': 'No active filter found'}), 400
+        try:
+            symbols, filter_criteria, data_source = parse_scan_request(request.json)
+            session_id = requested_scan_session(request.json)
+            profile_mode = requested_profile_mode(request.json)
+        except ScanRequestError as e:
+            return jsonify({'error': str(e)}), e.status_code
         
         logger.info(f"🚀 Starting scan for symbols: {', '.join(symbols)}")
         logger.info(f"📋 Using strategy: {filter_criteria.get('type_of_trade', 'Not specified')}")
         
-        # Map filter criteria to Alpha Vantage function parameters
-        opportunities, errors = scan_opportunities_alphavantage(
-            symbols=symbols,
-            type_of_trade=filter_criteria['type_of_trade'],
-            leaps_min_days=filter_criteria['leaps_min_days'],
-            leaps_max_days=filter_criteria.get('leaps_max_days', 730),
-            leaps_itm_min_pct=filter_criteria['leaps_min_itm_percent'] / 100,
-            leaps_itm_max_pct=filter_criteria.get('leaps_max_itm_percent', 50.0) / 100,
-            leaps_min_oi=filter_criteria['leaps_open_interest_min'],
-            leaps_min_volume=filter_criteria['leaps_volume_min'],
-            short_min_days=filter_criteria['short_min_days'],
-            short_max_days=filter_criteria['short_max_days'],
-            short_otm_min_pct=filter_criteria['short_min_otm_percent'] / 100,
-            short_otm_max_pct=filter_criteria['short_max_otm_percent'] / 100,
-            short_min_oi=filter_criteria['short_open_interest_min'],
-            short_min_volume=filter_criteria['short_volume_min'],
-            max_net_debit=filter_criteria['max_net_debit_pct'],
-            max_trades=filter_criteria['max_trades'],
-            risk_free_rate=float(filter_criteria['risk_free_rate'])
-        )
-        
-        # Format results for UI
-        all_results = []
-        symbols_with_data = set()
-        
-        for opp in opportunities:
-            symbol = opp['symbol']
-            symbols_with_data.add(symbol)
-            
-            # Find or create result entry for this symbol
-            result = next((r for r in all_results if r['symbol'] == symbol), None)
-            if not result:
-                result = {
-                    'symbol': symbol,
-                    'underlying_price': opp['price'],
-                    'opportunities_found': 0,
-                    'opportunities': []
-                }
-                all_results.append(result)
-            
-            # Add opportunity in the format expected by UI
-            # Use the max_profit already correctly calculated
+        profiler = ScanProfiler(profile_mode) if profile_mode else nullcontext()
+        with profiler:
+            opportunities, errors = scan_opportunities_alphavantage(
+                symbols=symbols,
+                data_source=data_source,
+                session_id=session_id,
+                **scan_params_from_filter(filter_criteria)
+            )
             
-            result['opportunities'].append({
-                'symbol': symbol,
-                'underlying_price': opp['price'],
-                'leaps_strike': opp['leaps_strike'],
-                'leaps_price': opp['leaps_cost'] / 100,  # Convert back to per-share
-                'leaps_expiration': opp['leaps_exp'],
-                'leaps_days_to_expiration': (parse_expiration_date(opp['leaps_exp']) - datetime.now()).days,
-                'leaps_delta': opp['leaps_delta'],
-                'leaps_open_interest': opp['leaps_oi'],
-                'leaps_volume': opp['leaps_volume'],
-                'short_strike': opp['short_strike'],
-                'short_price': opp['short_premium'] / 100,  # Convert back to per-share
-                'short_expiration': opp['short_exp'],
-                'short_days_to_expiration': (parse_expiration_date(opp['short_exp']) - datetime.now()).days,
-                'short_delta': opp['short_delta'],
-                'short_iv': opp['short_iv'],
-                'short_open_interest': opp['short_oi'],
-                'short_volume': opp['short_volume'],
-                'net_debit': opp['net_debit'],
-                'net_debit_pct': opp['net_debit_pct'],
-                'max_profit': opp['max_profit'],  # Already calculated correctly in scan_opportunities_alphavantage
-                'roc_pct': opp['roc_pct'],
-                'pop_pct': opp['pop_pct'],
-                'position_delta': opp['position_delta'],
-                'breakeven': opp['breakeven'],
-                'type_of_trade': opp['type_of_trade']
-            })
-            result['opportunities_found'] = len(result['opportunities'])
+            response = build_scan_response(symbols, opportunities, errors)
         
-        # Add symbols that had errors
-        for error in errors:
-            if error['symbol'] not in symbols_with_data:
-                all_results.append({
-                    'symbol': error['symbol'],
-                    'underlying_price': 0,
-                    'opportunities_found': 0,
-                    'opportunities': [],
-                    'error': error['error']
-                })
-        
-        response = {
-            'success': True,
-            'symbols_processed': len(symbols),
-            'total_opportunities': len(opportunities),
-            'results': all_results
-        }
-        
-        if errors:
-            response['errors'] = errors
+        if profile_mode:
+            response['profile'] = profile_payload(profiler)
         
         logger.info(f"✅ Scan complete: {len(opportunities)} opportunities found")
         
-        return jsonify(response)
+        # Encoded in one call (orjson when installed) - responses grow with the watchlist
+        return Response(dump_records(response), content_type='application/json')
         
     except Exception as e:
         logger.error(f"❌ Error scanning: {str(e)}")
@@ -1016,56 +1338,421 @@ def scan_opportunities():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-# ============ Favorites API Routes ============
-
-@app.route('/api/favorites', methods=['GET'])
-def get_favorites():
-    """Get all favorites with optional sorting and filtering"""
+@app.route('/api/scan/stream', methods=['POST'])
+def scan_opportunities_stream():
+    """
+    Scan symbols and stream results as newline-delimited JSON
+    
+    Frames, one JSON object per line:
+      {"type": "start", "symbols": [...]}
+      {"type": "symbol", ...}   one per symbol as soon as it is screened, same shape
+                                as an entry of /api/scan 'results' (with 'error' on failure)
+      {"type": "summary", ...}  totals, errors, and 'kept': how many of each symbol's
+                                opportunities survive the overall max_trades cut
+      {"type": "error", ...}    only if the scan itself fails mid-stream
+    """
     try:
-        # Get query parameters
-        sort_field_1 = request.args.get('sort_field_1', 'roc_pct')
-        sort_order_1 = request.args.get('sort_order_1', 'DESC')
-        sort_field_2 = request.args.get('sort_field_2', '')
-        sort_order_2 = request.args.get('sort_order_2', 'DESC')
-        filter_field = request.args.get('filter_field', '')
-        filter_value = request.args.get('filter_value', '')
-        
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Build query
-        query = "SELECT * FROM strategy_favorites WHERE 1=1"
-        params = []
-        
-        if filter_field and filter_value:
-            query += f" AND {filter_field} = %s"
-            params.append(filter_value)
-        
-        # Add sorting
-        order_by = []
-        if sort_field_1:
-            order_by.append(f"{sort_field_1} {sort_order_1}")
-        if sort_field_2:
-            order_by.append(f"{sort_field_2} {sort_order_2}")
+        symbols, filter_criteria, data_source = parse_scan_request(request.json)
+        session_id = requested_scan_session(request.json)
+    except ScanRequestError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    
+    scan_params = scan_params_from_filter(filter_criteria)
+    logger.info(f"🚀 Starting streamed scan for symbols: {', '.join(symbols)}")
+    logger.info(f"📋 Using strategy: {scan_params['type_of_trade']}")
+    
+    def frame(payload: Dict) -> bytes:
+        return dump_records(payload) + b'\n'
+    
+    def generate():
+        yield frame({'type': 'start', 'symbols': symbols, 'type_of_trade': scan_params['type_of_trade']})
         
-        if order_by:
-            query += " ORDER BY " + ", ".join(order_by)
+        # ROC of the streamed opportunities /api/scan would keep, in its ranking order
+        ranked = TopK(scan_params['max_trades'], key=itemgetter(0))
+        errors = []
+        try:
+            for symbol, price, opportunities, error in iter_scan_alphavantage(
+                    symbols, data_source=data_source, session_id=session_id, **scan_params):
+                if error is not None:
+                    errors.append({'symbol': symbol, 'error': error})
+                    yield frame(dict(error_result(symbol, error), type='symbol'))
+                    continue
+                
+                ranked.extend((opp.roc_pct, symbol) for opp in opportunities)
+                yield frame(dict(symbol_result(symbol, price, opportunities), type='symbol'))
+        except Exception as e:
+            logger.error(f"❌ Error in streamed scan: {str(e)}")
+            yield frame({'type': 'error', 'error': str(e)})
+            return
+        
+        # Apply the overall max_trades cut like /api/scan does
+        kept = {}
+        for _, symbol in ranked.items():
+            kept[symbol] = kept.get(symbol, 0) + 1
+        
+        logger.info(f"✅ Streamed scan complete: {sum(kept.values())} opportunities found")
+        yield frame({
+            'type': 'summary',
+            'success': True,
+            'symbols_processed': len(symbols),
+            'total_opportunities': sum(kept.values()),
+            'kept': kept,
+            'errors': errors
+        })
+    
+    return app.response_class(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/scan/batch', methods=['POST'])
+def scan_batch():
+    """
+    Scan symbols against several filters, fetching each symbol's data once
+    
+    Body: the /api/scan body with "filters": [saved filter IDs and/or inline
+    filter criteria] instead of filter_criteria. Answers {filters: [keys in
+    request order], results: {key: the /api/scan response for that filter}}.
+    """
+    try:
+        try:
+            symbols, data_source = parse_scan_source(request.json)
+            session_id = requested_scan_session(request.json)
+            filters = parse_batch_filters(request.json)
+            scan_params = {}
+            for key, filter_criteria in filters.items():
+                try:
+                    scan_params[key] = scan_params_from_filter(filter_criteria)
+                except KeyError as e:
+                    raise ScanRequestError(f"Invalid filter '{key}': missing {str(e)}")
+                except (TypeError, ValueError) as e:
+                    raise ScanRequestError(f"Invalid filter '{key}': {str(e)}")
+        except ScanRequestError as e:
+            return jsonify({'error': str(e)}), e.status_code
+        
+        logger.info(f"🚀 Starting batch scan of {len(filters)} filters for symbols: {', '.join(symbols)}")
+        
+        # Each filter keeps its own best max_trades across symbols
+        best = {key: TopK(params['max_trades'], key=attrgetter('roc_pct'))
+                for key, params in scan_params.items()}
+        errors = {key: [] for key in scan_params}
+        for symbol, price, found, symbol_errors in iter_scan_filters(symbols, scan_params, data_source, session_id):
+            for key, opportunities in found.items():
+                best[key].extend(opportunities)
+            for key, error in symbol_errors.items():
+                errors[key].append({'symbol': symbol, 'error': error})
+        
+        results = {}
+        for key, filter_criteria in filters.items():
+            result = build_scan_response(symbols, best[key].items(), errors[key])
+            result['filter_id'] = filter_criteria.get('id')
+            result['filter_criteria_name'] = filter_criteria.get('filter_criteria_name')
+            result['type_of_trade'] = scan_params[key]['type_of_trade']
+            results[key] = result
+        
+        logger.info(f"✅ Batch scan complete: " + ', '.join(
+            f"{key}: {result['total_opportunities']}" for key, result in results.items()))
+        
+        return Response(dump_records({
+            'success': True,
+            'symbols_processed': len(symbols),
+            'filters': list(filters),
+            'results': results
+        }), content_type='application/json')
         
-        cur.execute(query, params)
-        favorites = cur.fetchall()
-        cur.close()
-        conn.close()
+    except Exception as e:
+        logger.error(f"❌ Error in batch scan: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+# ============ Background Scan Jobs ============
+
+def run_scan_job(job: Dict, report: Callable[[Dict], bool]) -> Optional[Dict]:
+    """
+    Execute a queued scan job (called by ScanJobWorker)
+    
+    Each symbol's result is reported as soon as it is screened; returns the
+    /api/scan response body, or None if the job was cancelled part way.
+    """
+    job_request = job['request']
+    symbols = job_request['symbols']
+    scan_params = job_request['scan_params']
+    
+    # Same overall ranking and max_trades cut as /api/scan
+    best = TopK(scan_params['max_trades'], key=attrgetter('roc_pct'))
+    errors = []
+    for symbol, price, symbol_opportunities, error in iter_scan_alphavantage(
+            symbols, data_source=job_request['data_source'], **scan_params):
+        if error is not None:
+            errors.append({'symbol': symbol, 'error': error})
+            result = error_result(symbol, error)
+        else:
+            best.extend(symbol_opportunities)
+            result = symbol_result(symbol, price, symbol_opportunities)
         
-        # Convert Decimal to float for JSON serialization
-        result = []
-        for fav in favorites:
-            fav_dict = dict(fav)
-            for key, value in fav_dict.items():
-                if isinstance(value, Decimal):
-                    fav_dict[key] = float(value)
-            result.append(fav_dict)
+        if not report(result):
+            return None
+    
+    return build_scan_response(symbols, best.items(), errors)
+
+def scan_job_payload(job: Dict) -> Dict:
+    """Job status, progress and results as returned by the job API"""
+    total = job['symbols_total']
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'progress': {
+            'symbols_total': total,
+            'symbols_done': job['symbols_done'],
+            'current_symbol': job['current_symbol'],
+            'percent': round(job['symbols_done'] / total * 100, 1) if total else 100.0
+        },
+        'cancel_requested': job['cancel_requested'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'error': job['error'],
+        'results': job['results'],
+        'result': job['result']
+    }
+
+def start_scan_job_workers(count: int) -> List[threading.Thread]:
+    """Run job workers as daemon threads in this process"""
+    threads = []
+    for i in range(count):
+        worker = ScanJobWorker(scan_job_store, run_scan_job)
+        thread = threading.Thread(target=worker.run_forever, name=f'scan-job-worker-{i}', daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+@app.route('/api/scan/jobs', methods=['POST'])
+def submit_scan_job():
+    """Queue a scan (same body as /api/scan) and return its job ID immediately"""
+    try:
+        try:
+            symbols, filter_criteria, data_source = parse_scan_request(request.json)
+            too_long = [s for s in symbols if len(s) > MAX_SYMBOL_LENGTH]
+            if too_long:
+                raise ScanRequestError(f"Symbols longer than {MAX_SYMBOL_LENGTH} characters: {', '.join(too_long)}")
+        except ScanRequestError as e:
+            return jsonify({'error': str(e)}), e.status_code
+        
+        job = scan_job_store.submit({
+            'symbols': symbols,
+            'data_source': data_source,
+            'scan_params': scan_params_from_filter(filter_criteria)
+        }, symbols_total=len(symbols))
+        
+        logger.info(f"📬 Queued scan job {job['id']} for symbols: {', '.join(symbols)}")
+        return jsonify(scan_job_payload(job)), 202
         
-        return jsonify(result)
+    except Exception as e:
+        logger.error(f"❌ Error queueing scan job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scan/jobs/<job_id>', methods=['GET'])
+def get_scan_job(job_id):
+    """Poll a scan job: status, per-symbol progress and results"""
+    try:
+        job = scan_job_store.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(scan_job_payload(job))
+    except Exception as e:
+        logger.error(f"Error getting scan job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scan/jobs/<job_id>', methods=['DELETE'])
+def cancel_scan_job(job_id):
+    """Cancel a scan job (queued jobs stop at once, running jobs after the current symbol)"""
+    try:
+        job = scan_job_store.request_cancel(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(scan_job_payload(job))
+    except Exception as e:
+        logger.error(f"Error cancelling scan job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# ============ Favorites API Routes ============
+
+# Sortable/filterable favorites columns and the SQL type their cursor and filter values are cast to
+FAVORITE_SORT_FIELDS = {
+    'roc_pct': 'numeric',
+    'net_debit_pct': 'numeric',
+    'pop_pct': 'numeric',
+    'position_delta': 'numeric',
+    'break_even': 'numeric',
+    'leaps_strike': 'numeric',
+    'short_strike': 'numeric',
+    'symbol': 'text',
+    'date_created': 'timestamp'
+}
+FAVORITE_FILTER_FIELDS = {
+    'symbol': 'text',
+    'type_of_trade': 'text',
+    'leaps_strike': 'numeric',
+    'short_strike': 'numeric'
+}
+
+# DECIMAL columns are returned as float8 so rows serialize without a Python pass
+FAVORITE_NUMERIC_COLUMNS = (
+    'price', 'leaps_strike', 'leaps_cost', 'leaps_delta', 'short_strike', 'short_cost',
+    'short_delta', 'short_iv', 'net_debit', 'net_debit_pct', 'roc_pct', 'pop_pct',
+    'position_delta', 'break_even'
+)
+FAVORITES_SELECT = ', '.join(
+    ['id', 'symbol', 'leaps_exp', 'leaps_oi', 'leaps_volume', 'short_exp', 'short_oi',
+     'short_volume', 'type_of_trade', 'date_created']
+    + [f"{column}::float8 AS {column}" for column in FAVORITE_NUMERIC_COLUMNS]
+)
+
+# Facet index: distinct values (as text) and row counts of each filterable field,
+# kept in strategy_favorites_facets by add_favorite/delete_favorite
+FAVORITE_FACET_VALUES = "LATERAL (VALUES " + ", ".join(
+    f"('{field}', f.{field}::text)" for field in FAVORITE_FILTER_FIELDS
+) + ") AS v(field, value)"
+
+FAVORITES_PAGE_SIZE = 50
+FAVORITES_MAX_PAGE_SIZE = 500
+
+class FavoritesQueryError(ValueError):
+    """Invalid sort, filter, or cursor in a favorites query"""
+
+def encode_favorites_cursor(signature: str, row: Dict, keys: List[Tuple[str, str]]) -> str:
+    """Opaque cursor holding the last row's sort key values (as text, cast back in SQL)"""
+    values = []
+    for field, _ in keys:
+        value = row[field]
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, float):
+            value = repr(value)  # float8 repr round-trips the DECIMAL(10,4) values exactly
+        values.append(value)
+    payload = json.dumps({'s': signature, 'k': values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_favorites_cursor(cursor: str, signature: str) -> List:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        values = payload['k']
+    except (ValueError, TypeError, KeyError):
+        raise FavoritesQueryError('Invalid cursor')
+    if payload.get('s') != signature:
+        raise FavoritesQueryError('Cursor does not match the requested sort')
+    return values
+
+def keyset_condition(keys: List[Tuple[str, str]], values: List) -> Tuple[str, List]:
+    """
+    WHERE clause selecting rows after the cursor in ORDER BY keys order
+    
+    Same-direction keys use a row comparison (one index range scan); mixed
+    directions expand to (a > x) OR (a = x AND b < y) OR ...
+    """
+    casts = [f"CAST(%s AS {FAVORITE_SORT_FIELDS.get(field, 'integer')})" for field, _ in keys]
+    directions = {direction for _, direction in keys}
+    if len(directions) == 1:
+        op = '<' if directions == {'DESC'} else '>'
+        fields = ', '.join(f"f.{field}" for field, _ in keys)
+        return f"({fields}) {op} ({', '.join(casts)})", list(values)
+    
+    clauses, params = [], []
+    for i, (field, direction) in enumerate(keys):
+        terms = [f"f.{keys[j][0]} = {casts[j]}" for j in range(i)]
+        terms.append(f"f.{field} {'<' if direction == 'DESC' else '>'} {casts[i]}")
+        clauses.append('(' + ' AND '.join(terms) + ')')
+        params.extend(values[:i + 1])
+    return '(' + ' OR '.join(clauses) + ')', params
+
+def build_favorites_query(args) -> Tuple[str, List, List[Tuple[str, str]], str, int]:
+    """Validate favorites query args and return (sql, params, order keys, cursor signature, limit)"""
+    keys = []
+    for n in (1, 2):
+        field = args.get(f'sort_field_{n}', 'roc_pct' if n == 1 else '')
+        direction = args.get(f'sort_order_{n}', 'DESC').upper()
+        if not field:
+            continue
+        if field not in FAVORITE_SORT_FIELDS:
+            raise FavoritesQueryError(f"Invalid sort field '{field}'")
+        if direction not in ('ASC', 'DESC'):
+            raise FavoritesQueryError(f"Invalid sort order '{direction}'")
+        if field not in (key[0] for key in keys):
+            keys.append((field, direction))
+    # id breaks ties so every row has a unique position
+    keys.append(('id', keys[-1][1] if keys else 'DESC'))
+    signature = ','.join(f"{field}:{direction}" for field, direction in keys)
+    
+    try:
+        limit = int(args.get('limit', FAVORITES_PAGE_SIZE))
+    except ValueError:
+        raise FavoritesQueryError('Invalid limit')
+    limit = max(1, min(limit, FAVORITES_MAX_PAGE_SIZE))
+    
+    conditions, params = [], []
+    filter_field = args.get('filter_field', '')
+    filter_value = args.get('filter_value', '')
+    if filter_field and filter_value:
+        if filter_field not in FAVORITE_FILTER_FIELDS:
+            raise FavoritesQueryError(f"Invalid filter field '{filter_field}'")
+        conditions.append(f"f.{filter_field} = CAST(%s AS {FAVORITE_FILTER_FIELDS[filter_field]})")
+        params.append(filter_value)
+    
+    cursor = args.get('cursor')
+    if cursor:
+        condition, cursor_params = keyset_condition(keys, decode_favorites_cursor(cursor, signature))
+        conditions.append(condition)
+        params.extend(cursor_params)
+    
+    # Keys are qualified with the table alias so ORDER BY uses the indexed
+    # DECIMAL columns, not the float8 output columns of the same name
+    query = f"SELECT {FAVORITES_SELECT} FROM strategy_favorites f"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY " + ", ".join(f"f.{field} {direction}" for field, direction in keys)
+    # One extra row tells whether another page exists
+    query += " LIMIT %s"
+    params.append(limit + 1)
+    
+    return query, params, keys, signature, limit
+
+@app.route('/api/favorites', methods=['GET'])
+def get_favorites():
+    """
+    Get favorites with sorting, filtering and keyset pagination
+    
+    Query args: sort_field_1/sort_order_1, sort_field_2/sort_order_2,
+    filter_field/filter_value, limit (default 50, max 500) and cursor
+    (next_cursor from the previous page).
+    """
+    try:
+        try:
+            query, params, keys, signature, limit = build_favorites_query(request.args)
+        except FavoritesQueryError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        with db_pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                cur.execute(query, params)
+            except psycopg2.DataError as e:
+                # Filter or cursor value that doesn't cast to the column type
+                return jsonify({'error': f"Invalid filter or cursor value: {e.pgerror or e}"}), 400
+            favorites = cur.fetchall()
+            cur.close()
+        
+        has_more = len(favorites) > limit
+        favorites = favorites[:limit]
+        next_cursor = encode_favorites_cursor(signature, favorites[-1], keys) if has_more else None
+        
+        return jsonify({
+            'favorites': favorites,
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+            'limit': limit
+        })
     except Exception as e:
         logger.error(f"Error getting favorites: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -1075,39 +1762,48 @@ def add_favorite():
     """Add opportunity to favorites"""
     try:
         data = request.json
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            INSERT INTO strategy_favorites (
-                symbol, price, leaps_exp, leaps_strike, leaps_cost,
-                leaps_delta, leaps_oi, leaps_volume,
-                short_exp, short_strike, short_cost, short_delta,
-                short_iv, short_oi, short_volume,
-                net_debit, net_debit_pct, roc_pct, pop_pct,
-                position_delta, break_even, type_of_trade
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s
-            )
-            RETURNING id
-        """, (
-            data['symbol'], data['underlying_price'],
-            data['leaps_expiration'], data['leaps_strike'], data['leaps_price'],
-            data['leaps_delta'], data['leaps_open_interest'], data['leaps_volume'],
-            data['short_expiration'], data['short_strike'], -data['short_price'],
-            data['short_delta'], data['short_iv'],
-            data['short_open_interest'], data['short_volume'],
-            data['net_debit'], data['net_debit_pct'], data['roc_pct'],
-            data['pop_pct'], data['position_delta'], data['breakeven'],
-            data['type_of_trade']
-        ))
-        
-        result = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            
+            cur.execute("""
+                INSERT INTO strategy_favorites (
+                    symbol, price, leaps_exp, leaps_strike, leaps_cost,
+                    leaps_delta, leaps_oi, leaps_volume,
+                    short_exp, short_strike, short_cost, short_delta,
+                    short_iv, short_oi, short_volume,
+                    net_debit, net_debit_pct, roc_pct, pop_pct,
+                    position_delta, break_even, type_of_trade
+                ) VALUES (
+                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                    %s, %s
+                )
+                RETURNING id
+            """, (
+                data['symbol'], data['underlying_price'],
+                data['leaps_expiration'], data['leaps_strike'], data['leaps_price'],
+                data['leaps_delta'], data['leaps_open_interest'], data['leaps_volume'],
+                data['short_expiration'], data['short_strike'], -data['short_price'],
+                data['short_delta'], data['short_iv'],
+                data['short_open_interest'], data['short_volume'],
+                data['net_debit'], data['net_debit_pct'], data['roc_pct'],
+                data['pop_pct'], data['position_delta'], data['breakeven'],
+                data['type_of_trade']
+            ))
+            
+            result = cur.fetchone()
+            
+            # Count the new row in the facet index (same transaction)
+            cur.execute(f"""
+                INSERT INTO strategy_favorites_facets (field, value, count)
+                SELECT v.field, v.value, 1
+                FROM strategy_favorites f, {FAVORITE_FACET_VALUES}
+                WHERE f.id = %s
+                ON CONFLICT (field, value) DO UPDATE SET count = strategy_favorites_facets.count + 1
+            """, (result['id'],))
+            
+            conn.commit()
+            cur.close()
         
         return jsonify({'id': result['id'], 'success': True})
     except Exception as e:
@@ -1118,12 +1814,19 @@ def add_favorite():
 def delete_favorite(favorite_id):
     """Delete a favorite"""
     try:
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM strategy_favorites WHERE id = %s", (favorite_id,))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_pool.connection() as conn:
+            cur = conn.cursor()
+            # Delete the row and uncount it from the facet index in one statement
+            cur.execute(f"""
+                WITH f AS (DELETE FROM strategy_favorites WHERE id = %s RETURNING *)
+                UPDATE strategy_favorites_facets t SET count = t.count - 1
+                FROM f, {FAVORITE_FACET_VALUES}
+                WHERE t.field = v.field AND t.value = v.value
+            """, (favorite_id,))
+            if cur.rowcount:
+                cur.execute("DELETE FROM strategy_favorites_facets WHERE count <= 0")
+            conn.commit()
+            cur.close()
         
         return jsonify({'success': True})
     except Exception as e:
@@ -1132,24 +1835,74 @@ def delete_favorite(favorite_id):
 
 @app.route('/api/favorites/field-values/<field>', methods=['GET'])
 def get_favorite_field_values(field):
-    """Get distinct values for a field in favorites"""
+    """Get distinct values (and how many favorites have each) for a field in favorites"""
     try:
-        allowed_fields = ['symbol', 'leaps_strike', 'short_strike', 'type_of_trade']
-        if field not in allowed_fields:
+        if field not in FAVORITE_FILTER_FIELDS:
             return jsonify({'error': 'Invalid field'}), 400
         
-        conn = psycopg2.connect(DB_URL)
-        cur = conn.cursor()
-        cur.execute(f"SELECT DISTINCT {field} FROM strategy_favorites ORDER BY {field}")
-        values = [row[0] for row in cur.fetchall()]
-        cur.close()
-        conn.close()
-        
-        return jsonify({'values': values})
+        # Read from the facet index, never the favorites table
+        order_by = 'value::numeric' if FAVORITE_FILTER_FIELDS[field] == 'numeric' else 'value'
+        with db_pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"""
+                SELECT value, count FROM strategy_favorites_facets
+                WHERE field = %s
+                ORDER BY {order_by}
+            """, (field,))
+            facets = cur.fetchall()
+            cur.close()
+        
+        return jsonify({
+            'values': [value for value, _ in facets],
+            'counts': [count for _, count in facets]
+        })
     except Exception as e:
         logger.error(f"Error getting field values: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# ============ Rate Limiter, Cache & Database Pool Metrics ============
+
+@app.route('/api/rate-limiter/metrics', methods=['GET'])
+def get_rate_limiter_metrics():
+    """Wait time, rejected calls and backoff state of the API rate limiter"""
+    try:
+        return jsonify(api_rate_limiter.metrics())
+    except Exception as e:
+        logger.error(f"Error getting rate limiter metrics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Timers, counters and histograms summed over every worker process on this host
+    
+    JSON by default; Prometheus text format with ?format=prometheus or an
+    Accept header asking for text/plain (what Prometheus scrapers send).
+    """
+    try:
+        snapshot = metrics.registry.snapshot()
+        wanted = request.args.get('format')
+        if wanted is None:
+            accept = request.headers.get('Accept', '')
+            wanted = 'prometheus' if ('text/plain' in accept or 'openmetrics' in accept) else 'json'
+        if wanted == 'prometheus':
+            return Response(metrics.render_prometheus(snapshot),
+                            content_type='text/plain; version=0.0.4; charset=utf-8')
+        return jsonify(snapshot)
+    except Exception as e:
+        logger.error(f"Error getting metrics: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/db-pool/metrics', methods=['GET'])
+def get_db_pool_metrics():
+    """Checkouts, waits and connections in use of this worker's database pool"""
+    return jsonify(db_pool.metrics())
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss counters and memory use of the quote/option-chain cache"""
+    return jsonify(market_data_cache.stats())
+
 # ============ Main Routes ============
 
 @app.route('/', methods=['GET'])
@@ -1172,13 +1925,20 @@ def favorites_page():
     """Favorites page"""
     return render_template('favorites.html')
 
-# Initialize default filter on startup
-with app.app_context():
-    try:
-        initialize_default_filter()
-        logger.info("✅ Application initialized successfully")
-    except Exception as e:
-        logger.error(f"❌ Error initializing application: {str(e)}")
+# Startup belongs to the serving process. Scan pool workers (see scan_pool.py) re-import
+# the parent's __main__, which may be or import this module, and must skip it.
+if multiprocessing.current_process().name == 'MainProcess':
+    # Initialize default filter on startup
+    with app.app_context():
+        try:
+            initialize_default_filter()
+            logger.info("✅ Application initialized successfully")
+        except Exception as e:
+            logger.error(f"❌ Error initializing application: {str(e)}")
+    
+    # Job workers inside the web process, for deployments without a worker process
+    if SCAN_JOB_INPROCESS_WORKERS:
+        start_scan_job_workers(SCAN_JOB_INPROCESS_WORKERS)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-pair POP cost before and after the batched pricing module
+
+Run from the project root:
+    python benchmarks/bench_pricing.py
+"""
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.stats import norm
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing import probability_of_profit, short_leg_pop  # noqa: E402
+
+N_LEAPS = 50
+N_SHORTS = 50
+REPEAT = 5
+
+
+def scalar_pop(S, K, T, r, sigma, option_type, breakeven=None):
+    """The previous calculate_pop: math.log + scipy.stats.norm.cdf per call"""
+    if sigma == 0 or T == 0:
+        return 1.0 if (S < K if option_type == "call" else S > K) else 0.0
+    strike_to_use = breakeven if (option_type == "put" and breakeven is not None) else K
+    d2 = (math.log(S / strike_to_use) + (r - 0.5 * sigma**2) * T) / (sigma * math.sqrt(T))
+    return norm.cdf(-d2) if option_type == "call" else norm.cdf(d2)
+
+
+def best_of(fn, pairs):
+    """Best wall time over REPEAT runs, in nanoseconds per pair"""
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) / pairs * 1e9
+
+
+def main():
+    rng = np.random.default_rng(7)
+    S, r = 100.0, 0.045
+    short_strikes = rng.uniform(103, 120, N_SHORTS)
+    short_T = rng.integers(30, 60, N_SHORTS) / 365.0
+    short_iv = rng.uniform(0.2, 0.6, N_SHORTS)
+    breakevens = rng.uniform(60, 95, (N_LEAPS, N_SHORTS))
+    pairs = N_LEAPS * N_SHORTS
+
+    shorts = list(zip(short_strikes.tolist(), short_T.tolist(), short_iv.tolist()))
+    be_rows = breakevens.tolist()
+
+    def scalar_loop(option_type):
+        for i in range(N_LEAPS):
+            for j, (K, T, iv) in enumerate(shorts):
+                scalar_pop(S, K, T, r, iv, option_type, be_rows[i][j] if option_type == "put" else None)
+
+    def memoized_loop():
+        short_leg_pop.cache_clear()
+        for _ in range(N_LEAPS):
+            for K, T, iv in shorts:
+                short_leg_pop(S, K, T, r, iv, "call")
+
+    def batched(option_type):
+        K = np.broadcast_to(short_strikes, breakevens.shape)
+        T = np.broadcast_to(short_T, breakevens.shape)
+        iv = np.broadcast_to(short_iv, breakevens.shape)
+        probability_of_profit(S, K, T, r, iv, option_type, breakevens if option_type == "put" else None)
+
+    results = {
+        'scalar norm.cdf (call)': best_of(lambda: scalar_loop("call"), pairs),
+        'scalar norm.cdf (put, breakeven)': best_of(lambda: scalar_loop("put"), pairs),
+        'memoized short_leg_pop (call)': best_of(memoized_loop, pairs),
+        'batched ndtr (call)': best_of(lambda: batched("call"), pairs),
+        'batched ndtr (put, breakeven)': best_of(lambda: batched("put"), pairs),
+    }
+
+    print(f"POP cost per pair ({N_LEAPS} LEAPS x {N_SHORTS} shorts, best of {REPEAT})")
+    baseline = results['scalar norm.cdf (call)']
+    for name, ns in results.items():
+        print(f"  {name:<34} {ns:>10.0f} ns/pair   {baseline / ns:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
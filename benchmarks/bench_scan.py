@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Benchmark: each stage of a PMCC/PMCP scan over synthetic option chains
+
+Stages, each timed on its own over the same seeded chains:
+
+    parse_chain          Alpha Vantage list -> OptionChain columns
+    find_leaps           LEAPS leg filter on a parsed chain
+    find_shorts          short leg filter on a parsed chain
+    match_pairs          LEAPS x short pair metrics (capped at PAIR_CANDIDATE_LIMIT legs)
+    calculate_pop        scalar calculate_pop once per candidate pair
+    scan_symbol          the whole per-symbol engine (parse, filters, pairing, records)
+    screener             app.screener over options_data shaped rows
+    build_scan_response  grouping the opportunities of every symbol and encoding the JSON body
+    api_scan             POST /api/scan through the Flask test client, chains read
+                         from a temporary snapshot store (no network)
+    api_rescan           the same POST in a scan session (scan_session.py) after a
+                         first scan, with short_min_otm_percent changed each call
+
+app.py is imported, so DATABASE_URL must be set; the database need not be
+reachable. Log output below WARNING is silenced while timing. With
+--profile-dir each stage is run once more under the profiler (profiling.py)
+and its top functions and collapsed stacks are written there.
+
+Run from the project root:
+    python benchmarks/bench_scan.py [--symbols 20] [--expirations 20] [--strikes 40]
+        [--repeat 5] [--output results.json] [--compare baseline.json]
+        [--profile-dir profiles/ [--profile-mode cprofile]]
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_chain import synthetic_chain, to_options_data_rows  # noqa: E402
+
+PRICE = 100.0
+
+# Default PMCC filter (initialize_default_filter), with room for more trades per scan
+FILTER_CRITERIA = {
+    'type_of_trade': 'Poor Mans Covered Call',
+    'leaps_min_days': 180, 'leaps_max_days': 730,
+    'leaps_min_delta': 0.70, 'leaps_min_itm_percent': 10.0, 'leaps_max_itm_percent': 50.0,
+    'short_min_days': 30, 'short_max_days': 45,
+    'short_min_otm_percent': 3.0, 'short_max_otm_percent': 20.0,
+    'leaps_open_interest_min': 10, 'short_open_interest_min': 10,
+    'leaps_volume_min': 10, 'short_volume_min': 10,
+    'max_net_debit_pct': 5000.0, 'max_trades': 500, 'risk_free_rate': 0.045,
+}
+
+
+def timed(fn, repeat: int) -> dict:
+    """Wall time of repeat calls (after one warm-up), in milliseconds"""
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'best_ms': round(min(timings), 4),
+        'median_ms': round(statistics.median(timings), 4),
+        'mean_ms': round(statistics.fmean(timings), 4),
+        'repeat': repeat,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(n_symbols: int, n_expirations: int, n_strikes: int, repeat: int,
+        profile_dir: str = None, profile_mode: str = 'sample') -> dict:
+    if not os.environ.get('DATABASE_URL'):
+        sys.exit("DATABASE_URL must be set to import app.py (the database need not be reachable)")
+
+    store_dir = tempfile.TemporaryDirectory()
+    os.environ['SNAPSHOT_STORE_DIR'] = store_dir.name
+    logging.disable(logging.INFO)
+
+    import app
+    from profiling import ScanProfiler, write_profile
+    from option_chain import OptionChain
+    from pair_matching import match_pairs
+    from scanner import PAIR_CANDIDATE_LIMIT, calculate_pop, find_leaps, find_shorts, scan_symbol
+
+    symbols = [f"S{i:03d}" for i in range(n_symbols)]
+    prices = {symbol: PRICE + 5 * (n % 20) for n, symbol in enumerate(symbols)}
+    chains = {symbol: synthetic_chain(prices[symbol], seed=n, n_expirations=n_expirations,
+                                      n_strikes=n_strikes, symbol=symbol)
+              for n, symbol in enumerate(symbols)}
+    for symbol in symbols:
+        app.chain_snapshot_store.write(symbol, prices[symbol], chains[symbol])
+
+    params = app.scan_params_from_filter(FILTER_CRITERIA)
+    option_type = 'call'
+    leaps_args = (params['leaps_min_days'], params['leaps_max_days'], params['leaps_itm_min_pct'],
+                  params['leaps_itm_max_pct'], params['leaps_min_oi'], params['leaps_min_volume'],
+                  option_type, 0.8, None, PAIR_CANDIDATE_LIMIT or None)
+    shorts_args = (params['short_min_days'], params['short_max_days'], params['short_otm_min_pct'],
+                   params['short_otm_max_pct'], params['short_min_oi'], params['short_min_volume'],
+                   option_type, 0.3, None, PAIR_CANDIDATE_LIMIT or None)
+    scan_kwargs = {k: v for k, v in params.items() if k != 'type_of_trade'}
+
+    parsed = {symbol: OptionChain.from_alphavantage(chains[symbol]) for symbol in symbols}
+    legs = {}
+    for symbol in symbols:
+        leaps = find_leaps(parsed[symbol], prices[symbol], *leaps_args)
+        shorts = find_shorts(parsed[symbol], prices[symbol], *shorts_args)
+        legs[symbol] = (leaps, shorts)
+    rows = {symbol: to_options_data_rows(chains[symbol], prices[symbol]) for symbol in symbols}
+
+    def each_symbol(fn):
+        return lambda: [fn(symbol) for symbol in symbols]
+
+    def pop_per_pair(symbol):
+        leaps, shorts = legs[symbol]
+        price = prices[symbol]
+        for _ in leaps:
+            for _, strike, _, _, iv, days_to_exp, _, _ in shorts:
+                calculate_pop(price, strike, days_to_exp / 365.0, params['risk_free_rate'], iv, option_type)
+
+    opportunities = []
+    for symbol in symbols:
+        opportunities.extend(scan_symbol(symbol, prices[symbol], parsed[symbol],
+                                         FILTER_CRITERIA['type_of_trade'], **scan_kwargs))
+    opportunities.sort(key=lambda x: x.roc_pct, reverse=True)
+    opportunities = opportunities[:params['max_trades']]
+
+    client = app.app.test_client()
+    scan_body = {'symbols': ','.join(symbols), 'data_source': 'store', 'filter_criteria': FILTER_CRITERIA}
+
+    def api_scan():
+        response = client.post('/api/scan', json=scan_body)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    # Filter tuning: each rescan narrows or widens the short OTM range of the last one
+    otm_steps = itertools.cycle([3.5, 2.5, 3.0])
+
+    def api_rescan():
+        criteria = dict(FILTER_CRITERIA, short_min_otm_percent=next(otm_steps))
+        response = client.post('/api/scan', json=dict(scan_body, filter_criteria=criteria, session_id='bench'))
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    stages = {
+        'parse_chain': each_symbol(lambda s: OptionChain.from_alphavantage(chains[s])),
+        'find_leaps': each_symbol(lambda s: find_leaps(parsed[s], prices[s], *leaps_args)),
+        'find_shorts': each_symbol(lambda s: find_shorts(parsed[s], prices[s], *shorts_args)),
+        'match_pairs': each_symbol(lambda s: match_pairs(*legs[s], prices[s], option_type,
+                                                         params['max_net_debit'], params['risk_free_rate'],
+                                                         top_k=params['max_trades'])),
+        'calculate_pop': each_symbol(pop_per_pair),
+        'scan_symbol': each_symbol(lambda s: scan_symbol(s, prices[s], chains[s],
+                                                         FILTER_CRITERIA['type_of_trade'], **scan_kwargs)),
+        'screener': each_symbol(lambda s: app.screener(s, prices[s], FILTER_CRITERIA, rows[s])),
+        'build_scan_response': lambda: app.dump_records(app.build_scan_response(symbols, opportunities, [])),
+        'api_scan': api_scan,
+        'api_rescan': api_rescan,
+    }
+
+    results = {}
+    try:
+        for name, fn in stages.items():
+            results[name] = timed(fn, repeat)
+            if profile_dir:
+                with ScanProfiler(profile_mode) as profiler:
+                    fn()
+                results[name]['profile'] = write_profile(profiler, profile_dir, name)['collapsed']
+    finally:
+        logging.disable(logging.NOTSET)
+        store_dir.cleanup()
+
+    # Per-unit cost alongside the totals, so runs of different sizes stay comparable
+    pairs = sum(len(leaps) * len(shorts) for leaps, shorts in legs.values())
+    units = {'build_scan_response': ('opportunity', len(opportunities)),
+             'calculate_pop': ('pair', pairs), 'match_pairs': ('pair', pairs)}
+    for name, result in results.items():
+        unit, count = units.get(name, ('symbol', n_symbols))
+        result['unit'] = unit
+        result['units'] = count
+        result['best_us_per_unit'] = round(result['best_ms'] * 1000 / count, 4) if count else None
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'symbols': n_symbols,
+            'expirations': n_expirations,
+            'strikes': n_strikes,
+            'contracts_per_symbol': n_expirations * n_strikes * 2,
+            'candidate_pairs': pairs,
+            'opportunities': len(opportunities),
+        },
+        'stages': results,
+    }
+
+
+def print_report(report: dict, baseline: dict = None):
+    meta = report['meta']
+    print(f"Scan stages @ {meta['commit']}: {meta['symbols']} symbols x {meta['contracts_per_symbol']} contracts, "
+          f"{meta['candidate_pairs']:,} candidate pairs, {meta['opportunities']} opportunities")
+    if baseline:
+        print(f"  compared with {baseline['meta']['commit']} ({baseline['meta']['timestamp']})")
+    for name, result in report['stages'].items():
+        per_unit = result['best_us_per_unit']
+        line = f"  {name:<20} {result['best_ms']:>10.2f} ms  "
+        line += f"{per_unit:>10.2f} us/{result['unit']}" if per_unit is not None else f"{'-':>10} (no {result['unit']}s)"
+        previous = (baseline or {}).get('stages', {}).get(name)
+        if previous and previous.get('best_us_per_unit') and per_unit:
+            line += f"  {previous['best_us_per_unit'] / result['best_us_per_unit']:>6.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of a scan over synthetic chains")
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--expirations', type=int, default=20)
+    parser.add_argument('--strikes', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="Write the results as JSON here")
+    parser.add_argument('--compare', help="Earlier --output file; prints speedup per stage (per-unit cost)")
+    parser.add_argument('--profile-dir', help="Profile one extra run of each stage and write the profiles here")
+    parser.add_argument('--profile-mode', choices=('sample', 'cprofile'), default='sample')
+    args = parser.parse_args()
+
+    report = run(args.symbols, args.expirations, args.strikes, args.repeat,
+                 args.profile_dir, args.profile_mode)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
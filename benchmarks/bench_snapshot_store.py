@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: load a day of option chains from JSON vs the columnar snapshot store
+
+Writes N_SYMBOLS synthetic chains (synthetic_chain.py) both as Alpha Vantage
+JSON (list of dicts with string values) and as snapshot_store files, then
+times loading every chain into an OptionChain ready for screening, and the
+Python memory allocated while doing so.
+
+Run from the project root:
+    python benchmarks/bench_snapshot_store.py [n_symbols]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from option_chain import OptionChain  # noqa: E402
+from snapshot_store import ChainSnapshotStore  # noqa: E402
+from synthetic_chain import N_EXPIRATIONS, N_STRIKES, synthetic_chain  # noqa: E402
+
+N_SYMBOLS = 500
+
+
+def touch(chains):
+    """Read the columns the leg filters use so mapped pages are really loaded"""
+    return sum(float(np.nansum(chain.rows['delta'])) + len(chain.days_to_expiration()) for chain in chains)
+
+
+def measure(load_all):
+    """(seconds, peak MB of Python allocations) for one full load, timed without tracing"""
+    start = time.perf_counter()
+    touch(load_all())
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    touch(load_all())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main():
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else N_SYMBOLS
+    symbols = [f"S{i:03d}" for i in range(n_symbols)]
+
+    with tempfile.TemporaryDirectory() as root:
+        json_dir = os.path.join(root, 'json')
+        os.makedirs(json_dir)
+        store = ChainSnapshotStore(os.path.join(root, 'store'))
+
+        json_bytes = 0
+        for n, symbol in enumerate(symbols):
+            options = synthetic_chain(100.0 + n % 50, seed=n)
+            path = os.path.join(json_dir, f"{symbol}.json")
+            with open(path, 'w') as f:
+                json.dump(options, f)
+            json_bytes += os.path.getsize(path)
+            store.write(symbol, 100.0 + n % 50, options)
+        store_bytes = sum(os.path.getsize(os.path.join(dirpath, name))
+                          for dirpath, _, names in os.walk(store.root) for name in names)
+
+        def load_json():
+            chains = []
+            for symbol in symbols:
+                with open(os.path.join(json_dir, f"{symbol}.json")) as f:
+                    chains.append(OptionChain.from_alphavantage(json.load(f)))
+            return chains
+
+        def load_store(mmap):
+            return [store.load(symbol, mmap=mmap)[1] for symbol in symbols]
+
+        results = {
+            'JSON + from_alphavantage': measure(load_json),
+            'snapshot store (np.load)': measure(lambda: load_store(False)),
+            'snapshot store (mmap)': measure(lambda: load_store(True)),
+        }
+
+    contracts = n_symbols * N_EXPIRATIONS * N_STRIKES * 2
+    print(f"Load {n_symbols} chains ({contracts:,} contracts)")
+    print(f"  on disk: JSON {json_bytes / 1e6:.1f} MB, snapshot store {store_bytes / 1e6:.1f} MB")
+    baseline = results['JSON + from_alphavantage'][0]
+    for name, (seconds, peak_mb) in results.items():
+        print(f"  {name:<26} {seconds * 1000:>9.1f} ms  {baseline / seconds:>6.1f}x  "
+              f"peak Python allocations {peak_mb:>8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Synthetic Alpha Vantage shaped option chains for benchmarks
+
+Prices and greeks come from Black-Scholes with a volatility smile, so leg
+filters and pair matching see the same delta / moneyness / DTE spread as a
+real chain. Liquidity (volume, open interest) and bid/ask spreads thin out
+away from the money and in far expirations. Everything is seeded, so a given
+(price, seed, size) always produces the same chain.
+"""
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy.special import ndtr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing import option_delta, theoretical_value  # noqa: E402
+
+N_EXPIRATIONS = 20
+N_STRIKES = 40
+RISK_FREE_RATE = 0.045
+
+# Expiration ladder like a listed equity: weeklies, then monthlies, then quarterly LEAPS
+WEEKLY_EXPIRATIONS = 6
+MONTHLY_EXPIRATIONS = 6
+
+
+def expiration_days(n_expirations: int) -> List[int]:
+    days = []
+    for e in range(n_expirations):
+        if e < WEEKLY_EXPIRATIONS:
+            days.append(7 * (e + 1))
+        elif e < WEEKLY_EXPIRATIONS + MONTHLY_EXPIRATIONS:
+            days.append(60 + 30 * (e - WEEKLY_EXPIRATIONS))
+        else:
+            days.append(300 + 90 * (e - WEEKLY_EXPIRATIONS - MONTHLY_EXPIRATIONS))
+    return days
+
+
+def synthetic_chain(
+    price: float = 100.0,
+    seed: int = 0,
+    n_expirations: int = N_EXPIRATIONS,
+    n_strikes: int = N_STRIKES,
+    strike_range: float = 0.5,
+    base_iv: Optional[float] = None,
+    symbol: str = 'SYM',
+    today: Optional[date] = None
+) -> List[Dict]:
+    """
+    Alpha Vantage REALTIME_OPTIONS "data" list: n_expirations x n_strikes calls and puts
+
+    Strikes span price * (1 - strike_range) .. price * (1 + strike_range); all
+    values are strings, as the API returns them.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    base_iv = base_iv if base_iv is not None else rng.uniform(0.2, 0.5)
+    strikes = np.round(price * np.linspace(1 - strike_range, 1 + strike_range, n_strikes), 2)
+    log_moneyness = np.log(strikes / price)
+
+    options = []
+    for e, days in enumerate(expiration_days(n_expirations)):
+        expiration = (today + timedelta(days=days)).isoformat()
+        T = days / 365.0
+        # Skewed smile, flattening with time
+        iv = base_iv * (1 - 0.4 * log_moneyness + 1.5 * log_moneyness ** 2 / np.sqrt(T + 0.25))
+        iv = np.clip(iv * np.array([rng.uniform(0.97, 1.03) for _ in strikes]), 0.05, 3.0)
+
+        sqrt_T = np.sqrt(T)
+        d1 = (-log_moneyness + (RISK_FREE_RATE + 0.5 * iv ** 2) * T) / (iv * sqrt_T)
+        pdf = np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi)
+        gamma = pdf / (price * iv * sqrt_T)
+        vega = price * pdf * sqrt_T / 100
+        decay = -price * pdf * iv / (2 * sqrt_T)
+        discounted = strikes * np.exp(-RISK_FREE_RATE * T)
+        d2 = d1 - iv * sqrt_T
+
+        # Liquidity peaks at the money and in near expirations
+        liquidity = np.exp(-8 * log_moneyness ** 2) / (1 + 0.15 * e)
+
+        for kind in ('call', 'put'):
+            value = theoretical_value(price, strikes, T, RISK_FREE_RATE, iv, kind)
+            delta = option_delta(price, strikes, T, RISK_FREE_RATE, iv, kind)
+            if kind == 'call':
+                theta = (decay - RISK_FREE_RATE * discounted * ndtr(d2)) / 365
+                rho = discounted * T * ndtr(d2) / 100
+            else:
+                theta = (decay + RISK_FREE_RATE * discounted * ndtr(-d2)) / 365
+                rho = -discounted * T * ndtr(-d2) / 100
+
+            for i, strike in enumerate(strikes.tolist()):
+                mid = max(float(value[i]), 0.01)
+                half_spread = max(0.01, mid * rng.uniform(0.01, 0.04) / max(liquidity[i], 0.2))
+                volume = int(rng.expovariate(1 / (400 * liquidity[i] + 1)))
+                open_interest = int(rng.expovariate(1 / (4000 * liquidity[i] + 10)))
+                options.append({
+                    'contractID': f"{symbol}{expiration.replace('-', '')}{kind[0].upper()}{int(strike * 1000):08d}",
+                    'symbol': symbol,
+                    'expiration': expiration,
+                    'strike': f"{strike:.2f}",
+                    'type': kind,
+                    'last': f"{mid * rng.uniform(0.98, 1.02):.2f}",
+                    'mark': f"{mid:.2f}",
+                    'bid': f"{max(mid - half_spread, 0.0):.2f}",
+                    'bid_size': str(rng.randint(1, 200)),
+                    'ask': f"{mid + half_spread:.2f}",
+                    'ask_size': str(rng.randint(1, 200)),
+                    'volume': str(volume),
+                    'open_interest': str(open_interest),
+                    'date': today.isoformat(),
+                    'implied_volatility': f"{iv[i]:.5f}",
+                    'delta': f"{delta[i]:.5f}",
+                    'gamma': f"{gamma[i]:.5f}",
+                    'theta': f"{theta[i]:.5f}",
+                    'vega': f"{vega[i]:.5f}",
+                    'rho': f"{rho[i]:.5f}",
+                })
+    return options
+
+
+def to_options_data_rows(options: List[Dict], underlying_price: float) -> List[Dict]:
+    """The same chain as options_data rows (the shape screener() reads from Postgres)"""
+    timestamp = datetime.now()
+    return [{
+        'symbol': opt['symbol'],
+        'option_type': opt['type'].upper(),
+        'strike_price': float(opt['strike']),
+        'expiration_date': datetime.strptime(opt['expiration'], '%Y-%m-%d').date(),
+        'mark_price': float(opt['mark']),
+        'bid_price': float(opt['bid']),
+        'ask_price': float(opt['ask']),
+        'last_price': float(opt['last']),
+        'delta': float(opt['delta']),
+        'gamma': float(opt['gamma']),
+        'theta': float(opt['theta']),
+        'vega': float(opt['vega']),
+        'rho': float(opt['rho']),
+        'implied_volatility': float(opt['implied_volatility']),
+        'volume': int(opt['volume']),
+        'open_interest': int(opt['open_interest']),
+        'underlying_price': underlying_price,
+        'data_timestamp': timestamp,
+    } for opt in options]
@@ -81,8 +81,17 @@ CREATE TABLE IF NOT EXISTS strategy_favorites (
     date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Options Data Table (Optional - for storing options chain data)
--- You may already have this or use a different structure
+-- Favorites Facet Index
+-- Distinct values per filterable favorites field, maintained by add/delete favorite
+CREATE TABLE IF NOT EXISTS strategy_favorites_facets (
+    field VARCHAR(32) NOT NULL,                 -- symbol, type_of_trade, leaps_strike, short_strike
+    value TEXT NOT NULL,                        -- column value as text
+    count INTEGER NOT NULL DEFAULT 0,           -- favorites with this value
+    PRIMARY KEY (field, value)
+);
+
+-- Options Data Table
+-- Every live chain fetch is bulk-loaded here as one snapshot (shared data_timestamp)
 CREATE TABLE IF NOT EXISTS options_data (
     id SERIAL PRIMARY KEY,
     symbol VARCHAR(10) NOT NULL,
@@ -115,13 +124,57 @@ CREATE TABLE IF NOT EXISTS options_data (
     CONSTRAINT chk_option_type CHECK (option_type IN ('CALL', 'PUT'))
 );
 
+-- API Rate Limiter State Table
+-- Token bucket shared by all workers when RATE_LIMIT_BACKEND=postgres
+CREATE TABLE IF NOT EXISTS api_rate_limiter_state (
+    name VARCHAR(64) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at DOUBLE PRECISION NOT NULL,       -- Unix epoch seconds
+    backoff_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    backoff_until DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+-- Scan Jobs Table
+-- Queue for background scans (POST /api/scan/jobs), polled by scan_worker.py
+CREATE TABLE IF NOT EXISTS scan_jobs (
+    id VARCHAR(32) PRIMARY KEY,                 -- uuid4 hex
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    request JSONB NOT NULL,                     -- symbols, data_source, scan_params
+    symbols_total INTEGER NOT NULL DEFAULT 0,
+    symbols_done INTEGER NOT NULL DEFAULT 0,
+    current_symbol VARCHAR(10),
+    results JSONB NOT NULL DEFAULT '[]'::jsonb, -- per-symbol results, appended as screened
+    result JSONB,                               -- final /api/scan response body
+    error TEXT,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    worker_id VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    CONSTRAINT chk_scan_job_status CHECK (status IN ('queued', 'running', 'completed', 'failed', 'cancelled'))
+);
+
 -- Indexes for Performance
 CREATE INDEX IF NOT EXISTS idx_strategy_filter_active ON strategy_filter_criteria(is_active, is_deprecated);
-CREATE INDEX IF NOT EXISTS idx_strategy_favorites_symbol ON strategy_favorites(symbol);
-CREATE INDEX IF NOT EXISTS idx_strategy_favorites_roc ON strategy_favorites(roc_pct DESC);
-CREATE INDEX IF NOT EXISTS idx_strategy_favorites_type ON strategy_favorites(type_of_trade);
+-- Favorites keyset pagination: (sort column, id) for every sortable column, scanned
+-- forward or backward; filtered views sort by ROC within symbol / trade type
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_roc_id ON strategy_favorites(roc_pct, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_net_debit_pct_id ON strategy_favorites(net_debit_pct, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_pop_id ON strategy_favorites(pop_pct, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_position_delta_id ON strategy_favorites(position_delta, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_break_even_id ON strategy_favorites(break_even, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_leaps_strike_id ON strategy_favorites(leaps_strike, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_short_strike_id ON strategy_favorites(short_strike, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_date_created_id ON strategy_favorites(date_created, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_symbol_id ON strategy_favorites(symbol, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_symbol_roc ON strategy_favorites(symbol, roc_pct, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_type_roc ON strategy_favorites(type_of_trade, roc_pct, id);
 CREATE INDEX IF NOT EXISTS idx_options_symbol_exp ON options_data(symbol, expiration_date);
 CREATE INDEX IF NOT EXISTS idx_options_type_exp ON options_data(option_type, expiration_date);
+CREATE INDEX IF NOT EXISTS idx_options_symbol_snapshot ON options_data(symbol, data_timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_scan_jobs_queue ON scan_jobs(status, created_at);
 
 -- Insert Default Filter (if not exists)
 INSERT INTO strategy_filter_criteria (
@@ -153,9 +206,10 @@ ON CONFLICT DO NOTHING;
 -- SELECT * FROM strategy_favorites 
 -- ORDER BY roc_pct DESC;
 
--- Sample Query: Get Options for a Symbol
+-- Sample Query: Get Options for a Symbol (latest snapshot)
 -- SELECT * FROM options_data 
 -- WHERE symbol = 'AAPL' 
 -- AND option_type = 'CALL'
 -- AND expiration_date >= CURRENT_DATE
+-- AND data_timestamp = (SELECT MAX(data_timestamp) FROM options_data WHERE symbol = 'AAPL')
 -- ORDER BY expiration_date, strike_price;
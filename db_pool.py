@@ -0,0 +1,279 @@
+"""
+Shared Postgres connection pool
+
+Opening a connection to a hosted Postgres costs a TCP + TLS + auth round trip
+that dwarfs the small queries the routes run. One pool per process keeps
+connections open and hands them out to request threads:
+
+    with db_pool.connection() as conn:
+        cur = conn.cursor()
+        ...
+        conn.commit()
+
+- Thread-safe; at most maxconn connections, callers wait up to `timeout`
+  seconds for one to be returned
+- Health check: a connection idle longer than health_check_interval is
+  pinged with SELECT 1 before reuse, broken ones are replaced
+- Connections come back rolled back, so an uncommitted or failed transaction
+  never leaks into the next checkout
+- Connections beyond minconn that sit idle for idle_timeout are closed
+- Fork-safe: a forked child (gunicorn worker) starts with an empty pool
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(RuntimeError):
+    """No connection was returned to the pool within the timeout"""
+
+
+class _PooledConnection:
+    __slots__ = ('conn', 'last_used')
+
+    def __init__(self, conn, last_used: float):
+        self.conn = conn
+        self.last_used = last_used
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections
+
+    Args:
+        dsn: Connection string
+        minconn: Connections kept open however long they sit idle
+        maxconn: Upper bound on open connections
+        timeout: Seconds to wait for a free connection before PoolTimeout
+        health_check_interval: Idle seconds after which a connection is pinged before reuse
+        idle_timeout: Idle seconds after which connections beyond minconn are closed
+        connect: Factory for new connections
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        minconn: int = 1,
+        maxconn: int = 10,
+        timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        idle_timeout: float = 300.0,
+        connect: Callable = psycopg2.connect
+    ):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.idle_timeout = idle_timeout
+        self._connect = connect
+
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+        self._idle: List[_PooledConnection] = []
+        self._open = 0
+        self._in_use = 0
+        self._metrics = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'timeouts': 0,
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'health_check_failures': 0,
+            'max_in_use': 0,
+        }
+
+    def _check_pid(self):
+        """After a fork the parent's sockets can't be shared - start over"""
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._idle = []
+            self._open = 0
+            self._in_use = 0
+
+    def _healthy(self, pooled: _PooledConnection, now: float) -> bool:
+        """Called without the lock held: the ping is a network round trip"""
+        conn = pooled.conn
+        if conn.closed:
+            return False
+        if now - pooled.last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        """Check out a connection (prefer the connection() context manager)"""
+        started = time.monotonic()
+        waited = False
+
+        while True:
+            with self._cond:
+                self._check_pid()
+                while True:
+                    # An idle connection taken here stays counted in _open while it is checked
+                    pooled = self._idle.pop() if self._idle else None
+                    if pooled is not None:
+                        break
+                    if self._open < self.maxconn:
+                        self._open += 1
+                        break
+
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._metrics['timeouts'] += 1
+                        raise PoolTimeout(f"No database connection available within {self.timeout:g}s "
+                                          f"({self.maxconn} in use)")
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if pooled is None:
+                break  # Room for a new connection
+
+            # Health check outside the lock so a slow or dead connection doesn't block other threads
+            healthy = self._healthy(pooled, time.monotonic())
+            if not healthy:
+                self._close(pooled.conn)
+            with self._cond:
+                if healthy:
+                    return self._checked_out(pooled.conn, started, waited)
+                self._open -= 1
+                self._metrics['health_check_failures'] += 1
+                self._metrics['connections_discarded'] += 1
+                self._cond.notify()
+
+        # Connect outside the lock so a slow handshake doesn't block returns
+        try:
+            conn = self._connect(self.dsn)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._metrics['connections_created'] += 1
+            return self._checked_out(conn, started, waited)
+
+    def _checked_out(self, conn, started: float, waited: bool):
+        wait_seconds = time.monotonic() - started
+        self._in_use += 1
+        metrics = self._metrics
+        metrics['checkouts'] += 1
+        if waited:
+            metrics['waits'] += 1
+            metrics['wait_seconds_total'] += wait_seconds
+            metrics['wait_seconds_max'] = max(metrics['wait_seconds_max'], wait_seconds)
+        metrics['max_in_use'] = max(metrics['max_in_use'], self._in_use)
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection; it is rolled back, or closed if broken"""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._cond:
+            if os.getpid() != self._pid:
+                return  # Checked out before a fork - belongs to the parent's pool
+            self._in_use -= 1
+            if discard or conn.closed:
+                self._close(conn)
+                self._open -= 1
+                self._metrics['connections_discarded'] += 1
+            else:
+                self._idle.append(_PooledConnection(conn, time.monotonic()))
+                self._prune_idle()
+            self._cond.notify()
+
+    def _prune_idle(self):
+        # Idle list is LIFO, so the longest-idle connections are at the front
+        cutoff = time.monotonic() - self.idle_timeout
+        while len(self._idle) > self.minconn and self._idle[0].last_used < cutoff:
+            self._close(self._idle.pop(0).conn)
+            self._open -= 1
+            self._metrics['connections_discarded'] += 1
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of the with block"""
+        with metrics.timer('db_checkout_seconds', route=metrics.current_route()):
+            conn = self.getconn()
+        discard = False
+        started = time.perf_counter()
+        try:
+            yield conn
+        except (psycopg2.InterfaceError, psycopg2.OperationalError):
+            discard = True  # Connection-level failure, don't hand it out again
+            metrics.inc('db_errors_total', route=metrics.current_route())
+            raise
+        finally:
+            # Time the connection was held = query and transaction time for the route
+            metrics.observe('db_seconds', time.perf_counter() - started, route=metrics.current_route())
+            self.putconn(conn, discard=discard)
+
+    def closeall(self):
+        """Close every idle connection (checked-out ones close when returned)"""
+        with self._cond:
+            for pooled in self._idle:
+                self._close(pooled.conn)
+            self._open -= len(self._idle)
+            self._idle = []
+
+    def metrics(self) -> Dict:
+        with self._cond:
+            metrics = dict(self._metrics)
+            metrics['open'] = self._open
+            metrics['in_use'] = self._in_use
+            metrics['idle'] = len(self._idle)
+        metrics['maxconn'] = self.maxconn
+        metrics['avg_wait_seconds'] = (metrics['wait_seconds_total'] / metrics['waits']
+                                       if metrics['waits'] else 0.0)
+        return metrics
+
+
+def create_connection_pool_from_env(dsn: Optional[str]) -> ConnectionPool:
+    """
+    Build the per-process connection pool from environment variables
+
+    DB_POOL_MIN                     connections kept open when idle (default 1)
+    DB_POOL_IDLE_TIMEOUT            idle seconds before connections above DB_POOL_MIN close (default 300)
+    DB_POOL_MAX                     connections per process (default 10)
+    DB_POOL_TIMEOUT                 seconds to wait for a free connection (default 30)
+    DB_POOL_HEALTH_CHECK_INTERVAL   idle seconds before a connection is pinged on reuse (default 30)
+    """
+    pool = ConnectionPool(
+        dsn,
+        minconn=int(os.environ.get('DB_POOL_MIN', 1)),
+        maxconn=max(1, int(os.environ.get('DB_POOL_MAX', 10))),
+        timeout=float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        health_check_interval=float(os.environ.get('DB_POOL_HEALTH_CHECK_INTERVAL', 30)),
+        idle_timeout=float(os.environ.get('DB_POOL_IDLE_TIMEOUT', 300)),
+    )
+    logger.info(f"🔌 Database pool: up to {pool.maxconn} connections per process")
+    return pool
@@ -0,0 +1,233 @@
+"""
+In-process TTL cache for Alpha Vantage quotes and option chains
+
+- Per-namespace TTLs ('quote', 'options', ...)
+- LRU eviction bounded by an estimate of the cached payloads' memory
+- Request coalescing: concurrent loads of the same key share one fetch
+- Optional stale-while-revalidate: expired entries are served for up to
+  stale_ttl seconds while a background thread refreshes them
+
+Cached values are shared between callers and must be treated as read-only.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Number of list items sampled when estimating a payload's size
+SIZE_SAMPLE = 20
+
+
+def estimate_size(value: Any) -> int:
+    """Rough memory footprint in bytes of a float or a list of flat dicts"""
+    if isinstance(value, list):
+        if not value:
+            return sys.getsizeof(value)
+        sample = value[:SIZE_SAMPLE]
+        per_item = sum(estimate_size(item) for item in sample) / len(sample)
+        return sys.getsizeof(value) + int(per_item * len(value))
+    if isinstance(value, dict):
+        # Keys are shared across rows by the JSON decoder, so only count values
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ('value', 'stored_at', 'size')
+
+    def __init__(self, value, stored_at: float, size: int):
+        self.value = value
+        self.stored_at = stored_at
+        self.size = size
+
+
+class _Flight:
+    """One in-progress load that other callers can wait on"""
+
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self):
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class TTLCache:
+    """
+    Thread-safe TTL + LRU cache with request coalescing
+
+    Args:
+        ttls: Seconds each namespace's entries stay fresh
+        max_bytes: Memory budget for cached values (estimated)
+        default_ttl: TTL for namespaces not listed in ttls
+        stale_while_revalidate: Serve expired entries while refreshing in the background
+        stale_ttl: How long past expiry an entry may still be served stale
+        sizeof: Size estimator for cached values
+    """
+
+    def __init__(
+        self,
+        ttls: Dict[str, float],
+        max_bytes: int = 128 * 1024 * 1024,
+        default_ttl: float = 30.0,
+        stale_while_revalidate: bool = False,
+        stale_ttl: float = 60.0,
+        sizeof: Callable[[Any], int] = estimate_size
+    ):
+        self.ttls = dict(ttls)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_ttl = stale_ttl
+        self.sizeof = sizeof
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._in_flight: Dict[Hashable, _Flight] = {}
+        self._bytes = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale_hits': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'load_errors': 0,
+        }
+
+    def get_or_load(self, namespace: str, key: Hashable, loader: Callable[[], Any]):
+        """Return the cached value for (namespace, key), calling loader on a miss"""
+        cache_key = (namespace, key)
+        ttl = self.ttls.get(namespace, self.default_ttl)
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                age = time.monotonic() - entry.stored_at
+                if age < ttl:
+                    self._entries.move_to_end(cache_key)
+                    self._stats['hits'] += 1
+                    return entry.value
+                if self.stale_while_revalidate and age < ttl + self.stale_ttl:
+                    self._entries.move_to_end(cache_key)
+                    self._stats['stale_hits'] += 1
+                    if cache_key not in self._in_flight:
+                        flight = self._in_flight[cache_key] = _Flight()
+                        threading.Thread(
+                            target=self._refresh, args=(cache_key, flight, loader),
+                            name=f'cache-refresh-{namespace}-{key}', daemon=True
+                        ).start()
+                    return entry.value
+
+            flight = self._in_flight.get(cache_key)
+            if flight is not None:
+                self._stats['coalesced'] += 1
+                owner = False
+            else:
+                flight = self._in_flight[cache_key] = _Flight()
+                self._stats['misses'] += 1
+                owner = True
+
+        if not owner:
+            return flight.wait()
+        return self._load(cache_key, flight, loader)
+
+    def _load(self, cache_key, flight: _Flight, loader: Callable[[], Any]):
+        try:
+            value = loader()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._stats['load_errors'] += 1
+                self._in_flight.pop(cache_key, None)
+            flight.event.set()
+            raise
+
+        ttl = self.ttls.get(cache_key[0], self.default_ttl)
+        size = self.sizeof(value) if ttl > 0 else 0
+        with self._lock:
+            if ttl > 0:
+                self._store(cache_key, value, size)
+            self._in_flight.pop(cache_key, None)
+        flight.value = value
+        flight.event.set()
+        return value
+
+    def _refresh(self, cache_key, flight: _Flight, loader: Callable[[], Any]):
+        try:
+            self._load(cache_key, flight, loader)
+        except Exception as e:
+            logger.warning(f"⚠️  Background refresh failed for {cache_key}: {str(e)}")
+
+    def _store(self, cache_key, value, size: int):
+        old = self._entries.pop(cache_key, None)
+        if old is not None:
+            self._bytes -= old.size
+
+        if size > self.max_bytes:
+            return  # Never let one huge payload flush the whole cache
+
+        self._entries[cache_key] = _Entry(value, time.monotonic(), size)
+        self._bytes += size
+
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._stats['evictions'] += 1
+
+    def invalidate(self, namespace: Optional[str] = None, key: Optional[Hashable] = None):
+        """Drop one entry, a whole namespace, or everything"""
+        with self._lock:
+            if namespace is not None and key is not None:
+                doomed = [(namespace, key)] if (namespace, key) in self._entries else []
+            elif namespace is not None:
+                doomed = [k for k in self._entries if k[0] == namespace]
+            else:
+                doomed = list(self._entries)
+            for cache_key in doomed:
+                self._bytes -= self._entries.pop(cache_key).size
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+            stats['in_flight'] = len(self._in_flight)
+        stats['max_bytes'] = self.max_bytes
+        stats['ttls'] = dict(self.ttls)
+        stats['stale_while_revalidate'] = self.stale_while_revalidate
+        return stats
+
+
+def create_market_data_cache_from_env() -> TTLCache:
+    """
+    Build the quote/option-chain cache from environment variables
+
+    CACHE_TTL_QUOTE                 seconds a GLOBAL_QUOTE stays fresh (default 30, 0 disables)
+    CACHE_TTL_OPTIONS               seconds a REALTIME_OPTIONS chain stays fresh (default 60, 0 disables)
+    CACHE_MAX_MB                    memory budget per worker (default 128)
+    CACHE_STALE_WHILE_REVALIDATE    true to serve expired entries while refreshing
+    CACHE_STALE_TTL                 seconds past expiry an entry may be served (default 60)
+    """
+    cache = TTLCache(
+        ttls={
+            'quote': float(os.environ.get('CACHE_TTL_QUOTE', 30)),
+            'options': float(os.environ.get('CACHE_TTL_OPTIONS', 60)),
+        },
+        max_bytes=int(float(os.environ.get('CACHE_MAX_MB', 128)) * 1024 * 1024),
+        stale_while_revalidate=os.environ.get('CACHE_STALE_WHILE_REVALIDATE', '').lower() in ('1', 'true', 'yes'),
+        stale_ttl=float(os.environ.get('CACHE_STALE_TTL', 60)),
+    )
+    logger.info(f"🗄️  Market data cache: TTLs {cache.ttls}, {cache.max_bytes // (1024 * 1024)} MB, "
+                f"stale-while-revalidate={'on' if cache.stale_while_revalidate else 'off'}")
+    return cache
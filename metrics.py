@@ -0,0 +1,372 @@
+"""
+Lightweight timers, counters and histograms
+
+    import metrics
+
+    with metrics.timer('scan_stage_seconds', stage='find_leaps'):
+        ...
+    metrics.inc('scan_symbols_total', outcome='ok')
+
+Each process keeps its values in memory (a lock and a dict update per
+observation) and, at most every flush_interval seconds, writes them to
+{directory}/metrics-{pid}-{started}.json (started is when the process first
+wrote, so a reused pid never overwrites a dead process's file). snapshot()
+merges the files of every process, so /api/metrics reports all gunicorn
+workers and the scan worker on the host.
+
+A process folds its values into {directory}/metrics-retired.json at exit and
+removes its file; snapshot() does the same for files whose process died
+without exiting cleanly. The directory holds one file per live process plus
+the aggregate, and totals don't go backwards when gunicorn recycles a
+worker; delete the directory to reset.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows - folding only serializes threads in this process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the histogram buckets; +Inf is implicit
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+RETIRED_FILE = 'metrics-retired.json'
+
+
+def _key(name: str, labels: Dict) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _file_pid(path: str) -> Optional[int]:
+    """Pid a metrics-{pid}-{started}.json file belongs to (None for the aggregate)"""
+    parts = os.path.basename(path)[:-len('.json')].split('-')
+    if len(parts) != 3 or not parts[1].isdigit():
+        return None
+    return int(parts[1])
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:  # exists but belongs to another user
+        return True
+    return True
+
+
+def _merge(sources: List[Dict]) -> Tuple[Dict[LabelKey, float], Dict[LabelKey, List]]:
+    """Counters and histograms summed over several _values() dicts"""
+    counters: Dict[LabelKey, float] = {}
+    histograms: Dict[LabelKey, List] = {}
+    for values in sources:
+        for name, labels, value in values['counters']:
+            key = _key(name, labels)
+            counters[key] = counters.get(key, 0.0) + value
+        for name, labels, histogram in values['histograms']:
+            key = _key(name, labels)
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = list(histogram)
+                continue
+            for i in range(len(histogram) - 1):
+                merged[i] += histogram[i]
+            merged[-1] = max(merged[-1], histogram[-1])
+    return counters, histograms
+
+
+class MetricsRegistry:
+    """
+    Per-process metric values, optionally shared with other processes through files
+
+    Args:
+        directory: Where each process writes its values (None = this process only)
+        flush_interval: Seconds between writes of this process's file
+        buckets: Histogram bucket upper bounds in seconds
+        enabled: False turns every call into a no-op
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        flush_interval: float = 5.0,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        enabled: bool = True
+    ):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._counters: Dict[LabelKey, float] = {}
+        self._histograms: Dict[LabelKey, List] = {}  # [bucket counts..., sum, count, max]
+        self._last_flush = time.monotonic()
+        self._local = threading.local()
+        self._file: Optional[Tuple[int, str]] = None  # (pid, path) of this process's file
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Values observed since the last periodic flush would be lost at exit
+        atexit.register(self._flush_at_exit)
+
+    # ---- Recording ----
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+        self._maybe_flush()
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * len(self.buckets) + [0.0, 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-3] += value
+            histogram[-2] += 1
+            histogram[-1] = max(histogram[-1], value)
+        self._maybe_flush()
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the wall time of the with block (also when it raises)"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # ---- Request context ----
+
+    def set_route(self, route: Optional[str]):
+        """Route served by this thread, used to label work done on its behalf (DB time)"""
+        self._local.route = route
+
+    def current_route(self) -> str:
+        return getattr(self._local, 'route', None) or '-'
+
+    # ---- Sharing between processes ----
+
+    def _values(self) -> Dict:
+        with self._lock:
+            return {
+                'buckets': list(self.buckets),
+                'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, dict(labels), list(values)]
+                               for (name, labels), values in self._histograms.items()],
+            }
+
+    def _path(self) -> str:
+        """This process's file; a forked child gets its own on its first write"""
+        pid = os.getpid()
+        if self._file is None or self._file[0] != pid:
+            self._file = (pid, os.path.join(self.directory, f"metrics-{pid}-{time.time_ns()}.json"))
+        return self._file[1]
+
+    def _flush_at_exit(self):
+        if not self.directory or not (self._counters or self._histograms):
+            return
+        self.flush()
+        try:
+            with self._folding():
+                self._retire([self._path()])
+        except OSError as e:
+            logger.warning(f"⚠️  Could not retire metrics file: {str(e)}")
+
+    def _maybe_flush(self):
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _write(self, path: str, values: Dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(values, f)
+        os.replace(tmp_path, path)
+
+    def _read(self, path: str) -> Optional[Dict]:
+        """A metrics file's values, None if unreadable or bucketed differently"""
+        try:
+            with open(path) as f:
+                values = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return values if values.get('buckets') == list(self.buckets) else None
+
+    @contextmanager
+    def _folding(self):
+        """Serialize folding into the aggregate (and reading it) across processes"""
+        with self._lock:
+            fd = os.open(os.path.join(self.directory, '.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    def _retire(self, paths: List[str]):
+        """Add the files' values to the aggregate and remove them; call inside _folding()"""
+        retired_path = os.path.join(self.directory, RETIRED_FILE)
+        sources = [values for values in map(self._read, [retired_path] + paths) if values is not None]
+        counters, histograms = _merge(sources)
+        self._write(retired_path, {
+            'buckets': list(self.buckets),
+            'counters': [[name, dict(labels), value] for (name, labels), value in counters.items()],
+            'histograms': [[name, dict(labels), values] for (name, labels), values in histograms.items()],
+        })
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def flush(self):
+        """Write this process's values for snapshot() in other processes"""
+        if not self.directory:
+            return
+        self._last_flush = time.monotonic()
+        try:
+            self._write(self._path(), self._values())
+        except OSError as e:
+            logger.warning(f"⚠️  Could not write metrics file: {str(e)}")
+
+    def snapshot(self) -> Dict:
+        """
+        Values summed over every process sharing the directory
+
+        Returns {counters: [{name, labels, value}], histograms: [{name, labels,
+        buckets: {le: cumulative count}, sum, count, max, avg}], processes}
+        (processes counts live processes; exited ones are in the aggregate).
+        """
+        sources = [self._values()]
+        processes = 1
+        if self.directory:
+            self.flush()
+            own = self._path()
+            try:
+                with self._folding():
+                    live, dead = [], []
+                    for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                        pid = _file_pid(path)
+                        if pid is not None and path != own:
+                            (live if _pid_alive(pid) else dead).append(path)
+                    if dead:
+                        self._retire(dead)
+                    for path in live + [os.path.join(self.directory, RETIRED_FILE)]:
+                        values = self._read(path)
+                        if values is not None:
+                            sources.append(values)
+                            processes += path in live
+            except OSError as e:
+                logger.warning(f"⚠️  Could not read metrics files: {str(e)}")
+
+        counters, histograms = _merge(sources)
+
+        result_histograms = []
+        for (name, labels), histogram in sorted(histograms.items()):
+            cumulative, running = {}, 0
+            for bound, count in zip(self.buckets, histogram):
+                running += count
+                cumulative[f"{bound:g}"] = running
+            total, count, maximum = histogram[-3], histogram[-2], histogram[-1]
+            cumulative['+Inf'] = count
+            result_histograms.append({
+                'name': name, 'labels': dict(labels), 'buckets': cumulative,
+                'sum': total, 'count': count, 'max': maximum,
+                'avg': total / count if count else 0.0,
+            })
+
+        return {
+            'processes': processes,
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in sorted(counters.items())],
+            'histograms': result_histograms,
+        }
+
+
+def _prometheus_labels(labels: Dict, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels.items()) + ([extra] if extra else [])
+    if not items:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in items)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + '}'
+
+
+def render_prometheus(snapshot: Dict) -> str:
+    """Prometheus text exposition format (0.0.4) of a snapshot()"""
+    lines = []
+    typed = set()
+    for counter in snapshot['counters']:
+        if counter['name'] not in typed:
+            typed.add(counter['name'])
+            lines.append(f"# TYPE {counter['name']} counter")
+        lines.append(f"{counter['name']}{_prometheus_labels(counter['labels'])} {counter['value']:g}")
+    for histogram in snapshot['histograms']:
+        name = histogram['name']
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        for bound, count in histogram['buckets'].items():
+            lines.append(f"{name}_bucket{_prometheus_labels(histogram['labels'], ('le', bound))} {count}")
+        lines.append(f"{name}_sum{_prometheus_labels(histogram['labels'])} {histogram['sum']:.6f}")
+        lines.append(f"{name}_count{_prometheus_labels(histogram['labels'])} {histogram['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+def create_metrics_registry_from_env() -> MetricsRegistry:
+    """
+    Build the process-wide registry from environment variables
+
+    METRICS_ENABLED          false turns instrumentation off (default true)
+    METRICS_DIR              directory processes share values through
+                             (default: a temp dir; empty = this process only)
+    METRICS_FLUSH_INTERVAL   seconds between writes of each process's values (default 5)
+    """
+    enabled = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    directory = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'options_scanner_metrics'))
+    try:
+        return MetricsRegistry(
+            directory=directory or None,
+            flush_interval=float(os.environ.get('METRICS_FLUSH_INTERVAL', 5)),
+            enabled=enabled,
+        )
+    except OSError as e:
+        logger.warning(f"⚠️  Metrics directory {directory} unusable ({str(e)}) - metrics are per process")
+        return MetricsRegistry(enabled=enabled)
+
+
+# Process-wide registry used by the module-level helpers
+registry = create_metrics_registry_from_env()
+
+inc = registry.inc
+observe = registry.observe
+timer = registry.timer
+set_route = registry.set_route
+current_route = registry.current_route
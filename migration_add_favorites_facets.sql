@@ -0,0 +1,31 @@
+-- ============================================
+-- Migration: Add Favorites Facet Index
+-- Purpose: Distinct values per filterable field for /api/favorites/field-values
+--          without scanning strategy_favorites
+-- ============================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS strategy_favorites_facets (
+    field VARCHAR(32) NOT NULL,                 -- symbol, type_of_trade, leaps_strike, short_strike
+    value TEXT NOT NULL,                        -- column value as text
+    count INTEGER NOT NULL DEFAULT 0,           -- favorites with this value
+    PRIMARY KEY (field, value)
+);
+
+-- Backfill from existing favorites
+INSERT INTO strategy_favorites_facets (field, value, count)
+SELECT v.field, v.value, COUNT(*)
+FROM strategy_favorites f,
+LATERAL (VALUES
+    ('symbol', f.symbol::text),
+    ('type_of_trade', f.type_of_trade::text),
+    ('leaps_strike', f.leaps_strike::text),
+    ('short_strike', f.short_strike::text)
+) AS v(field, value)
+GROUP BY v.field, v.value
+ON CONFLICT (field, value) DO UPDATE SET count = EXCLUDED.count;
+
+SELECT 'Favorites facet index created successfully!' AS status;
+
+COMMIT;
@@ -0,0 +1,30 @@
+-- ============================================
+-- Migration: Add Favorites Keyset Pagination Indexes
+-- Purpose: Index every sortable favorites column with id as tie-breaker
+--          (GET /api/favorites pages with WHERE (sort, id) < cursor)
+-- ============================================
+
+BEGIN;
+
+-- Superseded by the composite indexes below (same leading columns)
+DROP INDEX IF EXISTS idx_strategy_favorites_symbol;
+DROP INDEX IF EXISTS idx_strategy_favorites_roc;
+DROP INDEX IF EXISTS idx_strategy_favorites_type;
+
+-- Favorites keyset pagination: (sort column, id) for every sortable column, scanned
+-- forward or backward; filtered views sort by ROC within symbol / trade type
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_roc_id ON strategy_favorites(roc_pct, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_net_debit_pct_id ON strategy_favorites(net_debit_pct, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_pop_id ON strategy_favorites(pop_pct, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_position_delta_id ON strategy_favorites(position_delta, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_break_even_id ON strategy_favorites(break_even, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_leaps_strike_id ON strategy_favorites(leaps_strike, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_short_strike_id ON strategy_favorites(short_strike, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_date_created_id ON strategy_favorites(date_created, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_symbol_id ON strategy_favorites(symbol, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_symbol_roc ON strategy_favorites(symbol, roc_pct, id);
+CREATE INDEX IF NOT EXISTS idx_strategy_favorites_type_roc ON strategy_favorites(type_of_trade, roc_pct, id);
+
+SELECT 'Favorites keyset indexes created successfully!' AS status;
+
+COMMIT;
@@ -0,0 +1,13 @@
+-- ============================================
+-- Migration: Add Options Snapshot Index
+-- Purpose: Fast lookup of the latest options_data snapshot per symbol
+-- ============================================
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_options_symbol_snapshot
+ON options_data(symbol, data_timestamp DESC);
+
+SELECT 'Options snapshot index created successfully!' AS status;
+
+COMMIT;
@@ -0,0 +1,18 @@
+-- ============================================
+-- Migration: Add Rate Limiter State Table
+-- Purpose: Shared token bucket for RATE_LIMIT_BACKEND=postgres
+-- ============================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS api_rate_limiter_state (
+    name VARCHAR(64) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at DOUBLE PRECISION NOT NULL,       -- Unix epoch seconds
+    backoff_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    backoff_until DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+SELECT 'Rate limiter state table created successfully!' AS status;
+
+COMMIT;
@@ -0,0 +1,32 @@
+-- ============================================
+-- Migration: Add Scan Jobs Table
+-- Purpose: Background scan queue for SCAN_JOB_BACKEND=postgres
+-- ============================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS scan_jobs (
+    id VARCHAR(32) PRIMARY KEY,                 -- uuid4 hex
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    request JSONB NOT NULL,                     -- symbols, data_source, scan_params
+    symbols_total INTEGER NOT NULL DEFAULT 0,
+    symbols_done INTEGER NOT NULL DEFAULT 0,
+    current_symbol VARCHAR(10),
+    results JSONB NOT NULL DEFAULT '[]'::jsonb, -- per-symbol results, appended as screened
+    result JSONB,                               -- final /api/scan response body
+    error TEXT,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    worker_id VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    CONSTRAINT chk_scan_job_status CHECK (status IN ('queued', 'running', 'completed', 'failed', 'cancelled'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_scan_jobs_queue ON scan_jobs(status, created_at);
+
+SELECT 'Scan jobs table created successfully!' AS status;
+
+COMMIT;
@@ -0,0 +1,288 @@
+"""
+Columnar option chain for vectorized screening
+
+An Alpha Vantage REALTIME_OPTIONS payload (list of dicts with string values)
+is parsed once into a NumPy structured array. Expirations are dictionary
+encoded: each row stores an index into OptionChain.expirations, so days to
+expiration is parsed once per expiration instead of once per contract.
+
+For range queries, expiration_index(kind) groups a kind's rows by expiration
+(in date order) with strikes sorted inside each expiration: a DTE window is a
+binary search over the expirations, and an ITM/OTM percent range a binary
+search over each expiration's strikes, so a leg filter touches only the rows
+it returns.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from selection import smallest_k
+
+CALL = 1
+PUT = -1
+
+CHAIN_DTYPE = np.dtype([
+    ('kind', np.int8),              # CALL, PUT, or 0 for anything else
+    ('exp_code', np.int32),         # index into OptionChain.expirations
+    ('strike', np.float64),
+    ('bid', np.float64),
+    ('ask', np.float64),
+    ('mark', np.float64),
+    ('last', np.float64),
+    ('delta', np.float64),
+    ('gamma', np.float64),
+    ('theta', np.float64),
+    ('vega', np.float64),
+    ('rho', np.float64),
+    ('implied_volatility', np.float64),
+    ('open_interest', np.int64),
+    ('volume', np.int64),
+])
+
+FLOAT_FIELDS = ('strike', 'bid', 'ask', 'mark', 'last', 'delta', 'gamma',
+                'theta', 'vega', 'rho', 'implied_volatility')
+INT_FIELDS = ('open_interest', 'volume')
+
+# Days to expiration for rows whose expiration can't be parsed (never inside a DTE window)
+INVALID_DTE = -(2 ** 31)
+
+# What an ExpirationIndex.select() percent range measures
+ITM = 1   # ITM fraction (LEAPS)
+OTM = -1  # OTM fraction (shorts)
+
+
+def _float_column(values: List) -> np.ndarray:
+    """Parse a column of numeric strings; unparseable values become NaN"""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        column = np.empty(len(values), dtype=np.float64)
+        for i, value in enumerate(values):
+            try:
+                column[i] = float(value)
+            except (TypeError, ValueError):
+                column[i] = np.nan
+        return column
+
+
+def _int_column(values: List) -> np.ndarray:
+    """Parse a column of integer strings; unparseable values become -1 (fail any minimum)"""
+    try:
+        return np.array(values, dtype=np.int64)
+    except (TypeError, ValueError, OverflowError):
+        column = np.empty(len(values), dtype=np.int64)
+        for i, value in enumerate(values):
+            try:
+                column[i] = int(value)
+            except (TypeError, ValueError, OverflowError):
+                column[i] = -1
+        return column
+
+
+class OptionChain:
+    """
+    One symbol's option chain as parallel columns
+
+    Attributes:
+        rows: Structured array with CHAIN_DTYPE, one row per contract
+        expirations: Expiration date strings ('YYYY-MM-DD'), indexed by rows['exp_code']
+    """
+
+    def __init__(self, rows: np.ndarray, expirations: List[str]):
+        self.rows = rows
+        self.expirations = expirations
+        self._expiration_dates: Optional[List[Optional[datetime]]] = None
+        self._expiration_days = None  # (now, result) of the last expiration_days() call
+        self._indexes: Dict[int, 'ExpirationIndex'] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def from_alphavantage(cls, data: List[Dict]) -> 'OptionChain':
+        """Parse an Alpha Vantage options list (values may be strings) into columns"""
+        rows = np.zeros(len(data), dtype=CHAIN_DTYPE)
+
+        kinds = {'call': CALL, 'put': PUT}
+        rows['kind'] = [kinds.get(option.get('type'), 0) for option in data]
+
+        exp_codes = {}
+        rows['exp_code'] = [exp_codes.setdefault(option.get('expiration', ''), len(exp_codes))
+                            for option in data]
+
+        for field in FLOAT_FIELDS:
+            rows[field] = _float_column([option.get(field, 0) for option in data])
+        for field in INT_FIELDS:
+            rows[field] = _int_column([option.get(field, 0) for option in data])
+
+        return cls(rows, list(exp_codes))
+
+    def expiration_dates(self) -> List[Optional[datetime]]:
+        """Parsed date of each expiration code (None if it can't be parsed), parsed once"""
+        if self._expiration_dates is None:
+            dates = []
+            for expiration in self.expirations:
+                try:
+                    dates.append(datetime.strptime(expiration, "%Y-%m-%d"))
+                except (TypeError, ValueError):
+                    dates.append(None)
+            self._expiration_dates = dates
+        return self._expiration_dates
+
+    def expiration_days(self, now: Optional[datetime] = None) -> np.ndarray:
+        """
+        Whole days from now to each expiration code, like (expiration - now).days
+
+        The result for the last explicit now is kept, so every filter of a
+        batch scan (same chain, same as_of) shares one computation.
+        """
+        cached = self._expiration_days
+        if now is not None and cached is not None and cached[0] == now:
+            return cached[1]
+        now = now or datetime.now()
+        days = np.array([(date - now).days if date is not None else INVALID_DTE
+                         for date in self.expiration_dates()], dtype=np.int64)
+        self._expiration_days = (now, days)
+        return days
+
+    def days_to_expiration(self, now: Optional[datetime] = None) -> np.ndarray:
+        """Whole days from now to each row's expiration, like (expiration - now).days"""
+        return self.expiration_days(now)[self.rows['exp_code']]
+
+    def expiration_index(self, kind: int) -> 'ExpirationIndex':
+        """The ExpirationIndex of one kind's rows, built on first use"""
+        index = self._indexes.get(kind)
+        if index is None:
+            index = self._indexes[kind] = ExpirationIndex(self, kind)
+        return index
+
+    def expiration_strings(self, index: np.ndarray) -> List[str]:
+        """Expiration strings for the given row indices"""
+        expirations = self.expirations
+        return [expirations[code] for code in self.rows['exp_code'][index].tolist()]
+
+    def count(self, kind: int) -> int:
+        return int(np.count_nonzero(self.rows['kind'] == kind))
+
+
+class ExpirationIndex:
+    """
+    One kind's rows grouped by expiration in date order, strike-sorted within each
+
+    Bucket b holds rows[starts[b]:starts[b + 1]] (chain row numbers, by
+    ascending strike) of expiration code codes[b]. Rows whose expiration
+    can't be parsed or whose strike is NaN are left out; no filter admits them.
+    """
+
+    def __init__(self, chain: OptionChain, kind: int):
+        self.chain = chain
+        self.kind = kind
+
+        dates = chain.expiration_dates()
+        valid_codes = np.array([date is not None for date in dates], dtype=bool)
+        order_of_code = np.full(len(dates), -1, dtype=np.int64)
+        dated = sorted((date, code) for code, date in enumerate(dates) if date is not None)
+        for position, (_, code) in enumerate(dated):
+            order_of_code[code] = position
+
+        rows = chain.rows
+        codes = rows['exp_code']
+        candidates = np.flatnonzero((rows['kind'] == kind) & valid_codes[codes] & ~np.isnan(rows['strike']))
+        candidates = candidates[np.lexsort((rows['strike'][candidates], order_of_code[codes[candidates]]))]
+
+        self.rows = candidates
+        self.strikes: List[float] = rows['strike'][candidates].tolist()
+        bucket_codes = codes[candidates]
+        if len(candidates):
+            changes = np.flatnonzero(bucket_codes[1:] != bucket_codes[:-1]) + 1
+            self.starts = np.concatenate(([0], changes, [len(candidates)]))
+        else:
+            self.starts = np.zeros(1, dtype=np.int64)
+        self.codes = bucket_codes[self.starts[:-1]]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _strike_range(self, start: int, stop: int, price: float, measure: int,
+                      pct_min: float, pct_max: float) -> Tuple[int, int]:
+        """Positions [lo, hi) within one bucket whose ITM/OTM fraction is inside the range"""
+        # The same arithmetic as moneyness(), so boundaries match the vectorized filters exactly
+        if self.kind == CALL:
+            def fraction(strike):
+                return measure * ((price - strike) / price)
+        else:
+            def fraction(strike):
+                return measure * ((strike - price) / price)
+
+        # fraction rises with strike for call OTM and put ITM, falls for call ITM and put OTM
+        if (self.kind == CALL) == (measure == OTM):
+            return (bisect_left(self.strikes, pct_min, start, stop, key=fraction),
+                    bisect_right(self.strikes, pct_max, start, stop, key=fraction))
+
+        def falling(strike):
+            return -fraction(strike)
+        return (bisect_left(self.strikes, -pct_max, start, stop, key=falling),
+                bisect_right(self.strikes, -pct_min, start, stop, key=falling))
+
+    def select(self, price: float, measure: int, min_days: int, max_days: int,
+               pct_min: float, pct_max: float, min_oi: int, min_volume: int,
+               now: Optional[datetime] = None) -> np.ndarray:
+        """
+        Chain rows of this kind inside a DTE window and ITM/OTM fraction range
+        with at least min_oi open interest and min_volume volume
+
+        measure is ITM or OTM. Returns rows in chain order, exactly the rows a
+        full-chain mask of the same conditions would (np.flatnonzero order).
+        """
+        days = self.chain.expiration_days(now)[self.codes]
+        first = int(np.searchsorted(days, min_days, 'left'))
+        last = int(np.searchsorted(days, max_days, 'right'))
+
+        if not (0 < price < np.inf) or np.isnan(pct_min) or np.isnan(pct_max):
+            # Fractions of a zero/non-finite price aren't monotone in strike, and NaN bounds
+            # don't bisect; test the window row by row
+            window = self.rows[self.starts[first]:self.starts[last]]
+            fraction = measure * moneyness(self.chain, price, self.kind)[window]
+            return self._liquid(window[(fraction >= pct_min) & (fraction <= pct_max)], min_oi, min_volume)
+
+        parts = []
+        for bucket in range(first, last):
+            lo, hi = self._strike_range(int(self.starts[bucket]), int(self.starts[bucket + 1]),
+                                        price, measure, pct_min, pct_max)
+            if lo < hi:
+                parts.append(self.rows[lo:hi])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+
+        return self._liquid(np.concatenate(parts), min_oi, min_volume)
+
+    def _liquid(self, matched: np.ndarray, min_oi: int, min_volume: int) -> np.ndarray:
+        rows = self.chain.rows
+        matched = matched[(rows['volume'][matched] >= min_volume) & (rows['open_interest'][matched] >= min_oi)]
+        return np.sort(matched)
+
+
+def as_option_chain(data) -> OptionChain:
+    """Accept either a parsed OptionChain or a raw Alpha Vantage options list"""
+    return data if isinstance(data, OptionChain) else OptionChain.from_alphavantage(data)
+
+
+def sort_by_delta_distance(chain: OptionChain, index: np.ndarray, target_delta: float,
+                           limit: Optional[int] = None) -> np.ndarray:
+    """
+    Order row indices by |delta - target|, keeping chain order for ties (like sorted())
+
+    With limit only the closest limit rows are selected and sorted.
+    """
+    distance = np.abs(chain.rows['delta'][index] - target_delta)
+    return index[smallest_k(distance, limit)]
+
+
+def moneyness(chain: OptionChain, current_price: float, kind: int) -> np.ndarray:
+    """ITM fraction of each row's strike ((price - strike) / price for calls, mirrored for puts)"""
+    strike = chain.rows['strike']
+    if kind == CALL:
+        return (current_price - strike) / current_price
+    return (strike - current_price) / current_price
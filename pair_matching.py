@@ -0,0 +1,208 @@
+"""
+Vectorized LEAPS x short pair matching for PMCC/PMCP scans
+
+Instead of looping over product(leaps, shorts) and calling norm.cdf once per
+pair, every metric is computed for the whole LEAPS x shorts matrix with NumPy
+broadcasting. The max_net_debit mask and an optional top-k by ROC are applied
+before any per-pair Python objects are built.
+
+POP inputs that depend only on the short leg are computed once per short:
+PMCC POP is evaluated per short and shared by every LEAPS it pairs with, and
+PMCP POP only adds the per-pair log(S / breakeven) term.
+
+ShortLegIndex serves the screener's pair loop, which only pairs a LEAPS with
+shorts expiring before it at a higher strike: it hands each LEAPS just the
+shorts inside those bounds whose credit can still meet the net debit cap.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pricing import pop_from_terms, probability_of_profit, short_leg_terms
+from selection import smallest_k
+
+# Upper bound on pairs evaluated per block (keeps memory flat for uncapped candidate lists)
+MAX_BLOCK_PAIRS = 250_000
+
+PAIR_FIELDS = (
+    'leap_index', 'short_index', 'leaps_cost', 'short_premium', 'net_debit',
+    'net_debit_pct', 'max_profit', 'roc_pct', 'breakeven', 'pop_pct', 'position_delta'
+)
+
+
+def _leg_columns(legs: List[Tuple], columns: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """Turn find_leaps/find_shorts tuples into float arrays for the named positions"""
+    if not legs:
+        return {name: np.empty(0) for name in columns}
+    return {name: np.array([leg[pos] for leg in legs], dtype=np.float64)
+            for name, pos in columns.items()}
+
+
+def _top_k(roc_pct: np.ndarray, top_k: Optional[int]) -> np.ndarray:
+    """Positions of the top_k highest ROC values, ties kept in input order"""
+    return smallest_k(-roc_pct, top_k)
+
+
+def match_pairs(
+    leaps: List[Tuple],
+    shorts: List[Tuple],
+    price: float,
+    option_type: str,
+    max_net_debit: float,
+    risk_free_rate: float,
+    top_k: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Compute PMCC/PMCP metrics for every LEAPS x short pair
+
+    Args:
+        leaps: find_leaps records (records.LeapsLeg)
+        shorts: find_shorts records (records.ShortLeg)
+        price: Underlying price
+        option_type: 'call' (PMCC) or 'put' (PMCP)
+        max_net_debit: Maximum net debit in dollars per contract
+        risk_free_rate: Rate used for Black-Scholes POP
+        top_k: Keep only the k best pairs by ROC (None keeps all)
+
+    Returns:
+        Dict of equal-length arrays (see PAIR_FIELDS) for pairs with
+        0 < net_debit <= max_net_debit, ordered by ROC descending; ties keep
+        LEAPS-major order, as a stable sort over product(leaps, shorts) would.
+    """
+    leap = _leg_columns(leaps, {'strike': 1, 'ask': 2, 'delta': 3})
+    short = _leg_columns(shorts, {'strike': 1, 'bid': 2, 'delta': 3, 'iv': 4, 'days': 5})
+
+    n_shorts = len(shorts)
+    block = max(1, MAX_BLOCK_PAIRS // max(1, n_shorts))
+    short_premium = short['bid'] * 100
+    T = short['days'] / 365.0
+
+    # Per-short POP inputs, indexed by each pair's short below
+    drift, vol = short_leg_terms(T, risk_free_rate, short['iv'])
+    degenerate = (short['iv'] == 0) | (T == 0)
+    if option_type == "call":
+        short_pop = probability_of_profit(price, short['strike'], T, risk_free_rate, short['iv'], option_type)
+
+    parts = []
+    for start in range(0, len(leaps), block):
+        stop = min(start + block, len(leaps))
+
+        # (leaps, 1) against (shorts,) broadcasts to a (leaps, shorts) matrix
+        leaps_cost = (leap['ask'][start:stop] * 100)[:, None]
+        net_debit = leaps_cost - short_premium
+        valid = (net_debit > 0) & (net_debit <= max_net_debit)
+        leap_idx, short_idx = np.nonzero(valid)
+        if not len(leap_idx):
+            continue
+
+        leaps_strike = leap['strike'][start:stop][leap_idx]
+        short_strike = short['strike'][short_idx]
+        pair_leaps_cost = leaps_cost[leap_idx, 0]
+        pair_net_debit = net_debit[leap_idx, short_idx]
+
+        if option_type == "call":
+            max_profit = (short_strike - leaps_strike) * 100 - pair_net_debit
+            breakeven = leaps_strike + (pair_net_debit / 100)
+            position_delta = leap['delta'][start:stop][leap_idx] - short['delta'][short_idx]
+        else:
+            max_profit = (leaps_strike - short_strike) * 100 - pair_net_debit
+            breakeven = leaps_strike - (pair_net_debit / 100)
+            position_delta = leap['delta'][start:stop][leap_idx] + short['delta'][short_idx]
+
+        roc_pct = (max_profit / pair_net_debit) * 100
+        if option_type == "call":
+            pop = short_pop[short_idx]
+        else:
+            pop = pop_from_terms(price, breakeven, drift[short_idx], vol[short_idx], option_type)
+            pop = np.where(degenerate[short_idx], (price > short_strike).astype(np.float64), pop)
+
+        part = {
+            'leap_index': leap_idx + start,
+            'short_index': short_idx,
+            'leaps_cost': pair_leaps_cost,
+            'short_premium': short_premium[short_idx],
+            'net_debit': pair_net_debit,
+            'net_debit_pct': pair_net_debit / (price * 100) * 100,
+            'max_profit': max_profit,
+            'roc_pct': roc_pct,
+            'breakeven': breakeven,
+            'pop_pct': pop * 100,
+            'position_delta': position_delta,
+        }
+        keep = _top_k(roc_pct, top_k)
+        parts.append({name: values[keep] for name, values in part.items()})
+
+    if not parts:
+        return {name: np.empty(0) for name in PAIR_FIELDS}
+
+    merged = {name: np.concatenate([part[name] for part in parts]) for name in PAIR_FIELDS}
+    keep = _top_k(merged['roc_pct'], top_k)
+    return {name: values[keep] for name, values in merged.items()}
+
+
+class ShortLegIndex:
+    """
+    Short legs grouped by expiration, strike-sorted within each, for pruned pair enumeration
+
+    A LEAPS pairs with shorts whose expiration is before its own and whose
+    strike is above its own: a prefix of the expirations and a suffix of the
+    strikes inside each. Each expiration also keeps the best credit from every
+    position to its end; where even that credit leaves the net debit above
+    the cap, the rest of the expiration is skipped without visiting a pair,
+    and the shorts before that point are checked against the cap one by one.
+
+    Args:
+        expirations: Expiration of each short (any ordered type, e.g. dates)
+        strikes: Strike of each short
+        credits: Credit received for each short (bid), in the net debit's units
+    """
+
+    def __init__(self, expirations: Sequence, strikes: Sequence[float], credits: Sequence[float]):
+        self.size = len(strikes)
+        self.credits = list(credits)
+        order = sorted(range(self.size), key=lambda i: (expirations[i], strikes[i]))
+
+        self.expirations: List = []                            # distinct, ascending
+        self.buckets: List[Tuple[List[float], List[int], List[float]]] = []  # (strikes, positions, best credit from)
+        for position in order:
+            if not self.expirations or expirations[position] != self.expirations[-1]:
+                self.expirations.append(expirations[position])
+                self.buckets.append(([], [], []))
+            bucket_strikes, positions, _ = self.buckets[-1]
+            bucket_strikes.append(strikes[position])
+            positions.append(position)
+
+        for _, positions, best_credit in self.buckets:
+            best = float('-inf')
+            for position in reversed(positions):
+                best = max(best, credits[position])
+                best_credit.append(best)
+            best_credit.reverse()
+
+    def feasible(self, expiration, strike: float, cost: float,
+                 max_net_debit: float) -> Tuple[List[int], int]:
+        """
+        Shorts a LEAPS can pair with, and how many of them the net debit cap rules out
+
+        Returns (positions, over_cap): input positions (ascending, the order the
+        shorts were given in) of shorts expiring before expiration, struck above
+        strike and within the cap (cost - credit <= max_net_debit); over_cap
+        counts the shorts inside the bounds that are over the cap.
+        """
+        positions: List[int] = []
+        over_cap = 0
+        for bucket in range(bisect_left(self.expirations, expiration)):
+            bucket_strikes, bucket_positions, best_credit = self.buckets[bucket]
+            end = len(bucket_strikes)
+            start = bisect_right(bucket_strikes, strike)
+            # best_credit falls along the bucket, so "over the cap" is False up to some position, then True
+            stop = bisect_left(best_credit, True, start, end, key=lambda credit: cost - credit > max_net_debit)
+            over_cap += end - stop
+            for position in bucket_positions[start:stop]:
+                if cost - self.credits[position] > max_net_debit:
+                    over_cap += 1
+                else:
+                    positions.append(position)
+        positions.sort()
+        return positions, over_cap
@@ -0,0 +1,120 @@
+"""
+Black-Scholes analytics for the scanners
+
+Every function takes scalars or NumPy arrays (broadcast together) and returns
+a float for scalar inputs or an array otherwise. The normal CDF is
+scipy.special.ndtr, a plain ufunc, which avoids the argument checking and
+dispatch overhead of the scipy.stats.norm distribution object.
+
+The inputs that depend only on the short leg (time, rate, volatility) are
+split out by short_leg_terms so a caller pairing many LEAPS with one short
+computes them once; short_leg_pop memoizes the whole POP per short contract.
+"""
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+from scipy.special import ndtr
+
+
+def _result(value):
+    """Unwrap 0-d arrays so scalar callers get a plain float back"""
+    value = np.asarray(value, dtype=np.float64)
+    return float(value) if value.ndim == 0 else value
+
+
+def short_leg_terms(T, r, sigma) -> Tuple[np.ndarray, np.ndarray]:
+    """Drift (r - sigma^2/2) * T and volatility sigma * sqrt(T) of the d2 formula"""
+    T = np.asarray(T, dtype=np.float64)
+    sigma = np.asarray(sigma, dtype=np.float64)
+    return (r - 0.5 * sigma ** 2) * T, sigma * np.sqrt(T)
+
+
+def pop_from_terms(S, strike, drift, vol, option_type: str):
+    """
+    POP given precomputed short_leg_terms
+
+    For calls: probability the stock finishes below strike (max profit zone)
+    For puts: probability the stock finishes above strike (pass the breakeven
+    for PMCP); a strike at or below zero can't be crossed, so POP is 1.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d2 = (np.log(S / strike) + drift) / vol
+    if option_type == "call":
+        return ndtr(-d2)
+    return np.where(np.asarray(strike) <= 0, 1.0, ndtr(d2))
+
+
+def probability_of_profit(S, K, T, r, sigma, option_type: str, breakeven=None):
+    """
+    Probability of Profit using Black-Scholes (array version of calculate_pop)
+
+    Args:
+        S: Current stock price
+        K: Short strike
+        T: Time to expiration (years)
+        r: Risk-free rate
+        sigma: Implied volatility of the short
+        option_type: 'call' or 'put'
+        breakeven: PMCP breakeven - used instead of K for puts when provided
+
+    With zero volatility or time the outcome is already decided by S vs K.
+    """
+    K = np.asarray(K, dtype=np.float64)
+    T = np.asarray(T, dtype=np.float64)
+    sigma = np.asarray(sigma, dtype=np.float64)
+
+    strike = breakeven if (option_type == "put" and breakeven is not None) else K
+    drift, vol = short_leg_terms(T, r, sigma)
+    pop = pop_from_terms(S, strike, drift, vol, option_type)
+
+    at_expiry = (S < K) if option_type == "call" else (S > K)
+    return _result(np.where((sigma == 0) | (T == 0), at_expiry, pop))
+
+
+@lru_cache(maxsize=8192)
+def short_leg_pop(S: float, K: float, T: float, r: float, sigma: float, option_type: str) -> float:
+    """POP that depends only on the short contract, memoized across the LEAPS it pairs with"""
+    return probability_of_profit(S, K, T, r, sigma, option_type)
+
+
+def _d1_d2(S, K, T, r, sigma):
+    drift, vol = short_leg_terms(T, r, sigma)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d2 = (np.log(S / np.asarray(K, dtype=np.float64)) + drift) / vol
+    return d2 + vol, d2
+
+
+def option_delta(S, K, T, r, sigma, option_type: str):
+    """Black-Scholes delta (intrinsic 0/1 delta at zero time or volatility)"""
+    T = np.asarray(T, dtype=np.float64)
+    sigma = np.asarray(sigma, dtype=np.float64)
+    d1, _ = _d1_d2(S, K, T, r, sigma)
+
+    if option_type == "call":
+        delta, intrinsic = ndtr(d1), (S > np.asarray(K)).astype(np.float64)
+    else:
+        delta, intrinsic = ndtr(d1) - 1.0, -(S < np.asarray(K)).astype(np.float64)
+    return _result(np.where((sigma == 0) | (T == 0), intrinsic, delta))
+
+
+def theoretical_value(S, K, T, r, sigma, option_type: str):
+    """Black-Scholes price per share (intrinsic value at zero time or volatility)"""
+    K = np.asarray(K, dtype=np.float64)
+    T = np.asarray(T, dtype=np.float64)
+    sigma = np.asarray(sigma, dtype=np.float64)
+    d1, d2 = _d1_d2(S, K, T, r, sigma)
+    discounted_strike = K * np.exp(-r * T)
+
+    if option_type == "call":
+        value = S * ndtr(d1) - discounted_strike * ndtr(d2)
+        intrinsic = np.maximum(S - K, 0.0)
+    else:
+        value = discounted_strike * ndtr(-d2) - S * ndtr(-d1)
+        intrinsic = np.maximum(K - S, 0.0)
+    return _result(np.where((sigma == 0) | (T == 0), intrinsic, value))
+
+
+def expected_move(S, T, sigma):
+    """One standard deviation move of the underlying by expiration (S * sigma * sqrt(T))"""
+    return _result(S * np.asarray(sigma, dtype=np.float64) * np.sqrt(np.asarray(T, dtype=np.float64)))
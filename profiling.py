@@ -0,0 +1,168 @@
+"""
+Profile a single request without redeploying
+
+    with ScanProfiler('sample') as profiler:
+        ...work done on this thread...
+    report = profiler.report(top=25)
+
+Modes:
+- sample:   a background thread snapshots the profiled thread's Python stack
+            every `interval` seconds (sys._current_frames); wall-clock, so
+            time blocked on I/O, locks or the GIL counts against the frame
+            that is waiting, and overhead is low enough to keep timings
+            representative
+- cprofile: deterministic cProfile of the profiled thread for exact call
+            counts, plus the sampler for stacks; slower while active
+
+Either way the report has the top-N hot functions and a flamegraph
+compatible collapsed-stack dump ("frame;frame;frame count" per line, for
+flamegraph.pl, speedscope or inferno). write_profile() saves both to disk.
+"""
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+PROFILE_MODES = ('sample', 'cprofile')
+DEFAULT_INTERVAL = 0.002
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_qualname}"
+
+
+class StackSampler:
+    """Counts the distinct Python stacks of one thread, sampled on a timer"""
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, root first, heaviest first"""
+        return '\n'.join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common())
+
+    def top(self, n: int) -> List[Dict]:
+        """Functions by samples spent in them (self) and under them (total)"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+        samples = self.samples or 1
+        return [{
+            'function': label,
+            'self_samples': own[label],
+            'total_samples': total[label],
+            'self_pct': round(100.0 * own[label] / samples, 2),
+            'total_pct': round(100.0 * total[label] / samples, 2),
+        } for label, _ in sorted(total.items(), key=lambda item: (own[item[0]], item[1]), reverse=True)[:n]]
+
+
+class ScanProfiler:
+    """
+    Context manager profiling the thread that enters it
+
+    Args:
+        mode: 'sample' or 'cprofile'
+        interval: Seconds between stack samples
+    """
+
+    def __init__(self, mode: str = 'sample', interval: float = DEFAULT_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (use {' or '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.interval = interval
+        self.sampler: Optional[StackSampler] = None
+        self.cprofile: Optional[cProfile.Profile] = None
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.sampler = StackSampler(threading.get_ident(), self.interval)
+        self.sampler.start()
+        if self.mode == 'cprofile':
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.started
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        self.sampler.stop()
+        return False
+
+    def _cprofile_top(self, n: int) -> List[Dict]:
+        stats = pstats.Stats(self.cprofile).stats
+        rows: List[Tuple] = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:n]
+        return [{
+            'function': f"{os.path.basename(filename)}:{name}" + (f":{line}" if line else ''),
+            'calls': calls,
+            'self_seconds': round(own, 6),
+            'total_seconds': round(cumulative, 6),
+        } for (filename, line, name), (_, calls, own, cumulative, _) in rows]
+
+    def report(self, top: int = 25, include_collapsed: bool = True) -> Dict:
+        report = {
+            'mode': self.mode,
+            'duration_seconds': round(self.elapsed, 6),
+            'interval_seconds': self.interval,
+            'samples': self.sampler.samples,
+            'top': self._cprofile_top(top) if self.cprofile is not None else self.sampler.top(top),
+        }
+        if include_collapsed:
+            report['collapsed'] = self.sampler.collapsed()
+        return report
+
+
+def write_profile(profiler: ScanProfiler, directory: str, name: str = 'scan', top: int = 25) -> Dict[str, str]:
+    """
+    Save a finished profile as {name}-{timestamp}-{pid}.json / .collapsed (/ .prof for cprofile)
+
+    Returns the written paths by kind.
+    """
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{name}-{datetime.now():%Y%m%dT%H%M%S%f}-{os.getpid()}")
+    paths = {'report': base + '.json', 'collapsed': base + '.collapsed'}
+
+    with open(paths['collapsed'], 'w') as f:
+        f.write(profiler.sampler.collapsed() + '\n')
+    with open(paths['report'], 'w') as f:
+        json.dump(profiler.report(top, include_collapsed=False), f, indent=2)
+    if profiler.cprofile is not None:
+        paths['pstats'] = base + '.prof'
+        profiler.cprofile.dump_stats(paths['pstats'])
+    return paths
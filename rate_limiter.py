@@ -0,0 +1,301 @@
+"""
+Token-bucket rate limiter for Alpha Vantage API calls
+
+The bucket state lives in a pluggable backend so every thread and every
+gunicorn worker draws from the same budget:
+
+- LocalBackend:    in-process only (threads of one worker)
+- FileBackend:     JSON state file guarded by fcntl.flock (all workers on one dyno)
+- PostgresBackend: state row guarded by a transaction-scoped advisory lock (all dynos)
+
+Callers reserve the next free slot: tokens may go negative, and the caller
+sleeps until the bucket has refilled past its reservation. A rate-limit
+response from the API puts the bucket into debt for an exponentially growing
+backoff period, which pauses every caller sharing the backend.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows - file backend only serializes threads in this process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key for the Postgres backend (any constant shared by all workers)
+RATE_LIMITER_LOCK_KEY = 5_900_600
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when a call cannot get a token within its max wait"""
+
+
+def _initial_state(burst: float) -> Dict:
+    return {
+        'tokens': float(burst),
+        'updated_at': time.time(),
+        'backoff_seconds': 0.0,
+        'backoff_until': 0.0,
+    }
+
+
+class LocalBackend:
+    """Bucket state shared by the threads of this process"""
+
+    name = 'local'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+    @contextmanager
+    def transaction(self, burst: float):
+        with self._lock:
+            if self._state is None:
+                self._state = _initial_state(burst)
+            yield self._state
+
+
+class FileBackend:
+    """Bucket state in a JSON file, shared by every process on the host"""
+
+    name = 'file'
+
+    def __init__(self, path: str):
+        self.path = path
+        # flock is held per open file, so threads of one process still need a lock
+        self._lock = threading.Lock()
+        if fcntl is None:
+            logger.warning("⚠️  fcntl unavailable - rate limiter state is not shared across processes")
+
+    @contextmanager
+    def transaction(self, burst: float):
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = os.read(fd, 4096)
+                try:
+                    state = json.loads(raw) if raw else _initial_state(burst)
+                except ValueError:
+                    state = _initial_state(burst)
+
+                yield state
+
+                data = json.dumps(state).encode()
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, data)
+            finally:
+                os.close(fd)  # also releases the flock
+
+
+class PostgresBackend:
+    """Bucket state in api_rate_limiter_state, shared by every dyno"""
+
+    name = 'postgres'
+
+    def __init__(self, pool, bucket_name: str = 'alphavantage'):
+        self.pool = pool
+        self.bucket_name = bucket_name
+
+    @contextmanager
+    def transaction(self, burst: float):
+        with self.pool.connection() as conn:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_xact_lock(%s)", (RATE_LIMITER_LOCK_KEY,))
+                    cur.execute("""
+                        SELECT tokens, updated_at, backoff_seconds, backoff_until
+                        FROM api_rate_limiter_state WHERE name = %s
+                    """, (self.bucket_name,))
+                    row = cur.fetchone()
+                    if row:
+                        state = dict(zip(('tokens', 'updated_at', 'backoff_seconds', 'backoff_until'), row))
+                    else:
+                        state = _initial_state(burst)
+
+                    yield state
+
+                    cur.execute("""
+                        INSERT INTO api_rate_limiter_state
+                            (name, tokens, updated_at, backoff_seconds, backoff_until)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (name) DO UPDATE SET
+                            tokens = EXCLUDED.tokens,
+                            updated_at = EXCLUDED.updated_at,
+                            backoff_seconds = EXCLUDED.backoff_seconds,
+                            backoff_until = EXCLUDED.backoff_until
+                    """, (self.bucket_name, state['tokens'], state['updated_at'],
+                          state['backoff_seconds'], state['backoff_until']))
+
+
+class TokenBucketRateLimiter:
+    """
+    Token bucket with configurable burst and adaptive backoff
+
+    Args:
+        calls_per_minute: Sustained refill rate
+        burst: Bucket capacity (calls allowed back to back after an idle period)
+        backend: Where bucket state lives (defaults to LocalBackend)
+        max_wait: Longest a caller will wait for a token before RateLimitExceeded
+        backoff_initial: First pause after a rate-limit response (seconds)
+        backoff_max: Cap for the exponentially growing pause (seconds)
+    """
+
+    def __init__(
+        self,
+        calls_per_minute: float = 590,
+        burst: float = 10,
+        backend=None,
+        max_wait: float = 60.0,
+        backoff_initial: float = 5.0,
+        backoff_max: float = 60.0
+    ):
+        self.rate = calls_per_minute / 60.0
+        self.burst = float(burst)
+        self.backend = backend or LocalBackend()
+        self.max_wait = max_wait
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self._backoff_seen = False
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'acquired': 0,
+            'rejected': 0,
+            'rate_limited_responses': 0,
+            'waits': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+        }
+
+    def _refill(self, state: Dict, now: float):
+        elapsed = max(0.0, now - state['updated_at'])
+        state['tokens'] = min(self.burst, state['tokens'] + elapsed * self.rate)
+        state['updated_at'] = now
+
+    def acquire(self, max_wait: Optional[float] = None) -> float:
+        """Block until a call may be sent; returns seconds waited"""
+        max_wait = self.max_wait if max_wait is None else max_wait
+
+        with self.backend.transaction(self.burst) as state:
+            now = time.time()
+            self._refill(state, now)
+            tokens_after = state['tokens'] - 1
+            wait = -tokens_after / self.rate if tokens_after < 0 else 0.0
+            if wait <= max_wait:
+                state['tokens'] = tokens_after
+            self._backoff_seen = state['backoff_seconds'] > 0
+
+        if wait > max_wait:
+            with self._metrics_lock:
+                self._metrics['rejected'] += 1
+            raise RateLimitExceeded(f"Rate limiter queue full: next slot in {wait:.1f}s (max wait {max_wait:.1f}s)")
+
+        with self._metrics_lock:
+            self._metrics['acquired'] += 1
+            if wait > 0:
+                self._metrics['waits'] += 1
+                self._metrics['total_wait_seconds'] += wait
+                self._metrics['max_wait_seconds'] = max(self._metrics['max_wait_seconds'], wait)
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def report_rate_limited(self):
+        """Back off after the API answered with a rate-limit payload"""
+        with self._metrics_lock:
+            self._metrics['rate_limited_responses'] += 1
+
+        with self.backend.transaction(self.burst) as state:
+            now = time.time()
+            self._refill(state, now)
+            # Requests already in flight come back limited too - one escalation per window
+            if now < state['backoff_until']:
+                return
+            backoff = min(self.backoff_max, max(self.backoff_initial, state['backoff_seconds'] * 2))
+            state['backoff_seconds'] = backoff
+            state['backoff_until'] = now + backoff
+            # Put the bucket into debt so every caller pauses until the backoff ends
+            state['tokens'] = min(state['tokens'], -backoff * self.rate)
+            self._backoff_seen = True
+
+        logger.warning(f"⏳ API rate limit hit - backing off {backoff:.0f}s")
+
+    def report_success(self):
+        """Reset the backoff once calls succeed again after the pause"""
+        if not self._backoff_seen:
+            return
+
+        with self.backend.transaction(self.burst) as state:
+            if state['backoff_seconds'] and time.time() >= state['backoff_until']:
+                state['backoff_seconds'] = 0.0
+            self._backoff_seen = state['backoff_seconds'] > 0
+
+    def metrics(self) -> Dict:
+        """Counters for this process plus the shared bucket state"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['avg_wait_seconds'] = (
+            metrics['total_wait_seconds'] / metrics['waits'] if metrics['waits'] else 0.0
+        )
+
+        with self.backend.transaction(self.burst) as state:
+            self._refill(state, time.time())
+            metrics['tokens_available'] = state['tokens']
+            metrics['backoff_seconds'] = state['backoff_seconds']
+
+        metrics.update({
+            'pid': os.getpid(),
+            'backend': self.backend.name,
+            'calls_per_minute': self.rate * 60,
+            'burst': self.burst,
+        })
+        return metrics
+
+
+def create_rate_limiter_from_env(db_pool=None) -> TokenBucketRateLimiter:
+    """
+    Build the limiter from environment variables
+
+    RATE_LIMIT_BACKEND          local | file | postgres (default file)
+    RATE_LIMIT_CALLS_PER_MINUTE sustained rate (default 590)
+    RATE_LIMIT_BURST            bucket size (default 10)
+    RATE_LIMIT_MAX_WAIT         seconds before a call is rejected (default 60)
+    RATE_LIMIT_STATE_FILE       state file for the file backend
+
+    The postgres backend borrows connections from db_pool (db_pool.ConnectionPool).
+    """
+    backend_name = os.environ.get('RATE_LIMIT_BACKEND', 'file').lower()
+
+    if backend_name == 'postgres' and db_pool is not None:
+        backend = PostgresBackend(db_pool)
+    elif backend_name == 'local':
+        backend = LocalBackend()
+    else:
+        if backend_name not in ('file', 'postgres'):
+            logger.warning(f"⚠️  Unknown RATE_LIMIT_BACKEND '{backend_name}', using file")
+        path = os.environ.get(
+            'RATE_LIMIT_STATE_FILE',
+            os.path.join(tempfile.gettempdir(), 'options_scanner_rate_limit.json')
+        )
+        backend = FileBackend(path)
+
+    limiter = TokenBucketRateLimiter(
+        calls_per_minute=float(os.environ.get('RATE_LIMIT_CALLS_PER_MINUTE', 590)),
+        burst=float(os.environ.get('RATE_LIMIT_BURST', 10)),
+        backend=backend,
+        max_wait=float(os.environ.get('RATE_LIMIT_MAX_WAIT', 60)),
+    )
+    logger.info(f"🚦 Rate limiter: {limiter.rate * 60:.0f} calls/min, burst {limiter.burst:.0f}, backend={backend.name}")
+    return limiter
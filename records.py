@@ -0,0 +1,109 @@
+"""
+Typed records for scan candidates and results
+
+LeapsLeg / ShortLeg are what find_leaps / find_shorts return: NamedTuples,
+so they cost no more than plain tuples and still feed pair_matching's
+column extraction, but fields are read by name instead of by index.
+
+Opportunity is one screened pair, built once by the scanner in exactly the
+shape the UI and the /api/scan response use. It has __slots__ (no per
+instance __dict__), and is serialized as-is: json_default() is the hook for
+json.dumps(default=...) and the Flask JSON provider, and dumps() encodes a
+whole scan response in one call - with orjson when it is installed (it
+writes slotted dataclasses natively, no per-record dict), else stdlib json.
+Either way NaN and infinities become null, so the output is strict JSON
+(Postgres jsonb and browsers reject NaN).
+"""
+import json
+import math
+from dataclasses import dataclass, fields
+from typing import Dict, NamedTuple
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback, same output
+    orjson = None
+
+
+class LeapsLeg(NamedTuple):
+    expiration: str
+    strike: float
+    ask: float
+    delta: float
+    days_to_expiration: int
+    open_interest: int
+    volume: int
+
+
+class ShortLeg(NamedTuple):
+    expiration: str
+    strike: float
+    bid: float
+    delta: float
+    implied_volatility: float
+    days_to_expiration: int
+    open_interest: int
+    volume: int
+
+
+@dataclass(slots=True)
+class Opportunity:
+    """A LEAPS + short pair with its metrics; prices are per share, costs per contract"""
+    symbol: str
+    underlying_price: float
+    leaps_strike: float
+    leaps_price: float
+    leaps_expiration: str
+    leaps_days_to_expiration: int
+    leaps_delta: float
+    leaps_open_interest: int
+    leaps_volume: int
+    short_strike: float
+    short_price: float
+    short_expiration: str
+    short_days_to_expiration: int
+    short_delta: float
+    short_iv: float
+    short_open_interest: int
+    short_volume: int
+    net_debit: float
+    net_debit_pct: float
+    max_profit: float
+    roc_pct: float
+    pop_pct: float
+    position_delta: float
+    breakeven: float
+    type_of_trade: str
+
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in OPPORTUNITY_FIELDS}
+
+
+OPPORTUNITY_FIELDS = tuple(field.name for field in fields(Opportunity))
+
+
+def json_default(obj):
+    """json.dumps(default=...) hook for records"""
+    if isinstance(obj, Opportunity):
+        return obj.as_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite(obj):
+    """obj with non-finite floats replaced by None (what orjson writes for them)"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    if isinstance(obj, Opportunity):
+        return _finite(obj.as_dict())
+    return obj
+
+
+def dumps(obj) -> bytes:
+    """Compact UTF-8 JSON of a scan payload (dicts, lists and records); NaN/Infinity become null"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=json_default)
+    return json.dumps(_finite(obj), default=json_default, separators=(',', ':')).encode()
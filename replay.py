@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Offline replay / backtest of the PMCC/PMCP scanner
+
+Recording: with RECORD_API_RESPONSES_DIR set, every raw Alpha Vantage
+GLOBAL_QUOTE and REALTIME_OPTIONS response the app fetches is also written as
+
+    {root}/{YYYY-mm-dd}/{SYMBOL}/{HHMMSS}.{FUNCTION}.json
+
+Replay: each recorded REALTIME_OPTIONS response is one snapshot, screened
+against the latest GLOBAL_QUOTE recorded for the symbol at or before it on the
+same day, with days to expiration counted from the snapshot time. Snapshots
+are spread over worker processes; nothing touches the network or database.
+
+    python replay.py recordings/ --start 2026-10-01 --end 2026-10-17 \\
+        [--symbols AAPL,MSFT] [--workers 4] [--filters filters.json] [--output report.json]
+
+filters.json holds scanner.scan_symbol keyword arguments (type_of_trade,
+leaps_min_days, short_otm_max_pct, max_trades, ...); anything omitted uses
+the scanner defaults.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUOTE_FUNCTION = 'GLOBAL_QUOTE'
+OPTIONS_FUNCTION = 'REALTIME_OPTIONS'
+DATE_FORMAT = '%Y-%m-%d'
+TIME_FORMAT = '%H%M%S'
+
+
+class ResponseRecorder:
+    """Writes raw API payloads under root, one file per (day, symbol, time, function)"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def record(self, function: str, symbol: str, payload, timestamp: Optional[datetime] = None) -> str:
+        timestamp = timestamp or datetime.now()
+        directory = os.path.join(self.root, timestamp.strftime(DATE_FORMAT), symbol.upper())
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{timestamp.strftime(TIME_FORMAT)}.{function}.json")
+
+        # Temp file + rename so a replay running alongside never reads a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+
+def create_response_recorder_from_env() -> Optional[ResponseRecorder]:
+    """Response recorder from RECORD_API_RESPONSES_DIR (unset = disabled)"""
+    root = os.environ.get('RECORD_API_RESPONSES_DIR', '')
+    return ResponseRecorder(root) if root else None
+
+
+def _recorded_files(symbol_dir: str, day: date) -> Dict[str, List[Tuple[datetime, str]]]:
+    """{function: [(timestamp, path), ...] oldest first} for one symbol-day directory"""
+    files: Dict[str, List[Tuple[datetime, str]]] = {}
+    for name in os.listdir(symbol_dir):
+        parts = name.split('.')
+        if len(parts) != 3 or parts[2] != 'json':
+            continue
+        try:
+            clock = datetime.strptime(parts[0], TIME_FORMAT).time()
+        except ValueError:
+            continue
+        files.setdefault(parts[1], []).append((datetime.combine(day, clock), os.path.join(symbol_dir, name)))
+    for entries in files.values():
+        entries.sort()
+    return files
+
+
+def iter_snapshots(root: str, start: date, end: date,
+                   symbols: Optional[List[str]] = None) -> Iterator[Dict]:
+    """
+    Recorded snapshots between start and end (inclusive), in time order per day
+
+    Yields {symbol, timestamp, options_path, quote_path}; quote_path is None
+    when no quote was recorded for the symbol before the options response.
+    """
+    wanted = {s.upper() for s in symbols} if symbols else None
+    day = start
+    while day <= end:
+        day_dir = os.path.join(root, day.strftime(DATE_FORMAT))
+        snapshots = []
+        if os.path.isdir(day_dir):
+            for symbol in sorted(os.listdir(day_dir)):
+                symbol_dir = os.path.join(day_dir, symbol)
+                if (wanted is not None and symbol not in wanted) or not os.path.isdir(symbol_dir):
+                    continue
+                files = _recorded_files(symbol_dir, day)
+                quotes = files.get(QUOTE_FUNCTION, [])
+                for timestamp, options_path in files.get(OPTIONS_FUNCTION, []):
+                    earlier = [path for quoted_at, path in quotes if quoted_at <= timestamp]
+                    snapshots.append({
+                        'symbol': symbol,
+                        'timestamp': timestamp,
+                        'options_path': options_path,
+                        'quote_path': earlier[-1] if earlier else None,
+                    })
+        snapshots.sort(key=lambda s: (s['timestamp'], s['symbol']))
+        yield from snapshots
+        day += timedelta(days=1)
+
+
+def load_snapshot(snapshot: Dict) -> Tuple[float, List[Dict]]:
+    """(price, options) from a snapshot's recorded payloads"""
+    if snapshot['quote_path'] is None:
+        raise RuntimeError(f"No {QUOTE_FUNCTION} recorded for {snapshot['symbol']} before this snapshot")
+    with open(snapshot['quote_path']) as f:
+        quote = json.load(f)
+    with open(snapshot['options_path']) as f:
+        options = json.load(f)
+
+    if not quote.get("Global Quote"):
+        raise RuntimeError(f"Recorded quote has no price data: {str(quote)[:200]}")
+    if "data" not in options:
+        raise RuntimeError(f"Recorded options response has no data: {str(options)[:200]}")
+    return float(quote["Global Quote"]["05. price"]), options["data"]
+
+
+def replay_snapshot(snapshot: Dict, filters: Dict) -> Dict:
+    """Screen one recorded snapshot; runs in a worker process"""
+    from scanner import scan_symbol
+
+    started = time.perf_counter()
+    result = {
+        'symbol': snapshot['symbol'],
+        'timestamp': snapshot['timestamp'].isoformat(),
+    }
+    try:
+        price, options = load_snapshot(snapshot)
+        opportunities = scan_symbol(snapshot['symbol'], price, options, as_of=snapshot['timestamp'], **filters)
+        result.update({
+            'price': price,
+            'contracts': len(options),
+            'opportunities': len(opportunities),
+            'best_roc_pct': opportunities[0].roc_pct if opportunities else None,
+        })
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def _init_worker(log_level: int):
+    # The leg filters log every call at INFO; keep worker output to warnings unless asked
+    logging.basicConfig(level=log_level)
+    # Keep replay timings out of the metrics the web workers share on this host
+    import metrics
+    metrics.registry.directory = None
+
+
+def replay(root: str, start: date, end: date, symbols: Optional[List[str]] = None,
+           filters: Optional[Dict] = None, workers: Optional[int] = None,
+           log_level: int = logging.WARNING) -> Dict:
+    """
+    Replay every recorded snapshot in the range across worker processes
+
+    Returns {snapshots: [per-snapshot results in time order], summary: {...}}.
+    """
+    snapshots = list(iter_snapshots(root, start, end, symbols))
+    filters = filters or {}
+    workers = workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    if workers == 1:
+        _init_worker(log_level)
+        results = [replay_snapshot(snapshot, filters) for snapshot in snapshots]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(log_level,)) as pool:
+            chunksize = max(1, len(snapshots) // (workers * 4))
+            results = list(pool.map(replay_snapshot, snapshots, [filters] * len(snapshots),
+                                    chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+
+    screened = [r for r in results if 'error' not in r]
+    return {
+        'snapshots': results,
+        'summary': {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'workers': workers,
+            'snapshots': len(results),
+            'symbols': len({r['symbol'] for r in results}),
+            'errors': len(results) - len(screened),
+            'opportunities': sum(r['opportunities'] for r in screened),
+            'contracts': sum(r['contracts'] for r in screened),
+            'elapsed_seconds': round(elapsed, 3),
+            'symbols_per_second': round(len(results) / elapsed, 2) if elapsed > 0 else None,
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded Alpha Vantage responses through the scanner")
+    parser.add_argument('root', help="RECORD_API_RESPONSES_DIR the responses were recorded into")
+    parser.add_argument('--start', required=True, help="First day to replay (YYYY-mm-dd)")
+    parser.add_argument('--end', help="Last day to replay, inclusive (default: --start)")
+    parser.add_argument('--symbols', help="Comma-separated symbols (default: every recorded symbol)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--filters', help="JSON file of scanner.scan_symbol keyword arguments")
+    parser.add_argument('--output', help="Write the full JSON report here")
+    parser.add_argument('--verbose', action='store_true', help="Log scanner progress")
+    args = parser.parse_args(argv)
+
+    start = datetime.strptime(args.start, DATE_FORMAT).date()
+    end = datetime.strptime(args.end, DATE_FORMAT).date() if args.end else start
+    symbols = [s.strip() for s in args.symbols.split(',') if s.strip()] if args.symbols else None
+    filters = {}
+    if args.filters:
+        with open(args.filters) as f:
+            filters = json.load(f)
+
+    report = replay(args.root, start, end, symbols, filters, args.workers,
+                    log_level=logging.INFO if args.verbose else logging.WARNING)
+
+    for r in report['snapshots']:
+        if 'error' in r:
+            print(f"{r['timestamp']}  {r['symbol']:<6}  ERROR {r['error']}")
+        else:
+            best = f"{r['best_roc_pct']:.2f}%" if r['best_roc_pct'] is not None else '-'
+            print(f"{r['timestamp']}  {r['symbol']:<6}  {r['contracts']:>6} contracts  "
+                  f"{r['opportunities']:>4} opportunities  best ROC {best:>8}  {r['seconds'] * 1000:.0f} ms")
+
+    summary = report['summary']
+    print(f"\n{summary['snapshots']} snapshots ({summary['symbols']} symbols, {summary['errors']} errors), "
+          f"{summary['opportunities']} opportunities in {summary['elapsed_seconds']:.2f}s "
+          f"with {summary['workers']} workers: {summary['symbols_per_second']} symbols/sec")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,388 @@
+"""
+Background scan jobs
+
+A scan request is stored as a job and executed by a worker outside the web
+request. Jobs move through queued -> running -> completed | failed | cancelled.
+Workers append each symbol's result as soon as it is screened, so polling
+clients see progress, and check for cancellation between symbols.
+
+Two interchangeable stores:
+- PostgresJobStore: scan_jobs table, claimed with FOR UPDATE SKIP LOCKED
+  (web and worker dynos share it)
+- FileJobStore: one JSON file per job in a local directory (single host / dev)
+"""
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from records import dumps
+
+try:
+    import fcntl
+except ImportError:  # Windows - file store only serializes threads in this process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+# Longest symbol a job may carry (scan_jobs.current_symbol is VARCHAR(10))
+MAX_SYMBOL_LENGTH = 10
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def new_job(request: Dict, symbols_total: int) -> Dict:
+    """Job record for a newly submitted scan request"""
+    return {
+        'id': uuid.uuid4().hex,
+        'status': 'queued',
+        'request': request,
+        'symbols_total': symbols_total,
+        'symbols_done': 0,
+        'current_symbol': None,
+        'results': [],
+        'result': None,
+        'error': None,
+        'cancel_requested': False,
+        'worker_id': None,
+        'created_at': _now(),
+        'started_at': None,
+        'finished_at': None,
+        'updated_at': _now(),
+    }
+
+
+class FileJobStore:
+    """Jobs as JSON files in one directory, shared by processes on this host (NaN written as null, like the table)"""
+
+    def __init__(self, directory: str, stale_seconds: float = 600):
+        self.directory = directory
+        self.stale_seconds = stale_seconds
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    @contextmanager
+    def _locked(self):
+        """Serialize read-modify-write across threads and processes"""
+        with self._lock:
+            fd = os.open(os.path.join(self.directory, '.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    def _read(self, job_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write(self, job: Dict):
+        job['updated_at'] = _now()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dumps(job))
+        os.replace(tmp_path, self._path(job['id']))
+
+    def _all(self) -> List[Dict]:
+        jobs = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                job = self._read(name[:-5])
+                if job:
+                    jobs.append(job)
+        return sorted(jobs, key=lambda job: job['created_at'])
+
+    def submit(self, request: Dict, symbols_total: int) -> Dict:
+        job = new_job(request, symbols_total)
+        with self._locked():
+            self._write(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self._read(job_id)
+
+    def claim_next(self, worker_id: str) -> Optional[Dict]:
+        stale_before = (datetime.now() - timedelta(seconds=self.stale_seconds)).isoformat(timespec='seconds')
+        with self._locked():
+            for job in self._all():
+                # Running jobs that stopped reporting belong to a dead worker - start them over
+                abandoned = job['status'] == 'running' and job['updated_at'] < stale_before
+                if job['status'] == 'queued' or abandoned:
+                    job.update(status='running', worker_id=worker_id, started_at=_now(),
+                               symbols_done=0, current_symbol=None, results=[])
+                    self._write(job)
+                    return job
+        return None
+
+    def record_symbol(self, job_id: str, worker_id: str, symbol_result: Dict) -> bool:
+        with self._locked():
+            job = self._read(job_id)
+            if job is None or job['worker_id'] != worker_id:
+                return False
+            job['results'].append(symbol_result)
+            job['symbols_done'] += 1
+            job['current_symbol'] = symbol_result.get('symbol')
+            self._write(job)
+            return not job['cancel_requested']
+
+    def finish(self, job_id: str, worker_id: str, status: str,
+               result: Optional[Dict] = None, error: Optional[str] = None) -> bool:
+        with self._locked():
+            job = self._read(job_id)
+            if job is None or job['worker_id'] != worker_id:
+                return False
+            job.update(status=status, result=result, error=error, finished_at=_now())
+            self._write(job)
+            return True
+
+    def request_cancel(self, job_id: str) -> Optional[Dict]:
+        with self._locked():
+            job = self._read(job_id)
+            if job is None or job['status'] in FINISHED_STATUSES:
+                return job
+            if job['status'] == 'queued':
+                job.update(status='cancelled', finished_at=_now())
+            job['cancel_requested'] = True
+            self._write(job)
+            return job
+
+    def purge_finished(self, older_than_seconds: float) -> int:
+        cutoff = (datetime.now() - timedelta(seconds=older_than_seconds)).isoformat(timespec='seconds')
+        removed = 0
+        with self._locked():
+            for job in self._all():
+                if job['status'] in FINISHED_STATUSES and (job['finished_at'] or '') < cutoff:
+                    os.remove(self._path(job['id']))
+                    removed += 1
+        return removed
+
+
+class PostgresJobStore:
+    """Jobs in the scan_jobs table, shared by every dyno (JSON written with NaN as null; jsonb rejects NaN)"""
+
+    COLUMNS = ('id', 'status', 'request', 'symbols_total', 'symbols_done', 'current_symbol',
+               'results', 'result', 'error', 'cancel_requested', 'worker_id',
+               'created_at', 'started_at', 'finished_at', 'updated_at')
+
+    def __init__(self, pool, stale_seconds: float = 600):
+        self.pool = pool
+        self.stale_seconds = stale_seconds
+
+    @contextmanager
+    def _cursor(self):
+        from psycopg2.extras import RealDictCursor
+
+        with self.pool.connection() as conn:
+            with conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    yield cur
+
+    def _job(self, row) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        for field in ('created_at', 'started_at', 'finished_at', 'updated_at'):
+            if job[field] is not None:
+                job[field] = job[field].isoformat(timespec='seconds')
+        return job
+
+    def submit(self, request: Dict, symbols_total: int) -> Dict:
+        job = new_job(request, symbols_total)
+        with self._cursor() as cur:
+            cur.execute(f"""
+                INSERT INTO scan_jobs (id, status, request, symbols_total)
+                VALUES (%s, 'queued', %s, %s)
+                RETURNING {', '.join(self.COLUMNS)}
+            """, (job['id'], dumps(request).decode(), symbols_total))
+            return self._job(cur.fetchone())
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._cursor() as cur:
+            cur.execute(f"SELECT {', '.join(self.COLUMNS)} FROM scan_jobs WHERE id = %s", (job_id,))
+            return self._job(cur.fetchone())
+
+    def claim_next(self, worker_id: str) -> Optional[Dict]:
+        with self._cursor() as cur:
+            # Running jobs that stopped reporting belong to a dead worker - start them over
+            cur.execute(f"""
+                UPDATE scan_jobs SET
+                    status = 'running', worker_id = %s,
+                    started_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP,
+                    symbols_done = 0, current_symbol = NULL, results = '[]'::jsonb
+                WHERE id = (
+                    SELECT id FROM scan_jobs
+                    WHERE status = 'queued'
+                    OR (status = 'running' AND updated_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+                    ORDER BY created_at
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING {', '.join(self.COLUMNS)}
+            """, (worker_id, self.stale_seconds))
+            return self._job(cur.fetchone())
+
+    def record_symbol(self, job_id: str, worker_id: str, symbol_result: Dict) -> bool:
+        with self._cursor() as cur:
+            cur.execute("""
+                UPDATE scan_jobs SET
+                    results = results || jsonb_build_array(%s::jsonb),
+                    symbols_done = symbols_done + 1,
+                    current_symbol = %s,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND worker_id = %s
+                RETURNING cancel_requested
+            """, (dumps(symbol_result).decode(), symbol_result.get('symbol'), job_id, worker_id))
+            row = cur.fetchone()
+            return row is not None and not row['cancel_requested']
+
+    def finish(self, job_id: str, worker_id: str, status: str,
+               result: Optional[Dict] = None, error: Optional[str] = None) -> bool:
+        with self._cursor() as cur:
+            cur.execute("""
+                UPDATE scan_jobs SET
+                    status = %s, result = %s, error = %s,
+                    finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND worker_id = %s
+            """, (status, dumps(result).decode() if result is not None else None, error, job_id, worker_id))
+            return cur.rowcount == 1
+
+    def request_cancel(self, job_id: str) -> Optional[Dict]:
+        with self._cursor() as cur:
+            cur.execute(f"""
+                UPDATE scan_jobs SET
+                    cancel_requested = TRUE,
+                    status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+                    finished_at = CASE WHEN status = 'queued' THEN CURRENT_TIMESTAMP ELSE finished_at END,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND status IN ('queued', 'running')
+                RETURNING {', '.join(self.COLUMNS)}
+            """, (job_id,))
+            row = cur.fetchone()
+        return self._job(row) if row else self.get(job_id)
+
+    def purge_finished(self, older_than_seconds: float) -> int:
+        with self._cursor() as cur:
+            cur.execute("""
+                DELETE FROM scan_jobs
+                WHERE status IN ('completed', 'failed', 'cancelled')
+                AND finished_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+            """, (older_than_seconds,))
+            return cur.rowcount
+
+
+class ScanJobWorker:
+    """
+    Claims queued jobs and runs them one at a time
+
+    run_job(job, report) executes the scan and returns the final result dict.
+    It must call report(symbol_result) after every symbol; report returns False
+    once cancellation was requested, or once the job was re-claimed by another
+    worker after going stale, and run_job should then return None. Stores only
+    accept progress and the final status from the worker holding the job.
+    """
+
+    def __init__(
+        self,
+        store,
+        run_job: Callable[[Dict, Callable[[Dict], bool]], Optional[Dict]],
+        poll_interval: float = 2.0,
+        retention_seconds: float = 24 * 3600,
+        worker_id: Optional[str] = None
+    ):
+        self.store = store
+        self.run_job = run_job
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+    def run_once(self) -> bool:
+        """Run the next queued job; returns False when the queue was empty"""
+        job = self.store.claim_next(self.worker_id)
+        if job is None:
+            return False
+
+        job_id = job['id']
+        logger.info(f"🧵 Worker {self.worker_id} running scan job {job_id} ({job['symbols_total']} symbols)")
+        cancelled = False
+
+        def report(symbol_result: Dict) -> bool:
+            nonlocal cancelled
+            if not self.store.record_symbol(job_id, self.worker_id, symbol_result):
+                cancelled = True
+            return not cancelled
+
+        try:
+            result = self.run_job(job, report)
+        except Exception as e:
+            logger.error(f"❌ Scan job {job_id} failed: {str(e)}")
+            self._finish(job_id, 'failed', error=str(e))
+            return True
+
+        if cancelled or result is None:
+            if self._finish(job_id, 'cancelled'):
+                logger.info(f"🛑 Scan job {job_id} cancelled")
+        elif self._finish(job_id, 'completed', result=result):
+            logger.info(f"✅ Scan job {job_id} completed")
+        return True
+
+    def _finish(self, job_id: str, status: str, **kwargs) -> bool:
+        """Record the final status; False when another worker re-claimed the job meanwhile"""
+        if self.store.finish(job_id, self.worker_id, status, **kwargs):
+            return True
+        logger.warning(f"⚠️ Scan job {job_id} was re-claimed by another worker; dropping this run")
+        return False
+
+    def run_forever(self, stop_event: Optional[threading.Event] = None):
+        """Poll for jobs until stop_event is set"""
+        stop_event = stop_event or threading.Event()
+        last_purge = 0.0
+        logger.info(f"🧵 Scan job worker {self.worker_id} started")
+
+        while not stop_event.is_set():
+            try:
+                if time.time() - last_purge > 3600:
+                    self.store.purge_finished(self.retention_seconds)
+                    last_purge = time.time()
+                if not self.run_once():
+                    stop_event.wait(self.poll_interval)
+            except Exception as e:
+                logger.error(f"❌ Scan job worker error: {str(e)}")
+                stop_event.wait(self.poll_interval)
+
+
+def create_scan_job_store_from_env(db_pool=None):
+    """
+    Build the job store from environment variables
+
+    SCAN_JOB_BACKEND        postgres | file (default postgres)
+    SCAN_JOB_DIR            job directory for the file backend
+    SCAN_JOB_STALE_SECONDS  running jobs silent this long are re-queued (default 600)
+
+    The postgres backend borrows connections from db_pool (db_pool.ConnectionPool).
+    """
+    backend = os.environ.get('SCAN_JOB_BACKEND', 'postgres').lower()
+    stale_seconds = float(os.environ.get('SCAN_JOB_STALE_SECONDS', 600))
+
+    if backend == 'postgres' and db_pool is not None:
+        return PostgresJobStore(db_pool, stale_seconds=stale_seconds)
+
+    directory = os.environ.get('SCAN_JOB_DIR', os.path.join(tempfile.gettempdir(), 'options_scanner_jobs'))
+    return FileJobStore(directory, stale_seconds=stale_seconds)
@@ -0,0 +1,130 @@
+"""
+Process pool for screening symbols on every core
+
+Screening and pair matching are CPU-bound Python, so one gunicorn worker
+screens on one core however many symbols are in flight. With
+SCAN_PROCESS_WORKERS set, iter_scan_filters hands each parsed chain to a pool
+of worker processes instead:
+
+- the chain's columnar rows (OptionChain.rows, CHAIN_DTYPE) are copied into a
+  shared memory block, and the worker gets only the block's name, the row count
+  and the expiration strings - no per-contract pickling
+- the worker maps the block, copies the rows out (one memcpy), runs
+  scanner.scan_symbol for every filter and returns ({key: opportunities},
+  {key: error}); the block is unlinked when the task finishes or is cancelled
+
+Workers are started with 'spawn', so they hold no database connections,
+threads or locks of the web worker that submitted the task. Like every spawn
+child they re-import the parent's __main__: entry scripts import app inside
+their main guard, and app skips its startup (default filter, job worker
+threads) in multiprocessing children. Their scan timings go to their own
+metrics file and show up in /api/metrics.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from option_chain import CHAIN_DTYPE, OptionChain
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(log_level: int):
+    logging.basicConfig(level=log_level)
+
+
+def _screen_shared_chain(block_name: str, n_rows: int, expirations: List[str], symbol: str, price: float,
+                         filters: Dict[str, Dict], as_of: datetime, source: str) -> Tuple[Dict, Dict]:
+    """Screen a chain held in shared memory against every filter; runs in a worker process"""
+    import metrics
+    from scanner import scan_symbol
+
+    block = SharedMemory(name=block_name)
+    try:
+        rows = np.ndarray(n_rows, dtype=CHAIN_DTYPE, buffer=block.buf).copy()
+    finally:
+        block.close()
+    chain = OptionChain(rows, expirations)
+
+    found, errors = {}, {}
+    for key, params in filters.items():
+        try:
+            with metrics.timer('scan_symbol_seconds', source=source):
+                found[key] = scan_symbol(symbol, price, chain, as_of=as_of, **params)
+        except Exception as e:
+            logger.error(f"❌ Error processing {symbol} [{key}]: {str(e)}")
+            errors[key] = str(e)
+    return found, errors
+
+
+def _release(block: SharedMemory):
+    block.close()
+    block.unlink()
+
+
+class ScanProcessPool:
+    """
+    Worker processes that screen shared-memory chains, started on first use
+
+    Args:
+        workers: Worker processes (one per core the dyno has is a good start)
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=get_context('spawn'),
+                    initializer=_init_worker, initargs=(logging.getLogger().getEffectiveLevel(),))
+            return self._executor
+
+    def submit(self, symbol: str, price: float, chain: OptionChain, filters: Dict[str, Dict],
+               as_of: datetime, source: str = 'live') -> Future:
+        """
+        Screen one symbol's chain against filters in a worker process
+
+        The future's result is ({key: opportunities}, {key: error}), as
+        scan_symbol would give per filter in this process.
+        """
+        block = SharedMemory(create=True, size=max(1, chain.rows.nbytes))
+        try:
+            np.ndarray(len(chain), dtype=CHAIN_DTYPE, buffer=block.buf)[:] = chain.rows
+            future = self._pool().submit(_screen_shared_chain, block.name, len(chain), chain.expirations,
+                                         symbol, price, filters, as_of, source)
+        except BaseException:
+            _release(block)
+            raise
+        future.add_done_callback(lambda _: _release(block))
+        return future
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def create_scan_pool_from_env() -> Optional[ScanProcessPool]:
+    """
+    Screening process pool from environment variables (None = screen in the request thread)
+
+    SCAN_PROCESS_WORKERS   worker processes per web worker (default 0 = off, "auto" = CPU count)
+    """
+    workers = os.environ.get('SCAN_PROCESS_WORKERS', '0').strip().lower()
+    workers = (os.cpu_count() or 1) if workers == 'auto' else int(workers)
+    if workers <= 0:
+        return None
+    logger.info(f"🧮 Scan process pool: {workers} workers")
+    return ScanProcessPool(workers)
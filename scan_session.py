@@ -0,0 +1,259 @@
+"""
+Per-session candidate index for interactive re-screening
+
+While a user tunes filter thresholds and rescans the same watchlist, each
+symbol's parsed chain is kept with an index of its calls and puts sorted by
+days to expiration. A rescan in the same session skips fetching and parsing,
+and scanner.scan_symbol(candidates=...) uses the index instead of filtering
+the whole chain:
+
+- the DTE window is two binary searches over the sorted index
+- when the moneyness range, OI and volume minimums only got tighter, the
+  previous scan's candidates are narrowed, and only days a wider DTE window
+  newly admits are evaluated; anything looser re-filters the DTE slice
+- pair metrics are kept for the last LEAPS x short candidate sets, so a new
+  max_net_debit or max_trades is a mask and a slice over cached pairs
+
+Results are identical to a scan of the same chain and as_of. A session
+keeps the chain (and as_of) of its first scan of a symbol for up to ttl
+seconds, so tuning compares like with like; after that the symbol is
+fetched again. Sessions live in one process: a rescan that lands on another
+gunicorn worker builds its own index there.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from option_chain import CALL, ITM, OTM, PUT, OptionChain, moneyness, sort_by_delta_distance
+from pair_matching import match_pairs
+from records import LeapsLeg, ShortLeg
+from scanner import leaps_legs, short_legs
+
+logger = logging.getLogger(__name__)
+
+
+class CandidateIndex:
+    """
+    Contracts of one kind sorted by days to expiration, with the columns the leg filters test
+
+    Args:
+        chain: The symbol's chain
+        kind: CALL or PUT
+        price: Underlying price the moneyness is measured against
+        days_to_exp: Days to expiration of every chain row
+        side: ITM (filter on ITM fraction) or OTM (OTM fraction)
+    """
+
+    def __init__(self, chain: OptionChain, kind: int, price: float, days_to_exp: np.ndarray, side: int):
+        rows = np.flatnonzero(chain.rows['kind'] == kind)
+        rows = rows[np.argsort(days_to_exp[rows], kind='stable')]
+        self.rows = rows
+        self.days = days_to_exp[rows]
+        self.moneyness = side * moneyness(chain, price, kind)[rows]
+        self.open_interest = chain.rows['open_interest'][rows]
+        self.volume = chain.rows['volume'][rows]
+        self._last: Optional[Tuple] = None  # (lo, hi, thresholds, positions) of the last select()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.rows, self.days, self.moneyness, self.open_interest, self.volume))
+
+    def _passes(self, positions: np.ndarray, thresholds: Tuple) -> np.ndarray:
+        money_min, money_max, min_oi, min_volume = thresholds
+        money = self.moneyness[positions]
+        return ((money >= money_min) & (money <= money_max)
+                & (self.volume[positions] >= min_volume) & (self.open_interest[positions] >= min_oi))
+
+    def _scan(self, start: int, stop: int, thresholds: Tuple) -> np.ndarray:
+        positions = np.arange(start, stop)
+        return positions[self._passes(positions, thresholds)]
+
+    def select(self, min_days: int, max_days: int, money_min: float, money_max: float,
+               min_oi: int, min_volume: int) -> np.ndarray:
+        """Chain rows passing the filter, in chain order (like np.flatnonzero of the filter mask)"""
+        lo = int(np.searchsorted(self.days, min_days, 'left'))
+        hi = int(np.searchsorted(self.days, max_days, 'right'))
+        thresholds = (money_min, money_max, min_oi, min_volume)
+
+        last = self._last
+        if last is not None and _tighter(thresholds, last[2]):
+            last_lo, last_hi, _, last_positions = last
+            # Rows that failed the last thresholds fail these too; only unseen days need a look
+            kept = last_positions[(last_positions >= lo) & (last_positions < hi)]
+            parts = [kept[self._passes(kept, thresholds)]]
+            for start, stop in ((lo, min(hi, last_lo)), (max(lo, last_hi), hi)):
+                if start < stop:
+                    parts.append(self._scan(start, stop, thresholds))
+            positions = np.concatenate(parts)
+        else:
+            positions = self._scan(lo, hi, thresholds)
+
+        self._last = (lo, hi, thresholds, positions)
+        return np.sort(self.rows[positions])
+
+
+def _tighter(thresholds: Tuple, last: Tuple) -> bool:
+    """True if thresholds admit nothing the last ones rejected"""
+    money_min, money_max, min_oi, min_volume = thresholds
+    last_min, last_max, last_oi, last_volume = last
+    return money_min >= last_min and money_max <= last_max and min_oi >= last_oi and min_volume >= last_volume
+
+
+class SymbolCandidates:
+    """
+    One symbol's chain with candidate indexes and cached pair metrics, for scan_symbol(candidates=...)
+
+    Args:
+        symbol: Stock symbol
+        price: Underlying price
+        chain: Parsed chain
+        as_of: Time days to expiration count from (default now)
+    """
+
+    def __init__(self, symbol: str, price: float, chain: OptionChain, as_of: Optional[datetime] = None):
+        self.symbol = symbol
+        self.price = price
+        self.chain = chain
+        self.as_of = as_of or datetime.now()
+        self.days_to_exp = chain.days_to_expiration(self.as_of)
+
+        self._lock = threading.Lock()
+        self._indexes: Dict[Tuple[int, int], CandidateIndex] = {}
+        self._pairs: Optional[Tuple] = None  # (key, uncapped match_pairs result)
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            pairs = sum(a.nbytes for a in self._pairs[1].values()) if self._pairs else 0
+            return (self.chain.rows.nbytes + self.days_to_exp.nbytes + pairs
+                    + sum(index.nbytes for index in self._indexes.values()))
+
+    def _select(self, option_type: str, side: int, target_delta: float, limit: Optional[int],
+                *criteria) -> np.ndarray:
+        kind = CALL if option_type == "call" else PUT
+        with self._lock:
+            index = self._indexes.get((kind, side))
+            if index is None:
+                index = self._indexes[(kind, side)] = CandidateIndex(
+                    self.chain, kind, self.price, self.days_to_exp, side)
+            rows = index.select(*criteria)
+        return sort_by_delta_distance(self.chain, rows, target_delta, limit)
+
+    def find_leaps(self, min_days: int, max_days: int, itm_min_pct: float, itm_max_pct: float,
+                   min_oi: int, min_volume: int, option_type: str, target_delta: float,
+                   limit: Optional[int] = None) -> List[LeapsLeg]:
+        """scanner.find_leaps over this chain and as_of"""
+        index = self._select(option_type, ITM, target_delta, limit,
+                             min_days, max_days, itm_min_pct, itm_max_pct, min_oi, min_volume)
+        return leaps_legs(self.chain, index, self.as_of)
+
+    def find_shorts(self, min_days: int, max_days: int, otm_min_pct: float, otm_max_pct: float,
+                    min_oi: int, min_volume: int, option_type: str, target_delta: float,
+                    limit: Optional[int] = None) -> List[ShortLeg]:
+        """scanner.find_shorts over this chain and as_of"""
+        index = self._select(option_type, OTM, target_delta, limit,
+                             min_days, max_days, otm_min_pct, otm_max_pct, min_oi, min_volume)
+        return short_legs(self.chain, index, self.as_of)
+
+    def match_pairs(self, leaps: List[LeapsLeg], shorts: List[ShortLeg], option_type: str,
+                    max_net_debit: float, risk_free_rate: float,
+                    top_k: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        pair_matching.match_pairs for this symbol's price
+
+        Every pair is computed once per (legs, option_type, rate) without the
+        net debit cap or top_k, best ROC first; those are applied on the way out.
+        """
+        key = (option_type, risk_free_rate, tuple(leaps), tuple(shorts))
+        with self._lock:
+            cached = self._pairs if self._pairs is not None and self._pairs[0] == key else None
+        if cached is None:
+            pairs = match_pairs(leaps, shorts, self.price, option_type, np.inf, risk_free_rate)
+            with self._lock:
+                self._pairs = (key, pairs)
+        else:
+            pairs = cached[1]
+
+        keep = np.flatnonzero(pairs['net_debit'] <= max_net_debit)[:top_k]
+        return {name: values[keep] for name, values in pairs.items()}
+
+
+class ScanSessionStore:
+    """
+    SymbolCandidates per (session, data source, symbol), LRU bounded by memory
+
+    Args:
+        ttl: Seconds a symbol's chain is reused after it was fetched
+        max_bytes: Memory budget for the kept chains and indexes (estimated)
+    """
+
+    def __init__(self, ttl: float = 600.0, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, SymbolCandidates]]" = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, session_id: str, data_source: str, symbol: str) -> Optional[SymbolCandidates]:
+        key = (session_id, data_source, symbol)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def put(self, session_id: str, data_source: str, symbol: str, candidates: SymbolCandidates):
+        with self._lock:
+            self._entries[(session_id, data_source, symbol)] = (time.monotonic(), candidates)
+            self._entries.move_to_end((session_id, data_source, symbol))
+            self._evict()
+
+    def _evict(self):
+        # Sizes grow as indexes and pairs are cached, so they are re-measured here
+        now = time.monotonic()
+        for key in [key for key, (stored_at, _) in self._entries.items() if now - stored_at > self.ttl]:
+            del self._entries[key]
+        total = sum(candidates.nbytes for _, candidates in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            total -= evicted.nbytes
+            self._stats['evictions'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['sessions'] = len({key[0] for key in self._entries})
+        stats['ttl'] = self.ttl
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+def create_scan_session_store_from_env() -> Optional[ScanSessionStore]:
+    """
+    Session candidate store from environment variables (None = disabled)
+
+    SCAN_SESSION_TTL      seconds a session reuses a symbol's chain (default 600, 0 disables)
+    SCAN_SESSION_MAX_MB   memory budget per worker (default 64)
+    """
+    ttl = float(os.environ.get('SCAN_SESSION_TTL', 600))
+    if ttl <= 0:
+        return None
+    store = ScanSessionStore(
+        ttl=ttl,
+        max_bytes=int(float(os.environ.get('SCAN_SESSION_MAX_MB', 64)) * 1024 * 1024),
+    )
+    logger.info(f"🗂️  Scan sessions: chains reused for {ttl:g}s, {store.max_bytes // (1024 * 1024)} MB")
+    return store
@@ -0,0 +1,23 @@
+"""
+Background scan job worker
+
+Runs queued scan jobs (POST /api/scan/jobs) outside the web processes:
+    python scan_worker.py
+
+Use SCAN_JOB_BACKEND=postgres when the worker runs on a different host or
+dyno than the web app; the file backend only shares jobs on one host.
+"""
+import os
+import logging
+
+from scan_jobs import ScanJobWorker
+
+logger = logging.getLogger(__name__)
+
+if __name__ == '__main__':
+    # Imported here: scan pool workers re-import this module and must not load the app
+    from app import run_scan_job, scan_job_store
+
+    poll_interval = float(os.environ.get('SCAN_JOB_POLL_INTERVAL', 2))
+    logger.info(f"🧵 Starting scan worker ({type(scan_job_store).__name__})")
+    ScanJobWorker(scan_job_store, run_scan_job, poll_interval=poll_interval).run_forever()
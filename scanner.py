@@ -0,0 +1,304 @@
+"""
+PMCC/PMCP scan engine: leg filters, pair matching and opportunity records
+
+Works on one symbol's already fetched price and option chain, with no
+database, network or Flask dependency, so the web app, background workers
+and offline replay processes all screen chains the same way.
+"""
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import metrics
+from option_chain import CALL, ITM, OTM, PUT, OptionChain, as_option_chain, sort_by_delta_distance
+from pair_matching import match_pairs
+from pricing import probability_of_profit
+from records import LeapsLeg, Opportunity, ShortLeg
+
+logger = logging.getLogger(__name__)
+
+# LEAPS and shorts (closest to target delta) considered per symbol when pairing, 0 = no cap
+PAIR_CANDIDATE_LIMIT = max(0, int(os.environ.get('PAIR_CANDIDATE_LIMIT', 50)))
+
+def parse_expiration_date(date_str: str) -> datetime:
+    """Parse expiration date string to datetime object"""
+    return datetime.strptime(date_str, "%Y-%m-%d")
+
+def find_leaps(
+    data,
+    current_price: float,
+    min_days: int,
+    max_days: int,
+    itm_min_pct: float,
+    itm_max_pct: float,
+    min_oi: int,
+    min_volume: int,
+    option_type: str,
+    target_delta: float,
+    as_of: Optional[datetime] = None,
+    limit: Optional[int] = None
+) -> List[LeapsLeg]:
+    """
+    Filter and find qualifying LEAPS options
+    
+    data may be a raw options list or an OptionChain parsed once per symbol.
+    Days to expiration count from as_of (default now).
+    Returns LeapsLeg records sorted by delta closest to target (only the closest limit, if given).
+    """
+    chain = as_option_chain(data)
+    kind = CALL if option_type == "call" else PUT
+    now = as_of or datetime.now()
+    
+    # Debug: Log what we're looking for
+    logger.info(f"🔍 find_leaps: Looking for option_type='{option_type}'")
+    logger.info(f"📊 Available options: {chain.count(CALL)} calls, {chain.count(PUT)} puts")
+    
+    # DTE window and ITM range resolve to strike slices of the chain's expiration index
+    candidates = chain.expiration_index(kind).select(
+        current_price, ITM, min_days, max_days, itm_min_pct, itm_max_pct, min_oi, min_volume, now)
+    
+    # Sort by delta closest to target
+    index = sort_by_delta_distance(chain, candidates, target_delta, limit)
+    
+    return leaps_legs(chain, index, now)
+
+def leaps_legs(chain: OptionChain, index: np.ndarray, now: datetime) -> List[LeapsLeg]:
+    """LeapsLeg records for the given chain rows, in index order, days to expiration from now"""
+    rows = chain.rows
+    days_to_exp = chain.expiration_days(now)[rows['exp_code'][index]]
+    return list(map(LeapsLeg._make, zip(
+        chain.expiration_strings(index),
+        rows['strike'][index].tolist(),
+        rows['ask'][index].tolist(),
+        rows['delta'][index].tolist(),
+        days_to_exp.tolist(),
+        rows['open_interest'][index].tolist(),
+        rows['volume'][index].tolist()
+    )))
+
+def find_shorts(
+    data,
+    current_price: float,
+    min_days: int,
+    max_days: int,
+    otm_min_pct: float,
+    otm_max_pct: float,
+    min_oi: int,
+    min_volume: int,
+    option_type: str,
+    target_delta: float,
+    as_of: Optional[datetime] = None,
+    limit: Optional[int] = None
+) -> List[ShortLeg]:
+    """
+    Filter and find qualifying short options
+    
+    data may be a raw options list or an OptionChain parsed once per symbol.
+    Days to expiration count from as_of (default now).
+    Returns ShortLeg records sorted by delta closest to target (only the closest limit, if given).
+    """
+    chain = as_option_chain(data)
+    kind = CALL if option_type == "call" else PUT
+    now = as_of or datetime.now()
+    
+    # Debug: Log what we're looking for
+    logger.info(f"🔍 find_shorts: Looking for option_type='{option_type}'")
+    
+    # DTE window and OTM range resolve to strike slices of the chain's expiration index
+    candidates = chain.expiration_index(kind).select(
+        current_price, OTM, min_days, max_days, otm_min_pct, otm_max_pct, min_oi, min_volume, now)
+    
+    # Sort by delta closest to target
+    index = sort_by_delta_distance(chain, candidates, target_delta, limit)
+    
+    return short_legs(chain, index, now)
+
+def short_legs(chain: OptionChain, index: np.ndarray, now: datetime) -> List[ShortLeg]:
+    """ShortLeg records for the given chain rows, in index order, days to expiration from now"""
+    rows = chain.rows
+    days_to_exp = chain.expiration_days(now)[rows['exp_code'][index]]
+    return list(map(ShortLeg._make, zip(
+        chain.expiration_strings(index),
+        rows['strike'][index].tolist(),
+        rows['bid'][index].tolist(),
+        rows['delta'][index].tolist(),
+        rows['implied_volatility'][index].tolist(),
+        days_to_exp.tolist(),
+        rows['open_interest'][index].tolist(),
+        rows['volume'][index].tolist()
+    )))
+
+def calculate_pop(S: float, K: float, T: float, r: float, sigma: float, option_type: str, breakeven: float = None) -> float:
+    """
+    Calculate Probability of Profit using Black-Scholes
+    
+    Args:
+        S: Current stock price
+        K: Strike price (or short strike for puts)
+        T: Time to expiration (years)
+        r: Risk-free rate
+        sigma: Implied volatility
+        option_type: 'call' or 'put'
+        breakeven: Breakeven price for PMCP (puts only) - if provided, calculates probability of reaching breakeven instead of short strike
+    
+    Returns:
+        Probability as decimal (0-1)
+    
+    For PMCC (calls): Probability stock stays below short strike (max profit zone)
+    For PMCP (puts): Probability stock stays below breakeven (actual profit zone) if breakeven provided, otherwise below short strike
+    
+    Array inputs and the memoized per-short variant live in pricing.py.
+    """
+    return probability_of_profit(S, K, T, r, sigma, option_type, breakeven)
+
+def strategy_option_type(type_of_trade: str) -> str:
+    """'call' for Poor Mans Covered Call, 'put' for Poor Mans Covered Put"""
+    return "call" if type_of_trade == 'Poor Mans Covered Call' else "put"
+
+def scan_symbol(
+    symbol: str,
+    price: float,
+    options,
+    type_of_trade: str = 'Poor Mans Covered Call',
+    leaps_min_days: int = 365,
+    leaps_max_days: int = 730,
+    leaps_itm_min_pct: float = 0.10,
+    leaps_itm_max_pct: float = 0.50,
+    leaps_min_oi: int = 10,
+    leaps_min_volume: int = 10,
+    short_min_days: int = 30,
+    short_max_days: int = 60,
+    short_otm_min_pct: float = 0.05,
+    short_otm_max_pct: float = 0.15,
+    short_min_oi: int = 10,
+    short_min_volume: int = 10,
+    max_net_debit: float = 5000.0,
+    max_trades: int = 500,
+    risk_free_rate: float = 0.05,
+    as_of: Optional[datetime] = None,
+    candidates=None
+) -> List[Opportunity]:
+    """
+    Screen one symbol's chain for PMCC/PMCP opportunities
+    
+    options may be a raw Alpha Vantage options list or an OptionChain; as_of
+    is the time days to expiration count from (default now - pass the
+    snapshot time when replaying recorded chains).
+    
+    candidates is an optional scan_session.SymbolCandidates built from this
+    chain and as_of: its sorted candidate index replaces the leg filters and
+    its cached pair metrics are reused, with identical results.
+    
+    Returns the symbol's best max_trades opportunities sorted by ROC.
+    """
+    option_type = strategy_option_type(type_of_trade)
+    leaps_target_delta = 0.8 if option_type == "call" else -0.8
+    short_target_delta = 0.3 if option_type == "call" else -0.3
+    
+    # Only the LEAPS and shorts closest to target delta are paired
+    candidate_limit = PAIR_CANDIDATE_LIMIT or None
+    
+    # Parse the chain into columns once (stored snapshots and batch scans already are);
+    # both leg filters run over it
+    if isinstance(options, OptionChain):
+        chain = options
+    else:
+        with metrics.timer('scan_stage_seconds', stage='parse_chain'):
+            chain = as_option_chain(options)
+    
+    # Find qualifying LEAPS
+    with metrics.timer('scan_stage_seconds', stage='find_leaps'):
+        if candidates is not None:
+            leaps = candidates.find_leaps(
+                leaps_min_days, leaps_max_days,
+                leaps_itm_min_pct, leaps_itm_max_pct,
+                leaps_min_oi, leaps_min_volume,
+                option_type, leaps_target_delta, candidate_limit
+            )
+        else:
+            leaps = find_leaps(
+                chain, price, leaps_min_days, leaps_max_days,
+                leaps_itm_min_pct, leaps_itm_max_pct,
+                leaps_min_oi, leaps_min_volume,
+                option_type, leaps_target_delta, as_of, candidate_limit
+            )
+    logger.info(f"✅ Found {len(leaps)} qualifying LEAPS")
+    
+    # Find qualifying shorts
+    with metrics.timer('scan_stage_seconds', stage='find_shorts'):
+        if candidates is not None:
+            shorts = candidates.find_shorts(
+                short_min_days, short_max_days,
+                short_otm_min_pct, short_otm_max_pct,
+                short_min_oi, short_min_volume,
+                option_type, short_target_delta, candidate_limit
+            )
+        else:
+            shorts = find_shorts(
+                chain, price, short_min_days, short_max_days,
+                short_otm_min_pct, short_otm_max_pct,
+                short_min_oi, short_min_volume,
+                option_type, short_target_delta, as_of, candidate_limit
+            )
+    logger.info(f"✅ Found {len(shorts)} qualifying shorts")
+    
+    # Match LEAPS with shorts - all pair metrics in one broadcast pass,
+    # keeping only this symbol's best max_trades pairs by ROC
+    with metrics.timer('scan_stage_seconds', stage='match_pairs'):
+        if candidates is not None:
+            pairs = candidates.match_pairs(leaps, shorts, option_type, max_net_debit,
+                                           risk_free_rate, top_k=max_trades)
+        else:
+            pairs = match_pairs(leaps, shorts, price, option_type, max_net_debit,
+                                risk_free_rate, top_k=max_trades)
+    metrics.inc('scan_pairs_evaluated_total', len(leaps) * len(shorts))
+    
+    return build_opportunities(symbol, price, leaps, shorts, pairs, type_of_trade)
+
+def build_opportunities(
+    symbol: str,
+    price: float,
+    leaps: List[LeapsLeg],
+    shorts: List[ShortLeg],
+    pairs: Dict[str, np.ndarray],
+    type_of_trade: str
+) -> List[Opportunity]:
+    """Opportunity records for match_pairs() output, in its (ROC) order"""
+    opportunities = []
+    columns = {name: values.tolist() for name, values in pairs.items()}
+    for i, (leap_i, short_i) in enumerate(zip(columns['leap_index'], columns['short_index'])):
+        leap = leaps[leap_i]
+        short = shorts[short_i]
+        
+        opportunities.append(Opportunity(
+            symbol=symbol,
+            underlying_price=price,
+            leaps_strike=leap.strike,
+            leaps_price=columns['leaps_cost'][i] / 100,  # Per share
+            leaps_expiration=leap.expiration,
+            leaps_days_to_expiration=leap.days_to_expiration,
+            leaps_delta=leap.delta,
+            leaps_open_interest=leap.open_interest,
+            leaps_volume=leap.volume,
+            short_strike=short.strike,
+            short_price=columns['short_premium'][i] / 100,  # Per share
+            short_expiration=short.expiration,
+            short_days_to_expiration=short.days_to_expiration,
+            short_delta=short.delta,
+            short_iv=short.implied_volatility,
+            short_open_interest=short.open_interest,
+            short_volume=short.volume,
+            net_debit=columns['net_debit'][i],
+            net_debit_pct=columns['net_debit_pct'][i],
+            max_profit=columns['max_profit'][i],
+            roc_pct=columns['roc_pct'][i],
+            pop_pct=columns['pop_pct'][i],
+            position_delta=columns['position_delta'][i],
+            breakeven=columns['breakeven'][i],
+            type_of_trade=type_of_trade
+        ))
+    
+    return opportunities
@@ -0,0 +1,72 @@
+"""
+Bounded top-k selection
+
+The scan keeps only the best few of everything it ranks (candidate legs by
+delta distance, pairs and opportunities by ROC), so nothing needs a full
+sort. Both helpers give exactly what a stable full sort truncated to k
+would, ties included:
+
+    smallest_k(values, k)     == np.argsort(values, kind='stable')[:k]
+    TopK(k, key) fed items    == sorted(items, key=key, reverse=True)[:k]
+
+smallest_k partitions the array (O(n)) and sorts only the k it keeps;
+TopK is a heap of at most k items, so memory stays O(k) however many are fed.
+"""
+import heapq
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+
+def smallest_k(values: np.ndarray, k: Optional[int]) -> np.ndarray:
+    """Positions of the k smallest values in ascending order, ties in input order"""
+    n = len(values)
+    if k is None or k >= n:
+        return np.argsort(values, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    kth = np.partition(values, k - 1)[k - 1]
+    if np.isnan(kth):  # NaNs sort last; rare enough to take the full sort
+        return np.argsort(values, kind='stable')[:k]
+
+    # Everything strictly below the k-th value, then the earliest of its ties
+    below = np.flatnonzero(values < kth)
+    ties = np.flatnonzero(values == kth)[:k - len(below)]
+    chosen = np.sort(np.concatenate([below, ties]))
+    return chosen[np.argsort(values[chosen], kind='stable')]
+
+
+class TopK:
+    """
+    The k items with the largest key among those pushed; earlier items win ties
+
+    Args:
+        k: Items to keep (None = keep everything)
+        key: Ranking key of an item
+    """
+
+    def __init__(self, k: Optional[int], key: Callable):
+        self.k = k
+        self.key = key
+        self._heap: List = []  # (key, -arrival, item), smallest first
+        self._pushed = 0
+
+    def push(self, item):
+        entry = (self.key(item), -self._pushed, item)
+        self._pushed += 1
+        if self.k is None or len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif self._heap and entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def extend(self, items: Iterable):
+        for item in items:
+            self.push(item)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def items(self) -> List:
+        """Kept items, largest key first"""
+        return [entry[2] for entry in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
@@ -0,0 +1,137 @@
+"""
+Columnar on-disk option chain snapshots
+
+Each fetched chain is written once as a NumPy structured array (CHAIN_DTYPE)
+plus a small JSON sidecar holding the dictionary-encoded expirations and the
+underlying price:
+
+    {root}/{SYMBOL}/{YYYYmmddTHHMMSS}.npy    rows, one per contract
+    {root}/{SYMBOL}/{YYYYmmddTHHMMSS}.json   expirations, underlying_price, timestamp
+
+Loading memory-maps the .npy file, so an OptionChain is ready for the leg
+filters without parsing strings or building per-contract dicts, and pages are
+only read as columns are touched. The sidecar is written last and marks the
+snapshot as complete.
+"""
+import bisect
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from option_chain import CHAIN_DTYPE, OptionChain, as_option_chain
+
+TIMESTAMP_FORMAT = '%Y%m%dT%H%M%S'
+
+# Symbols become directory names; anything else (path separators, '..') is refused
+SYMBOL_PATTERN = re.compile(r'[A-Z0-9][A-Z0-9.-]{0,9}')
+
+
+class ChainSnapshotStore:
+    """Directory of columnar chain snapshots, one pair of files per (symbol, timestamp)"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _symbol_dir(self, symbol: str) -> str:
+        symbol = symbol.upper()
+        if not SYMBOL_PATTERN.fullmatch(symbol):
+            raise ValueError(f"Invalid symbol {symbol!r} (1-10 letters, digits, '.' or '-')")
+        return os.path.join(self.root, symbol)
+
+    def _replace(self, path: str, write):
+        """Write through a temp file in the same directory so readers never see partial files"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def write(self, symbol: str, underlying_price: float, options: Union[OptionChain, List[Dict]],
+              timestamp: Optional[datetime] = None) -> str:
+        """Store one chain (OptionChain or Alpha Vantage list); returns the .npy path"""
+        chain = as_option_chain(options)
+        timestamp = (timestamp or datetime.now()).replace(microsecond=0)
+        directory = self._symbol_dir(symbol)
+        os.makedirs(directory, exist_ok=True)
+
+        base = os.path.join(directory, timestamp.strftime(TIMESTAMP_FORMAT))
+        rows = np.ascontiguousarray(chain.rows, dtype=CHAIN_DTYPE)
+        self._replace(base + '.npy', lambda f: np.save(f, rows, allow_pickle=False))
+
+        meta = {
+            'symbol': symbol.upper(),
+            'timestamp': timestamp.isoformat(),
+            'underlying_price': float(underlying_price),
+            'expirations': list(chain.expirations),
+            'rows': len(rows),
+        }
+        self._replace(base + '.json', lambda f: f.write(json.dumps(meta).encode()))
+        return base + '.npy'
+
+    def symbols(self) -> List[str]:
+        """Symbols with at least one stored snapshot"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def timestamps(self, symbol: str) -> List[datetime]:
+        """Complete snapshots for a symbol, oldest first"""
+        try:
+            names = os.listdir(self._symbol_dir(symbol))
+        except FileNotFoundError:
+            return []
+        stamps = []
+        for name in names:
+            if name.endswith('.json'):
+                try:
+                    stamps.append(datetime.strptime(name[:-5], TIMESTAMP_FORMAT))
+                except ValueError:
+                    continue
+        return sorted(stamps)
+
+    def load(self, symbol: str, as_of: Optional[datetime] = None,
+             mmap: bool = True) -> Tuple[float, OptionChain, datetime]:
+        """
+        Latest snapshot taken at or before as_of (default: the latest)
+
+        Returns (underlying_price, chain, snapshot timestamp). With mmap the
+        chain's rows are a read-only view of the file.
+        """
+        stamps = self.timestamps(symbol)
+        if as_of is not None:
+            stamps = stamps[:bisect.bisect_right(stamps, as_of)]
+        if not stamps:
+            when = f" at or before {as_of:%Y-%m-%d %H:%M:%S}" if as_of else ""
+            raise FileNotFoundError(f"No stored chain snapshot for {symbol}{when}")
+        return self.load_snapshot(symbol, stamps[-1], mmap=mmap)
+
+    def load_snapshot(self, symbol: str, timestamp: datetime,
+                      mmap: bool = True) -> Tuple[float, OptionChain, datetime]:
+        """One specific snapshot, see load()"""
+        base = os.path.join(self._symbol_dir(symbol), timestamp.strftime(TIMESTAMP_FORMAT))
+        with open(base + '.json') as f:
+            meta = json.load(f)
+        rows = np.load(base + '.npy', mmap_mode='r' if mmap else None, allow_pickle=False)
+        if rows.dtype != CHAIN_DTYPE:
+            raise ValueError(f"Snapshot {base}.npy has an unexpected layout")
+        return meta['underlying_price'], OptionChain(rows, meta['expirations']), timestamp
+
+
+def create_snapshot_store_from_env() -> Optional[ChainSnapshotStore]:
+    """
+    Columnar snapshot store from SNAPSHOT_STORE_DIR (unset = disabled)
+
+    When enabled every live chain fetch is also written there, and scans with
+    data_source='store' screen the latest stored chain per symbol.
+    """
+    root = os.environ.get('SNAPSHOT_STORE_DIR', '')
+    return ChainSnapshotStore(root) if root else None
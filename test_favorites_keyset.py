@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Tests for favorites keyset pagination: paging with cursors returns the same rows as one ordered query"""
+import os
+import random
+import sqlite3
+
+import pytest
+
+# app needs a database URL at import; these tests never connect to it
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost:1/options_scanner_test')
+
+from app import (FavoritesQueryError, decode_favorites_cursor,  # noqa: E402
+                 encode_favorites_cursor, keyset_condition)
+
+
+@pytest.fixture
+def favorites():
+    rng = random.Random(4)
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE strategy_favorites (id INTEGER PRIMARY KEY, symbol TEXT, roc_pct REAL, pop_pct REAL)")
+    # Few distinct values, so most pages end inside a run of ties
+    conn.executemany(
+        "INSERT INTO strategy_favorites (id, symbol, roc_pct, pop_pct) VALUES (?, ?, ?, ?)",
+        [(i, rng.choice(['AMD', 'NVDA', 'SPY']), rng.choice([12.5, 20.0, 33.3333]), rng.choice([40.0, 55.5]))
+         for i in range(1, 81)])
+    yield conn
+    conn.close()
+
+
+def fetch(conn, keys, condition='', params=(), limit=None):
+    query = "SELECT * FROM strategy_favorites f"
+    if condition:
+        query += " WHERE " + condition.replace('%s', '?')
+    query += " ORDER BY " + ", ".join(f"f.{field} {direction}" for field, direction in keys)
+    if limit:
+        query += f" LIMIT {limit}"
+    return [dict(row) for row in conn.execute(query, list(params))]
+
+
+@pytest.mark.parametrize('keys', [
+    [('roc_pct', 'DESC'), ('id', 'DESC')],
+    [('roc_pct', 'ASC'), ('id', 'ASC')],
+    [('symbol', 'ASC'), ('roc_pct', 'DESC'), ('id', 'DESC')],
+    [('pop_pct', 'DESC'), ('symbol', 'ASC'), ('id', 'ASC')],
+])
+@pytest.mark.parametrize('page_size', [1, 7, 50])
+def test_pages_follow_the_full_order(favorites, keys, page_size):
+    signature = ','.join(f"{field}:{direction}" for field, direction in keys)
+    pages, condition, params = [], '', []
+    while True:
+        page = fetch(favorites, keys, condition, params, limit=page_size)
+        if not page:
+            break
+        pages.extend(page)
+        cursor = encode_favorites_cursor(signature, page[-1], keys)
+        condition, params = keyset_condition(keys, decode_favorites_cursor(cursor, signature))
+
+    assert [row['id'] for row in pages] == [row['id'] for row in fetch(favorites, keys)]
+
+
+def test_same_direction_keys_use_a_row_comparison():
+    condition, params = keyset_condition([('roc_pct', 'DESC'), ('id', 'DESC')], ['20.0', 7])
+    assert condition == "(f.roc_pct, f.id) < (CAST(%s AS numeric), CAST(%s AS integer))"
+    assert params == ['20.0', 7]
+
+
+def test_cursor_for_another_sort_is_rejected():
+    keys = [('roc_pct', 'DESC'), ('id', 'DESC')]
+    cursor = encode_favorites_cursor('roc_pct:DESC,id:DESC', {'roc_pct': 20.0, 'id': 7}, keys)
+    assert decode_favorites_cursor(cursor, 'roc_pct:DESC,id:DESC') == ['20.0', 7]
+    with pytest.raises(FavoritesQueryError):
+        decode_favorites_cursor(cursor, 'roc_pct:ASC,id:ASC')
+    with pytest.raises(FavoritesQueryError):
+        decode_favorites_cursor('not a cursor', 'roc_pct:DESC,id:DESC')
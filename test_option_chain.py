@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Tests for ExpirationIndex.select against a full-chain mask of the same conditions"""
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from option_chain import CALL, ITM, OTM, PUT, OptionChain, moneyness
+
+NOW = datetime(2026, 1, 5, 10, 30)
+
+
+def random_chain(rng: random.Random) -> OptionChain:
+    expirations = [(NOW + timedelta(days=days)).strftime('%Y-%m-%d') for days in (3, 10, 31, 95, 400)]
+    expirations.append('not-a-date')
+    data = []
+    for _ in range(300):
+        data.append({
+            'type': rng.choice(['call', 'put']),
+            'expiration': rng.choice(expirations),
+            'strike': rng.choice([str(strike) for strike in range(80, 125, 5)] + ['', '100']),
+            'delta': str(rng.uniform(-1, 1)),
+            'open_interest': str(rng.choice([0, 10, 100])),
+            'volume': str(rng.choice([0, 5, 50])),
+        })
+    return OptionChain.from_alphavantage(data)
+
+
+def full_mask(chain, kind, price, measure, min_days, max_days, pct_min, pct_max, min_oi, min_volume):
+    """The per-row filter select() replaces"""
+    rows = chain.rows
+    days = chain.days_to_expiration(NOW)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = measure * moneyness(chain, price, kind)
+    mask = ((rows['kind'] == kind) & (days >= min_days) & (days <= max_days)
+            & (fraction >= pct_min) & (fraction <= pct_max)
+            & (rows['open_interest'] >= min_oi) & (rows['volume'] >= min_volume))
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize('kind', [CALL, PUT])
+@pytest.mark.parametrize('measure', [ITM, OTM])
+def test_select_matches_full_mask(kind, measure):
+    rng = random.Random(kind * 10 + measure)
+    chain = random_chain(rng)
+    index = chain.expiration_index(kind)
+    for _ in range(200):
+        price = rng.choice([100.0, 97.5, 0.0, np.inf])
+        pct_min, pct_max = sorted(rng.choice([-0.2, -0.05, 0.0, 0.05, 0.1, 0.3]) for _ in range(2))
+        args = (price, measure, rng.choice([0, 5, 30]), rng.choice([30, 100, 500]),
+                pct_min, pct_max, rng.choice([0, 10]), rng.choice([0, 5]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            selected = index.select(*args, now=NOW)
+        assert selected.tolist() == full_mask(chain, kind, *args).tolist()
+
+
+@pytest.mark.parametrize('pct_min, pct_max', [(np.nan, 0.1), (-0.1, np.nan), (np.nan, np.nan)])
+def test_select_with_nan_bounds(pct_min, pct_max):
+    chain = random_chain(random.Random(1))
+    args = (100.0, OTM, 0, 500, pct_min, pct_max, 0, 0)
+    selected = chain.expiration_index(CALL).select(*args, now=NOW)
+    # NaN compares false, so a NaN bound admits nothing - as in the full-chain mask
+    assert selected.tolist() == full_mask(chain, CALL, *args).tolist() == []
+
+
+def test_rows_without_date_or_strike_never_selected():
+    chain = random_chain(random.Random(2))
+    selected = chain.expiration_index(PUT).select(100.0, ITM, -10 ** 9, 10 ** 9, -np.inf, np.inf, 0, 0, now=NOW)
+    assert len(selected)
+    assert not np.isnan(chain.rows['strike'][selected]).any()
+    assert 'not-a-date' not in chain.expiration_strings(selected)
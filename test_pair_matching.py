@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Tests for vectorized pair matching and the screener's short leg index against per-pair loops"""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from pair_matching import PAIR_FIELDS, ShortLegIndex, match_pairs
+from records import LeapsLeg, ShortLeg
+from scanner import calculate_pop
+
+PRICE = 100.0
+RISK_FREE_RATE = 0.045
+
+
+def random_legs(rng: random.Random, n_leaps: int, n_shorts: int):
+    leaps = [LeapsLeg('2027-01-15', rng.choice([60.0, 70.0, 80.0, 90.0]), rng.choice([12.0, 20.0, 31.5]),
+                      rng.uniform(0.5, 0.9), 400, 100, 10)
+             for _ in range(n_leaps)]
+    shorts = [ShortLeg('2026-11-20', rng.choice([95.0, 105.0, 110.0]), rng.choice([0.0, 1.5, 3.0, 25.0]),
+                       rng.uniform(0.1, 0.4), rng.choice([0.0, 0.25, 0.6]), rng.choice([0, 14, 35]), 100, 10)
+              for _ in range(n_shorts)]
+    return leaps, shorts
+
+
+def expected_pairs(leaps, shorts, option_type: str, max_net_debit: float):
+    """The loop match_pairs replaces: every pair, scalar POP, stable sort by ROC"""
+    pairs = []
+    for i, leap in enumerate(leaps):
+        for j, short in enumerate(shorts):
+            net_debit = leap.ask * 100 - short.bid * 100
+            if not 0 < net_debit <= max_net_debit:
+                continue
+            T = short.days_to_expiration / 365.0
+            if option_type == 'call':
+                max_profit = (short.strike - leap.strike) * 100 - net_debit
+                breakeven = leap.strike + net_debit / 100
+                pop = calculate_pop(PRICE, short.strike, T, RISK_FREE_RATE, short.implied_volatility, 'call')
+            else:
+                max_profit = (leap.strike - short.strike) * 100 - net_debit
+                breakeven = leap.strike - net_debit / 100
+                pop = calculate_pop(PRICE, short.strike, T, RISK_FREE_RATE, short.implied_volatility, 'put',
+                                    breakeven)
+            pairs.append({'leap_index': i, 'short_index': j, 'net_debit': net_debit,
+                          'roc_pct': max_profit / net_debit * 100, 'breakeven': breakeven, 'pop_pct': pop * 100})
+    return sorted(pairs, key=lambda pair: pair['roc_pct'], reverse=True)
+
+
+@pytest.mark.parametrize('option_type', ['call', 'put'])
+def test_match_pairs_matches_scalar_loop(option_type):
+    rng = random.Random(11)
+    for _ in range(20):
+        leaps, shorts = random_legs(rng, rng.randint(0, 8), rng.randint(0, 8))
+        max_net_debit = rng.choice([500.0, 2000.0, 5000.0])
+        for top_k in (None, 3):
+            pairs = match_pairs(leaps, shorts, PRICE, option_type, max_net_debit, RISK_FREE_RATE, top_k=top_k)
+            expected = expected_pairs(leaps, shorts, option_type, max_net_debit)[:top_k]
+
+            assert set(pairs) == set(PAIR_FIELDS)
+            assert pairs['leap_index'].tolist() == [pair['leap_index'] for pair in expected]
+            assert pairs['short_index'].tolist() == [pair['short_index'] for pair in expected]
+            for field in ('net_debit', 'roc_pct', 'breakeven', 'pop_pct'):
+                assert pairs[field].tolist() == pytest.approx([pair[field] for pair in expected])
+
+
+def test_short_leg_index_feasible_matches_brute_force():
+    rng = random.Random(5)
+    expirations = [date(2026, 11, 20) + timedelta(days=7 * rng.randint(0, 5)) for _ in range(60)]
+    strikes = [rng.choice([90.0, 95.0, 100.0, 105.0, 110.0]) for _ in expirations]
+    credits = [rng.choice([0.0, 0.5, 1.0, 2.5, 4.0]) for _ in expirations]
+    index = ShortLegIndex(expirations, strikes, credits)
+
+    for _ in range(300):
+        expiration = date(2026, 11, 20) + timedelta(days=rng.randint(-7, 49))
+        strike = rng.choice([85.0, 95.0, 100.0, 107.5])
+        cost = rng.choice([1.0, 3.0, 6.0])
+        max_net_debit = rng.choice([0.0, 1.0, 2.5, 100.0])
+
+        in_bounds = [i for i in range(len(expirations)) if expirations[i] < expiration and strikes[i] > strike]
+        within_cap = [i for i in in_bounds if not cost - credits[i] > max_net_debit]
+
+        positions, over_cap = index.feasible(expiration, strike, cost, max_net_debit)
+        assert positions == within_cap
+        assert over_cap == len(in_bounds) - len(within_cap)
+
+
+def test_short_leg_index_empty():
+    assert ShortLegIndex([], [], []).feasible(date(2027, 1, 15), 100.0, 5.0, 10.0) == ([], 0)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Tests for the token bucket's refill, waits and adaptive backoff on a fake clock"""
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimitExceeded, TokenBucketRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.slept = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    return clock
+
+
+def test_burst_then_refill(clock):
+    limiter = TokenBucketRateLimiter(calls_per_minute=60, burst=3, backoff_initial=5, backoff_max=20)
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+    # Bucket empty: the next call waits one refill interval (1 token/s)
+    assert limiter.acquire() == pytest.approx(1.0)
+    assert clock.slept == [pytest.approx(1.0)]
+
+    # Idle time refills up to the burst, no further
+    clock.now += 100
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire() == pytest.approx(1.0)
+
+    metrics = limiter.metrics()
+    assert metrics['acquired'] == 8
+    assert metrics['waits'] == 2
+
+
+def test_wait_over_max_is_rejected(clock):
+    limiter = TokenBucketRateLimiter(calls_per_minute=60, burst=1, max_wait=0.5)
+    limiter.acquire()
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire()
+    # A rejected call takes no token
+    clock.now += 1
+    assert limiter.acquire() == 0.0
+    assert limiter.metrics()['rejected'] == 1
+
+
+def test_backoff_escalates_once_per_window_and_resets(clock):
+    limiter = TokenBucketRateLimiter(calls_per_minute=60, burst=10, max_wait=100, backoff_initial=5, backoff_max=12)
+
+    limiter.report_rate_limited()
+    assert limiter.metrics()['backoff_seconds'] == 5
+    # Responses already in flight come back limited too; they don't escalate
+    limiter.report_rate_limited()
+    assert limiter.metrics()['backoff_seconds'] == 5
+
+    # Every caller pauses until the backoff ends
+    assert limiter.acquire() == pytest.approx(6.0)
+
+    limiter.report_rate_limited()
+    assert limiter.metrics()['backoff_seconds'] == 10
+    clock.now += 10
+    limiter.report_rate_limited()
+    assert limiter.metrics()['backoff_seconds'] == 12  # capped at backoff_max
+
+    # Success during the pause keeps the backoff, after it resets it
+    limiter.report_success()
+    assert limiter.metrics()['backoff_seconds'] == 12
+    clock.now += 12
+    limiter.report_success()
+    assert limiter.metrics()['backoff_seconds'] == 0
+    assert limiter.metrics()['rate_limited_responses'] == 4
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Tests for bounded top-k selection against a stable full sort"""
+import random
+
+import numpy as np
+
+from selection import TopK, smallest_k
+
+
+def test_smallest_k_matches_stable_argsort():
+    rng = np.random.default_rng(7)
+    for _ in range(200):
+        # Few distinct values, so most arrays have ties at the k-th position
+        values = rng.integers(0, 5, size=int(rng.integers(0, 30))).astype(np.float64)
+        for k in (None, 0, 1, 3, len(values), len(values) + 2):
+            expected = np.argsort(values, kind='stable')[:k]
+            assert smallest_k(values, k).tolist() == expected.tolist()
+
+
+def test_smallest_k_with_nan():
+    values = np.array([2.0, np.nan, 1.0, np.nan, 1.0])
+    for k in range(len(values) + 1):
+        expected = np.argsort(values, kind='stable')[:k]
+        assert smallest_k(values, k).tolist() == expected.tolist()
+
+
+def test_topk_matches_stable_sort():
+    rng = random.Random(3)
+    for _ in range(200):
+        items = [(rng.randint(0, 4), i) for i in range(rng.randint(0, 30))]
+        for k in (None, 1, 3, 10):
+            top = TopK(k, key=lambda item: item[0])
+            top.extend(items)
+            expected = sorted(items, key=lambda item: item[0], reverse=True)[:k]
+            assert top.items() == expected
+            assert len(top) == len(expected)
+
+
+def test_topk_earlier_items_win_ties():
+    top = TopK(2, key=lambda item: item['roc'])
+    for name in ('a', 'b', 'c'):
+        top.push({'name': name, 'roc': 1.0})
+    assert [item['name'] for item in top.items()] == ['a', 'b']
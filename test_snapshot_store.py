@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Tests for the columnar chain snapshot store"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from option_chain import OptionChain
+from snapshot_store import ChainSnapshotStore
+
+OPTIONS = [
+    {'type': 'call', 'expiration': '2026-03-20', 'strike': '100', 'bid': '2.5', 'ask': '2.7',
+     'delta': '0.52', 'implied_volatility': '0.31', 'open_interest': '120', 'volume': '15'},
+    {'type': 'put', 'expiration': '2027-01-15', 'strike': '90', 'bid': '4.1', 'ask': '4.4',
+     'delta': '-0.28', 'implied_volatility': '0.35', 'open_interest': '80', 'volume': '3'},
+]
+
+
+def test_write_and_load_round_trip(tmp_path):
+    store = ChainSnapshotStore(str(tmp_path))
+    first, second = datetime(2026, 1, 5, 10, 0), datetime(2026, 1, 5, 15, 30)
+    store.write('amd', 150.25, OPTIONS, timestamp=first)
+    store.write('AMD', 151.0, OptionChain.from_alphavantage(OPTIONS[:1]), timestamp=second)
+
+    assert store.symbols() == ['AMD']
+    assert store.timestamps('AMD') == [first, second]
+
+    price, chain, taken = store.load('amd', as_of=datetime(2026, 1, 5, 12, 0))
+    expected = OptionChain.from_alphavantage(OPTIONS)
+    assert (price, taken) == (150.25, first)
+    assert chain.expirations == expected.expirations
+    assert chain.rows.tobytes() == expected.rows.tobytes()
+
+    price, chain, taken = store.load('AMD', mmap=False)
+    assert (price, taken, len(chain)) == (151.0, second, 1)
+    assert isinstance(chain.rows, np.ndarray)
+
+
+def test_load_missing_snapshot(tmp_path):
+    store = ChainSnapshotStore(str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        store.load('AMD')
+    store.write('AMD', 150.0, OPTIONS, timestamp=datetime(2026, 1, 5, 10, 0))
+    with pytest.raises(FileNotFoundError):
+        store.load('AMD', as_of=datetime(2026, 1, 4))
+
+
+@pytest.mark.parametrize('symbol', ['', '..', '../etc', 'A/B', '.HIDDEN', '-X', 'TOOLONGSYMBOL', 'A B', 'A\x00'])
+def test_rejects_symbols_that_are_not_directory_names(tmp_path, symbol):
+    store = ChainSnapshotStore(str(tmp_path / 'store'))
+    with pytest.raises(ValueError):
+        store.write(symbol, 100.0, OPTIONS)
+    with pytest.raises(ValueError):
+        store.load(symbol)
+    assert not (tmp_path / 'store').exists()
+
+
+@pytest.mark.parametrize('symbol', ['BRK.B', 'BF-B', 'spy', 'X'])
+def test_accepts_ticker_symbols(tmp_path, symbol):
+    store = ChainSnapshotStore(str(tmp_path))
+    store.write(symbol, 100.0, OPTIONS, timestamp=datetime(2026, 1, 5, 10, 0))
+    assert store.symbols() == [symbol.upper()]